@@ -7,9 +7,14 @@ from flask import (
     flash,
     session,
     jsonify,
+    g,
 )
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from functools import partial
+import math
 import os
+import re
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -22,8 +27,10 @@ from firebase import (
     create_empresa,
     update_empresa,
     get_vacantes_by_empresa_id,
+    get_active_vacantes,
     create_vacante,
     get_empresa_by_id,
+    get_vacante_by_id,
     update_vacante,
     delete_vacante,
     verify_vacante_belongs_to_empresa,
@@ -32,7 +39,37 @@ from firebase import (
     get_alumno_by_correo,
     create_alumno,
     update_alumno,
+    create_postulacion,
+    add_empresa_webhook,
+    remove_empresa_webhook,
 )
+from backend.resilience import (
+    FirestoreUnavailableError,
+    FirestoreDeadlineError,
+    FirestoreCircuitOpenError,
+    breaker,
+)
+from backend.rate_limit import api_rate_limiter
+from backend import (
+    bulk_import,
+    digest,
+    id_tokens,
+    idempotency,
+    profiler,
+    propagation,
+    query_budget,
+    shared_cache,
+    snapshot,
+    webhooks,
+)
+from backend.concurrency import run_parallel
+from backend.jobs import job_queue
+from backend.mail import send_password_reset_email
+from backend.search import search_vacantes
+from backend.validation import ALUMNO, POSTULACION, VACANTE, first_error
+from backend.salary import filter_by_sueldo, sueldo_histogram
+from backend.autocomplete import autocomplete, FIELDS as AUTOCOMPLETE_FIELDS, TOP_K
+from backend.candidates import search_candidates, resolve_skills
 
 app = Flask(
     __name__, template_folder="frontend/templates", static_folder="frontend/static"
@@ -42,15 +79,92 @@ app = Flask(
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
 
+# Largest accepted request body: the bulk import file plus the multipart
+# framing. Unlike a Content-Length check it also bounds chunked bodies.
+app.config["MAX_CONTENT_LENGTH"] = bulk_import.MAX_BYTES + 64 * 1024
+
 # Enable CORS for API endpoints (production ready)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Firestore call budgets and N+1 checks (FIRESTORE_ACCOUNTING=warn or strict)
+query_budget.init_app(app)
+
+# Sampling profiler for live requests (PROFILE_SAMPLE_RATE / PROFILE_TOKEN)
+profiler.init_app(app)
+
 # Initialize Firebase Admin SDK
 initialize_firebase()
 
+# Resume nombreEmpresa propagations interrupted by a restart
+propagation.resume_in_background()
+
+# Start the background job workers (drains jobs spooled before a restart)
+job_queue.start()
+
+# Hourly (DIGEST_WINDOW) summary emails of new postulaciones per empresa
+digest.start_scheduler()
+
+# Host-local vacantes snapshot the indexes are restored from (backend.snapshot)
+snapshot.start_writer()
+
+# Google signing certificates for the login routes, fetched ahead of use
+id_tokens.start_refresher()
+
 # Secret key for session management - change this in production
 app.secret_key = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
 
+EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    """
+    The body exceeded MAX_CONTENT_LENGTH. Answer in JSON, since the pages
+    that upload (bulk import) and the API both expect it.
+    """
+    if request.path.startswith("/api/"):
+        message = "Request body too large"
+    else:
+        message = "La solicitud es demasiado grande"
+    return jsonify({"success": False, "error": message}), 413
+
+
+@app.errorhandler(FirestoreUnavailableError)
+def firestore_unavailable(error):
+    """
+    Firestore is degraded (deadline exceeded, circuit open or persistent
+    transient errors). Answer 503 instead of treating it as "not found".
+    """
+    if isinstance(error, FirestoreCircuitOpenError):
+        reason = "circuit_open"
+    elif isinstance(error, FirestoreDeadlineError):
+        reason = "timeout"
+    else:
+        reason = "unavailable"
+
+    print(f"Firestore unavailable ({reason}) on {request.path}: {error}")
+
+    headers = {"Retry-After": str(max(1, math.ceil(breaker.retry_after())))}
+
+    if request.path.startswith("/api/"):
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": "Service temporarily unavailable, please retry later",
+                    "reason": reason,
+                }
+            ),
+            503,
+            headers,
+        )
+
+    return (
+        "Servicio temporalmente no disponible. Inténtalo de nuevo en unos momentos.",
+        503,
+        headers,
+    )
+
 
 @app.route("/")
 def index():
@@ -155,18 +269,15 @@ def alumnos_register():
 def alumnos_forgot_password():
     if request.method == "POST":
         email = request.form.get("email", "")
-        clean_email = auth_manager.sanitize_input(email)
+        clean_email = email.strip().lower()
 
         if not clean_email:
             flash("El campo de email es obligatorio", "error")
-        elif not auth_manager.validate_email(clean_email):
+        elif not EMAIL_RE.fullmatch(clean_email):
             flash("Por favor, ingresa un email válido", "error")
         else:
-            # Generate reset token
-            reset_token = auth_manager.generate_reset_token(clean_email)
-
-            # Send reset email (implement actual email sending)
-            if send_password_reset_email(clean_email, reset_token):
+            # The reset link is generated and emailed by a background job
+            if send_password_reset_email(clean_email):
                 flash("Se ha enviado un enlace de recuperación a tu email.", "info")
                 return redirect(url_for("alumnos_login"))
             else:
@@ -208,34 +319,12 @@ def alumnos_perfil():
 
     # POST: actualizar perfil
     if request.method == "POST":
-        campos = [
-            "nombre",
-            "edad",
-            "estatus",
-            "semestre",
-            "promedio",
-            "area1",
-            "area2",
-            "area3",
-            "habilidades_tecnicas",
-            "habilidades_blandas",
-            "idiomas",
-        ]
-
-        update_data = {}
-        for campo in campos:
-            valor = request.form.get(campo, "").strip()
-            if valor:
-                update_data[campo] = valor
-
-        # Conversión de tipos
-        for campo, tipo in [("edad", int), ("promedio", float)]:
-            if campo in update_data:
-                try:
-                    update_data[campo] = tipo(update_data[campo])
-                except ValueError:
-                    flash(f"El campo {campo} debe ser un número.", "error")
-                    return redirect(url_for("alumnos_perfil"))
+        update_data, errors = ALUMNO.validate(
+            request.form, partial=True, form=True, lang="es"
+        )
+        if errors:
+            flash(first_error(errors), "error")
+            return redirect(url_for("alumnos_perfil"))
 
         if not update_data:
             flash("No se proporcionaron datos nuevos para actualizar.", "info")
@@ -277,22 +366,7 @@ def alumnos_perfil():
     if not alumno_data:
         alumno_data = {}  # Evita el error de NoneType
 
-    alumno_render_data = {
-        key: alumno_data.get(key)
-        for key in [
-            "nombre",
-            "edad",
-            "estatus",
-            "semestre",
-            "promedio",
-            "area1",
-            "area2",
-            "area3",
-            "habilidades_tecnicas",
-            "habilidades_blandas",
-            "idiomas",
-        ]
-    }
+    alumno_render_data = {key: alumno_data.get(key) for key in ALUMNO.names}
 
     alumno_render_data["is_new"] = is_new_alumno
     alumno_render_data["doc_id"] = alumno_data.get("doc_id")
@@ -300,38 +374,206 @@ def alumnos_perfil():
     return render_template("alumnos_perfil.html", alumno=alumno_render_data)
 @app.route('/alumnos/vacantes')
 def alumnos_vacantes():
-    # Prepara la configuración de Firebase para el lado del cliente
-    firebase_config = {
-        "apiKey": os.getenv("FIREBASE_API_KEY"),
-        "authDomain": os.getenv("FIREBASE_AUTH_DOMAIN"),
-        "projectId": os.getenv("FIREBASE_PROJECT_ID"),
-        "storageBucket": os.getenv("FIREBASE_STORAGE_BUCKET"),
-        "messagingSenderId": os.getenv("FIREBASE_MESSAGING_SENDER_ID"),
-        "appId": os.getenv("FIREBASE_APP_ID"),
-        "measurementId": os.getenv("FIREBASE_MEASUREMENT_ID"),
-    }
-    # Obtener datos del alumno si ha iniciado sesión
-    alumno_logueado = None
+    """
+    Lista de vacantes activas para alumnos. Se entregan con la página en vez
+    de leerse desde el navegador con el SDK de Firestore.
+    """
+    # El perfil del alumno (si ha iniciado sesión) y las vacantes activas son
+    # lecturas independientes: se piden en paralelo
+    lecturas = [get_active_vacantes]
     if session.get('user_role') == 'alumno' and 'user_email' in session:
-        alumno_logueado = get_alumno_by_correo(session['user_email'])
+        lecturas.append(partial(get_alumno_by_correo, session['user_email']))
+    vacantes, *alumno = run_parallel(*lecturas)
+    alumno_logueado = alumno[0] if alumno else None
+
+    return render_template(
+        'alumnos_vacantes.html',
+        alumno=alumno_logueado,
+        vacantes=[vacante.to_json() for vacante in vacantes],
+    )
+
+
+@app.route("/alumnos/vacantes/buscar")
+def alumnos_buscar_vacantes():
+    """
+    Búsqueda de texto completo sobre las vacantes activas.
+    Devuelve los IDs de las vacantes ordenados por relevancia (BM25), por
+    páginas (offset/limit); total es el número de vacantes que coinciden.
+    """
+    query = request.args.get("q", "").strip()
 
-    return render_template('alumnos_vacantes.html', firebase_config=firebase_config, alumno=alumno_logueado)
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    offset = max(request.args.get("offset", 0, type=int), 0)
+
+    if not query:
+        return jsonify({"success": True, "total": 0, "count": 0, "results": []})
+
+    total, results = search_vacantes(query, limit, offset)
+
+    return jsonify(
+        {
+            "success": True,
+            "total": total,
+            "count": len(results),
+            "results": [
+                {"id": vacante_id, "score": round(score, 4)}
+                for vacante_id, score in results
+            ],
+        }
+    )
 
 
-# 🔹 (Opcional) Ruta para recibir postulaciones desde el formulario
-@app.route('/alumnos/postular', methods=['POST'])
+@app.route("/alumnos/vacantes/sueldo")
+def alumnos_filtrar_sueldo():
+    """
+    Filtra las vacantes activas por rango de sueldo (min/max, en MXN) y las
+    ordena por sueldo. Incluye el histograma de sueldos para las facetas.
+    Las vacantes sin sueldo solo aparecen con incluir_sin_sueldo=1, y con
+    max_exclusivo=1 el máximo no se incluye (igual que en el histograma).
+    """
+    args = request.args
+    minimo = args.get("min", type=float)
+    maximo = args.get("max", type=float)
+    # float() acepta "nan" e "inf", que no son un rango válido
+    if any(
+        bound is not None and not math.isfinite(bound) for bound in (minimo, maximo)
+    ):
+        return jsonify({"success": False, "error": "Rango de sueldo inválido"}), 400
+    max_exclusivo = args.get("max_exclusivo", "0") in ("1", "true")
+    descendente = args.get("orden", "asc") == "desc"
+    incluir_sin_sueldo = args.get("incluir_sin_sueldo", "0") in ("1", "true")
+    offset = max(args.get("offset", 0, type=int), 0)
+    limit = min(max(args.get("limit", 50, type=int), 1), 200)
+
+    total, resultados = filter_by_sueldo(
+        minimo=minimo,
+        maximo=maximo,
+        descending=descendente,
+        include_missing=incluir_sin_sueldo,
+        exclusive_max=max_exclusivo,
+        offset=offset,
+        limit=limit,
+    )
+    buckets, sin_sueldo = sueldo_histogram()
+
+    return jsonify(
+        {
+            "success": True,
+            "total": total,
+            "results": [
+                {"id": vacante_id, "sueldo": sueldo}
+                for vacante_id, sueldo in resultados
+            ],
+            "histograma": [
+                {"min": bucket_min, "max": bucket_max, "count": count}
+                for bucket_min, bucket_max, count in buckets
+            ],
+            "sin_sueldo": sin_sueldo,
+        }
+    )
+
+
+@app.route("/autocompletar")
+def autocompletar():
+    """
+    Sugerencias para los campos de texto libre (habilidades, idiomas y
+    títulos de vacantes), ordenadas por frecuencia de uso.
+    """
+    campo = request.args.get("campo", "")
+    prefijo = request.args.get("q", "")
+
+    if campo not in AUTOCOMPLETE_FIELDS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"campo must be one of: {', '.join(AUTOCOMPLETE_FIELDS)}",
+                }
+            ),
+            400,
+        )
+
+    try:
+        # The index only keeps TOP_K completions per prefix
+        k = max(min(int(request.args.get("k", 8)), TOP_K), 1)
+    except ValueError:
+        k = 8
+
+    sugerencias = autocomplete(campo, prefijo, k)
+
+    return jsonify(
+        {
+            "success": True,
+            "sugerencias": [
+                {"valor": valor, "frecuencia": frecuencia}
+                for valor, frecuencia in sugerencias
+            ],
+        }
+    )
+
+
+@app.route("/alumnos/postular", methods=["POST"])
 def alumnos_postular():
-    data = request.get_json()
-    nombre = data.get('nombre')
-    correo = data.get('correo')
-    mensaje = data.get('mensaje')
-    vacante_id = data.get('vacanteId')
-
-    # Aquí podrías conectar con Firebase o guardar en tu base de datos
-    print(f"Postulación recibida: {nombre} ({correo}) a la vacante {vacante_id}")
-    
+    """
+    Guarda una postulación y notifica a los webhooks de la empresa dueña de
+    la vacante (evento postulacion.created). Solo para alumnos con sesión:
+    el correo de la postulación es el de la sesión, no uno del cuerpo.
+    """
+    correo = session.get("user_email")
+    if session.get("user_role") != "alumno" or not correo:
+        return jsonify({"success": False, "error": "No autorizado"}), 401
+
+    postulacion, errors = POSTULACION.validate(
+        request.get_json(silent=True), lang="es"
+    )
+    if errors:
+        return jsonify({"success": False, "error": first_error(errors)}), 400
+    nombre = postulacion["nombre"]
+    mensaje = postulacion["mensaje"]
+    vacante_id = postulacion["vacanteId"]
+
+    vacante = get_vacante_by_id(vacante_id)
+    if not vacante or vacante.activa is False:
+        return jsonify({"success": False, "error": "Vacante no encontrada"}), 404
+
+    postulacion_id = create_postulacion(
+        {
+            "vacanteId": vacante_id,
+            "nombre": nombre,
+            "correo": correo,
+            "mensaje": mensaje,
+        }
+    )
+    if not postulacion_id:
+        return (
+            jsonify({"success": False, "error": "No se pudo guardar la postulación"}),
+            500,
+        )
+
+    # La postulación ya está guardada: un fallo al leer la empresa no la invalida
+    try:
+        empresa = get_empresa_by_id(vacante.empresa_doc_id)
+    except FirestoreUnavailableError:
+        empresa = None
+    if empresa:
+        webhooks.emit(
+            empresa,
+            "postulacion.created",
+            {
+                "postulacion_id": postulacion_id,
+                "vacante_id": vacante_id,
+                "nombre": nombre,
+                "correo": correo,
+                "mensaje": mensaje,
+            },
+        )
+
     return jsonify({"success": True, "msg": "Postulación recibida correctamente."})
 
+
 @app.route("/alumnos/metricas")
 def alumnos_metricas():
     """
@@ -524,9 +766,19 @@ def empresa_dashboard():
 
     # Get empresa document ID from session
     doc_id = session.get("empresa_doc_id")
+    empresa = None
+
+    if doc_id:
+        # Both reads only need the doc ID: the empresa (usually a shared cache
+        # hit) and its vacantes are fetched in parallel
+        empresa, vacantes = run_parallel(
+            partial(get_empresa_by_id, doc_id),
+            partial(get_vacantes_by_empresa_id, doc_id),
+        )
 
-    if not doc_id:
-        # If doc_id is not in session, fetch it from Firestore
+    if not empresa:
+        # If doc_id is not in session (or is stale), fetch it from Firestore.
+        # The vacantes query needs its doc ID, so these two stay sequential
         correo = session["user_email"]
         empresa = get_empresa_by_correo(correo)
 
@@ -540,10 +792,102 @@ def empresa_dashboard():
             )
             return redirect(url_for("empresa_datos"))
 
-    # Get all vacantes for this empresa
-    vacantes = get_vacantes_by_empresa_id(doc_id)
+        # Get all vacantes for this empresa
+        vacantes = get_vacantes_by_empresa_id(doc_id)
+
+    return render_template("empresa_dashboard.html", empresa=empresa, vacantes=vacantes)
+
+
+@app.route("/empresas/candidatos/buscar")
+def empresa_buscar_candidatos():
+    """
+    Búsqueda de alumnos para empresas. Filtros opcionales: promedio_min,
+    semestre_min, semestre_max, estatus, area y habilidades (separadas por
+    comas; incluye idiomas). Devuelve los doc IDs paginados, ordenados por
+    promedio.
+    """
+    if "user_email" not in session or session.get("user_role") != "empresa":
+        return jsonify({"success": False, "error": "No autorizado"}), 401
+
+    # Valores numéricos inválidos se ignoran (type= devuelve el default)
+    args = request.args
+    promedio_min = args.get("promedio_min", type=float)
+    semestre_min = args.get("semestre_min", type=int)
+    semestre_max = args.get("semestre_max", type=int)
+    pagina = max(args.get("pagina", 1, type=int), 1)
+    por_pagina = min(max(args.get("por_pagina", 20, type=int), 1), 100)
+
+    skill_ids, desconocidas = resolve_skills(args.get("habilidades", ""))
+
+    total, resultados = search_candidates(
+        promedio_min=promedio_min,
+        semestre_min=semestre_min,
+        semestre_max=semestre_max,
+        estatus=args.get("estatus", "").strip() or None,
+        area=args.get("area", "").strip() or None,
+        skill_ids=skill_ids,
+        offset=(pagina - 1) * por_pagina,
+        limit=por_pagina,
+    )
+
+    return jsonify(
+        {
+            "success": True,
+            "total": total,
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "resultados": resultados,
+            "habilidades_desconocidas": desconocidas,
+        }
+    )
+
+
+@app.route("/empresas/vacantes/importar", methods=["POST"])
+def empresa_importar_vacantes():
+    """
+    Importa vacantes desde un archivo CSV o XLSX (campo "archivo"). Las filas
+    inválidas se reportan con su número de fila sin detener la importación.
+    """
+    if "user_email" not in session or session.get("user_role") != "empresa":
+        return jsonify({"success": False, "error": "No autorizado"}), 401
+
+    doc_id = session.get("empresa_doc_id")
+    empresa = get_empresa_by_id(doc_id) if doc_id else None
+    if not empresa:
+        return jsonify({"success": False, "error": "Empresa no encontrada"}), 404
+
+    if request.content_length and request.content_length > bulk_import.MAX_BYTES:
+        return (
+            jsonify({"success": False, "error": "El archivo es demasiado grande"}),
+            413,
+        )
+
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        return jsonify({"success": False, "error": "Selecciona un archivo"}), 400
+
+    try:
+        resultado = bulk_import.import_vacantes(
+            doc_id, empresa.get("nombre", ""), archivo.stream, archivo.filename
+        )
+    except bulk_import.ImportFormatError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    for vacante in resultado["vacantes"]:
+        if vacante["fusionada"]:
+            webhooks.emit(
+                empresa,
+                "vacante.updated",
+                {"vacante_id": vacante["id"], "campos": vacante["campos"]},
+            )
+        else:
+            webhooks.emit(
+                empresa,
+                "vacante.created",
+                {"vacante_id": vacante["id"], "titulo": vacante["titulo"]},
+            )
 
-    return render_template("empresa_dashboard.html", vacantes=vacantes)
+    return jsonify({"success": True, **resultado})
 
 
 @app.route("/admin/dashboard")
@@ -591,11 +935,13 @@ def nueva_vacante():
     if "user_email" not in session or session.get("user_role") != "empresa":
         return redirect(url_for("empresas_login"))
 
-    # Get empresa document ID from session
+    # Get empresa data for the form (by document ID if it is in session).
+    # A single read: the form needs nothing else, so there is no fan-out
     doc_id = session.get("empresa_doc_id")
+    empresa = get_empresa_by_id(doc_id) if doc_id else None
 
-    if not doc_id:
-        # If doc_id is not in session, fetch it from Firestore
+    if not empresa:
+        # If doc_id is not in session (or is stale), fetch it from Firestore
         correo = session["user_email"]
         empresa = get_empresa_by_correo(correo)
 
@@ -609,61 +955,34 @@ def nueva_vacante():
             )
             return redirect(url_for("empresa_datos"))
 
-    # Get empresa data for the form
-    empresa = get_empresa_by_correo(session["user_email"])
-
     if request.method == "POST":
-        # Collect form data
-        vacante_data = {
-            "titulo": request.form.get("titulo", "").strip(),
-            "descripcion": request.form.get("descripcion", "").strip(),
-            "requisitos": request.form.get("requisitos", "").strip(),
-            "modalidad": request.form.get("modalidad", "").strip(),
-            "tipoContrato": request.form.get("tipoContrato", "").strip(),
-            "duracion": request.form.get("duracion", "").strip(),
-            "horario": request.form.get("horario", "").strip(),
-            "educacion": request.form.get("educacion", "").strip(),
-            "experienciaRequerida": request.form.get(
-                "experienciaRequerida", ""
-            ).strip(),
-            "nombreEmpresa": empresa.get("nombre", ""),
-        }
-
-        # Handle sueldo (number)
-        sueldo_str = request.form.get("sueldo", "").strip()
-        if sueldo_str:
-            try:
-                vacante_data["sueldo"] = float(sueldo_str)
-            except ValueError:
-                vacante_data["sueldo"] = None
-        else:
-            vacante_data["sueldo"] = None
-
-        # Handle arrays: habilidadesDuras and idiomas
-        habilidades_str = request.form.get("habilidadesDuras", "").strip()
-        if habilidades_str:
-            vacante_data["habilidadesDuras"] = [
-                h.strip() for h in habilidades_str.split(",") if h.strip()
-            ]
-        else:
-            vacante_data["habilidadesDuras"] = []
+        vacante_data, errors = VACANTE.validate(request.form, form=True, lang="es")
 
-        idiomas_str = request.form.get("idiomas", "").strip()
-        if idiomas_str:
-            vacante_data["idiomas"] = [
-                i.strip() for i in idiomas_str.split(",") if i.strip()
-            ]
+        if errors:
+            flash(first_error(errors), "error")
         else:
-            vacante_data["idiomas"] = []
+            vacante_data["nombreEmpresa"] = empresa.get("nombre", "")
 
-        # Validate required fields
-        if not vacante_data["titulo"]:
-            flash("El título de la vacante es obligatorio.", "error")
-        else:
             # Create the vacante
-            vacante_id = create_vacante(doc_id, vacante_data)
+            vacante_id, merged = create_vacante(doc_id, vacante_data)
 
-            if vacante_id:
+            if vacante_id and merged:
+                webhooks.emit(
+                    empresa,
+                    "vacante.updated",
+                    {"vacante_id": vacante_id, "campos": sorted(vacante_data)},
+                )
+                flash(
+                    "Ya tenías publicada esta vacante; se actualizó la existente.",
+                    "success",
+                )
+                return redirect(url_for("empresa_dashboard"))
+            elif vacante_id:
+                webhooks.emit(
+                    empresa,
+                    "vacante.created",
+                    {"vacante_id": vacante_id, "titulo": vacante_data["titulo"]},
+                )
                 flash("Vacante creada exitosamente.", "success")
                 return redirect(url_for("empresa_dashboard"))
             else:
@@ -718,11 +1037,26 @@ def require_api_key(f):
                 401,
             )
 
+        # Rate limit per API key before spending a Firestore read on it
+        rate_limit = api_rate_limiter.hit(api_key, request.remote_addr)
+        g.rate_limit = rate_limit
+        if not rate_limit.allowed:
+            return (
+                jsonify({"success": False, "error": "Rate limit exceeded"}),
+                429,
+                rate_limit.headers(),
+            )
+
         # Verify empresa exists
         empresa = get_empresa_by_id(api_key)
         if not empresa:
             return jsonify({"success": False, "error": "Invalid API key"}), 401
 
+        # Keep the bucket on the empresa's plan for the next requests
+        plan = api_rate_limiter.resolve_plan(empresa.get("plan"))
+        if rate_limit.needs_plan(plan):
+            api_rate_limiter.set_plan(api_key, plan)
+
         # Verify suscripcionActiva is True
         if not empresa.get("suscripcionActiva", False):
             return (
@@ -741,6 +1075,107 @@ def require_api_key(f):
     return decorated_function
 
 
+def idempotent(f):
+    """
+    Decorator that honours the Idempotency-Key header.
+    The first response for a key is stored and replayed on retries without
+    calling the route again. Must be applied below require_api_key, which
+    provides empresa_id.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        idempotency_key = request.headers.get("Idempotency-Key")
+
+        if not idempotency_key:
+            return f(*args, **kwargs)
+
+        if len(idempotency_key) > 255:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Idempotency-Key must be at most 255 characters",
+                    }
+                ),
+                400,
+            )
+
+        key = idempotency.scoped_key(kwargs["empresa_id"], idempotency_key)
+        request_fingerprint = idempotency.fingerprint(request.get_data())
+
+        try:
+            state, stored = idempotency.idempotency_store.begin(
+                key, request_fingerprint
+            )
+        except Exception as e:
+            # Without the store the call is still valid, just not deduplicated
+            print(f"Error reading idempotency store: {e}")
+            return f(*args, **kwargs)
+
+        if state == idempotency.REPLAY:
+            status, body = stored
+            response = app.response_class(
+                body, status=status, mimetype="application/json"
+            )
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        if state == idempotency.IN_PROGRESS:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "A request with this Idempotency-Key is still in progress",
+                    }
+                ),
+                409,
+            )
+
+        if state == idempotency.MISMATCH:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Idempotency-Key was already used with a different request body",
+                    }
+                ),
+                422,
+            )
+
+        try:
+            response = app.make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency.idempotency_store.release(key)
+            raise
+
+        # Server errors are not stored so the client can retry them
+        try:
+            if response.status_code >= 500:
+                idempotency.idempotency_store.release(key)
+            else:
+                idempotency.idempotency_store.complete(
+                    key, request_fingerprint, response.status_code, response.get_data()
+                )
+        except Exception as e:
+            print(f"Error writing idempotency store: {e}")
+
+        return response
+
+    return decorated_function
+
+
+@app.after_request
+def add_rate_limit_headers(response):
+    """
+    Adds the X-RateLimit-* headers to responses of rate-limited API calls.
+    """
+    rate_limit = g.get("rate_limit")
+    if rate_limit is not None:
+        response.headers.update(rate_limit.headers())
+    return response
+
+
 @app.route("/api/vacantes", methods=["GET"])
 @require_api_key
 def api_get_vacantes(empresa_id, empresa):
@@ -749,30 +1184,18 @@ def api_get_vacantes(empresa_id, empresa):
     Retrieves all vacantes for the authenticated empresa.
     """
     try:
-        # Get all vacantes for this empresa
-        vacantes = get_vacantes_by_empresa_id(empresa_id)
-
-        # Convert vacantes to JSON-serializable format
-        vacantes_list = []
-        for vacante in vacantes:
-            vacante_dict = {
-                "id": vacante.get("id"),
-                "titulo": vacante.get("titulo"),
-                "descripcion": vacante.get("descripcion"),
-                "requisitos": vacante.get("requisitos"),
-                "modalidad": vacante.get("modalidad"),
-                "tipoContrato": vacante.get("tipoContrato"),
-                "duracion": vacante.get("duracion"),
-                "horario": vacante.get("horario"),
-                "sueldo": vacante.get("sueldo"),
-                "educacion": vacante.get("educación"),
-                "experienciaRequerida": vacante.get("experienciaRequerida"),
-                "habilidadesDuras": vacante.get("habilidadesDuras", []),
-                "idiomas": vacante.get("idiomas", []),
-                "nombreEmpresa": vacante.get("nombreEmpresa"),
-                "activa": vacante.get("activa", True),
-            }
-            vacantes_list.append(vacante_dict)
+        cache_key = shared_cache.listing_key(empresa_id)
+        vacantes_list = shared_cache.shared_cache.get(cache_key)
+        if vacantes_list is shared_cache.MISS:
+            # Convert vacantes to JSON-serializable format
+            vacantes_list = [
+                vacante.to_json() for vacante in get_vacantes_by_empresa_id(empresa_id)
+            ]
+            # An empty list may be a failed query, so it is not cached
+            if vacantes_list:
+                shared_cache.shared_cache.set(
+                    cache_key, vacantes_list, shared_cache.LISTING_TTL
+                )
 
         return (
             jsonify(
@@ -785,6 +1208,8 @@ def api_get_vacantes(empresa_id, empresa):
             200,
         )
 
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         return (
             jsonify({"success": False, "error": f"Internal server error: {str(e)}"}),
@@ -794,6 +1219,7 @@ def api_get_vacantes(empresa_id, empresa):
 
 @app.route("/api/vacante", methods=["POST"])
 @require_api_key
+@idempotent
 def api_create_vacante(empresa_id, empresa):
     """
     POST /api/vacante
@@ -805,35 +1231,42 @@ def api_create_vacante(empresa_id, empresa):
         if not data:
             return jsonify({"success": False, "error": "Request body is required"}), 400
 
-        # Validate required field: titulo
-        if not data.get("titulo"):
+        vacante_data, errors = VACANTE.validate(data)
+        if errors:
             return (
-                jsonify({"success": False, "error": "Field 'titulo' is required"}),
+                jsonify(
+                    {"success": False, "error": first_error(errors), "errors": errors}
+                ),
                 400,
             )
-
-        # Prepare vacante data
-        vacante_data = {
-            "titulo": data.get("titulo", ""),
-            "descripcion": data.get("descripcion", ""),
-            "requisitos": data.get("requisitos", ""),
-            "modalidad": data.get("modalidad", ""),
-            "tipoContrato": data.get("tipoContrato", ""),
-            "duracion": data.get("duracion", ""),
-            "horario": data.get("horario", ""),
-            "sueldo": data.get("sueldo"),
-            "educacion": data.get("educacion", ""),
-            "experienciaRequerida": data.get("experienciaRequerida", ""),
-            "habilidadesDuras": data.get("habilidadesDuras", []),
-            "idiomas": data.get("idiomas", []),
-            "nombreEmpresa": empresa.get("nombre", ""),
-            "activa": data.get("activa", True),
-        }
+        vacante_data["nombreEmpresa"] = empresa.get("nombre", "")
 
         # Create the vacante
-        vacante_id = create_vacante(empresa_id, vacante_data)
+        vacante_id, merged = create_vacante(empresa_id, vacante_data)
 
+        if vacante_id and merged:
+            webhooks.emit(
+                empresa,
+                "vacante.updated",
+                {"vacante_id": vacante_id, "campos": sorted(vacante_data)},
+            )
+            return (
+                jsonify(
+                    {
+                        "success": True,
+                        "message": "Vacante merged into an existing duplicate",
+                        "vacante_id": vacante_id,
+                        "merged_into": vacante_id,
+                    }
+                ),
+                200,
+            )
         if vacante_id:
+            webhooks.emit(
+                empresa,
+                "vacante.created",
+                {"vacante_id": vacante_id, "titulo": vacante_data["titulo"]},
+            )
             return (
                 jsonify(
                     {
@@ -847,6 +1280,8 @@ def api_create_vacante(empresa_id, empresa):
         else:
             return jsonify({"success": False, "error": "Failed to create vacante"}), 500
 
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         return (
             jsonify({"success": False, "error": f"Internal server error: {str(e)}"}),
@@ -879,29 +1314,14 @@ def api_update_vacante(empresa_id, empresa, vacante_id):
                 404,
             )
 
-        # Prepare update data (only include provided fields)
-        vacante_data = {}
-
-        allowed_fields = [
-            "titulo",
-            "descripcion",
-            "requisitos",
-            "modalidad",
-            "tipoContrato",
-            "duracion",
-            "horario",
-            "sueldo",
-            "educacion",
-            "experienciaRequerida",
-            "habilidadesDuras",
-            "idiomas",
-            "nombreEmpresa",
-            "activa",
-        ]
-
-        for field in allowed_fields:
-            if field in data:
-                vacante_data[field] = data[field]
+        vacante_data, errors = VACANTE.validate(data, partial=True)
+        if errors:
+            return (
+                jsonify(
+                    {"success": False, "error": first_error(errors), "errors": errors}
+                ),
+                400,
+            )
 
         if not vacante_data:
             return (
@@ -913,6 +1333,11 @@ def api_update_vacante(empresa_id, empresa, vacante_id):
 
         # Update the vacante
         if update_vacante(vacante_id, vacante_data):
+            webhooks.emit(
+                empresa,
+                "vacante.updated",
+                {"vacante_id": vacante_id, "campos": sorted(vacante_data)},
+            )
             return (
                 jsonify(
                     {
@@ -926,6 +1351,8 @@ def api_update_vacante(empresa_id, empresa, vacante_id):
         else:
             return jsonify({"success": False, "error": "Failed to update vacante"}), 500
 
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         return (
             jsonify({"success": False, "error": f"Internal server error: {str(e)}"}),
@@ -955,6 +1382,7 @@ def api_delete_vacante(empresa_id, empresa, vacante_id):
 
         # Delete the vacante
         if delete_vacante(vacante_id):
+            webhooks.emit(empresa, "vacante.deleted", {"vacante_id": vacante_id})
             return (
                 jsonify(
                     {
@@ -968,6 +1396,8 @@ def api_delete_vacante(empresa_id, empresa, vacante_id):
         else:
             return jsonify({"success": False, "error": "Failed to delete vacante"}), 500
 
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         return (
             jsonify({"success": False, "error": f"Internal server error: {str(e)}"}),
@@ -975,5 +1405,92 @@ def api_delete_vacante(empresa_id, empresa, vacante_id):
         )
 
 
+@app.route("/api/webhooks", methods=["GET"])
+@require_api_key
+def api_get_webhooks(empresa_id, empresa):
+    """
+    GET /api/webhooks
+    Lists the empresa's webhook subscriptions (without their secrets).
+    """
+    subscriptions = empresa.get("webhooks") or []
+    return (
+        jsonify(
+            {
+                "success": True,
+                "webhooks": [webhooks.public_view(s) for s in subscriptions],
+                "events": list(webhooks.EVENTS),
+            }
+        ),
+        200,
+    )
+
+
+@app.route("/api/webhooks", methods=["POST"])
+@require_api_key
+def api_create_webhook(empresa_id, empresa):
+    """
+    POST /api/webhooks
+    Subscribes a URL to events (all of them if "eventos" is omitted).
+    The signing secret is only returned in this response.
+    """
+    data = request.get_json(silent=True) or {}
+
+    error = webhooks.validate_url(data.get("url"))
+    eventos = data.get("eventos", list(webhooks.EVENTS))
+    if error is None and (
+        not isinstance(eventos, list)
+        or not eventos
+        or any(evento not in webhooks.EVENTS for evento in eventos)
+    ):
+        error = f"Field 'eventos' must be a list of: {', '.join(webhooks.EVENTS)}"
+    if error is None and len(empresa.get("webhooks") or []) >= webhooks.MAX_WEBHOOKS:
+        error = f"At most {webhooks.MAX_WEBHOOKS} webhooks per empresa"
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    subscription = webhooks.new_subscription(data["url"], dict.fromkeys(eventos))
+    if not add_empresa_webhook(empresa_id, subscription):
+        return jsonify({"success": False, "error": "Failed to create webhook"}), 500
+
+    return jsonify({"success": True, "webhook": subscription}), 201
+
+
+def find_webhook(empresa, webhook_id):
+    return next(
+        (s for s in empresa.get("webhooks") or [] if s.get("id") == webhook_id), None
+    )
+
+
+@app.route("/api/webhooks/<webhook_id>", methods=["DELETE"])
+@require_api_key
+def api_delete_webhook(empresa_id, empresa, webhook_id):
+    """
+    DELETE /api/webhooks/{id}
+    Removes a webhook subscription; pending deliveries to it are dropped.
+    """
+    subscription = find_webhook(empresa, webhook_id)
+    if subscription is None:
+        return jsonify({"success": False, "error": "Webhook not found"}), 404
+
+    if not remove_empresa_webhook(empresa_id, subscription):
+        return jsonify({"success": False, "error": "Failed to delete webhook"}), 500
+
+    return jsonify({"success": True, "webhook_id": webhook_id}), 200
+
+
+@app.route("/api/webhooks/<webhook_id>/test", methods=["POST"])
+@require_api_key
+def api_test_webhook(empresa_id, empresa, webhook_id):
+    """
+    POST /api/webhooks/{id}/test
+    Sends a "ping" event to one webhook to check the receiver.
+    """
+    if find_webhook(empresa, webhook_id) is None:
+        return jsonify({"success": False, "error": "Webhook not found"}), 404
+
+    webhooks.emit(empresa, webhooks.PING, {"webhook_id": webhook_id}, webhook_id)
+    return jsonify({"success": True, "message": "Ping queued"}), 202
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,546 @@
+"""
+Async (ASGI) serving mode for the /api/* endpoints.
+
+The REST API spends almost all of its time waiting on Firestore, so here it is
+served by plain ASGI handlers that talk to the Firestore AsyncClient. One
+process can then keep hundreds of integration requests in flight instead of
+pinning a sync gunicorn worker per request. Every other path is handed to the
+regular Flask app, as are the /api/* routes with no native handler here (the
+webhook management endpoints), so this module is a drop-in entrypoint:
+
+    gunicorn -k uvicorn.workers.UvicornWorker backend.asgi_api:app
+
+Responses (status codes, JSON bodies and error messages) match the Flask
+versions in app.py.
+"""
+
+import asyncio
+import json
+import math
+import re
+
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import app as flask_app
+from backend.rate_limit import api_rate_limiter
+from backend.resilience import (
+    FirestoreCircuitOpenError,
+    FirestoreDeadlineError,
+    FirestoreUnavailableError,
+    breaker,
+)
+from backend.validation import VACANTE, first_error
+from backend import idempotency, query_budget, shared_cache, webhooks
+from backend.firebase_async import (
+    get_empresa_by_id_async,
+    get_vacantes_by_empresa_id_async,
+    get_vacante_by_id_async,
+    create_vacante_async,
+    update_vacante_async,
+    delete_vacante_async,
+)
+
+# Same header names accepted by require_api_key in app.py
+API_KEY_HEADERS = [b"x-api-key", b"api_key", b"api-key", b"apikey"]
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+]
+
+VACANTE_PATH = re.compile(r"^/api/vacante/(?P<vacante_id>[^/]+)$")
+
+wsgi_fallback = WSGIMiddleware(flask_app)
+
+
+class ApiRequest:
+    """
+    Minimal view of an ASGI HTTP request (method, headers and body).
+    """
+
+    __slots__ = ("method", "path", "headers", "body", "rate_limit")
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        # ASGI servers send lowercase header names
+        self.headers = dict(scope.get("headers") or [])
+        self.body = body
+        self.rate_limit = None
+
+    def header(self, name):
+        value = self.headers.get(name)
+        return value.decode("latin-1") if value is not None else None
+
+    def api_key(self):
+        for name in API_KEY_HEADERS:
+            value = self.header(name)
+            if value:
+                return value
+        return None
+
+    def get_json(self):
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+async def read_body(receive):
+    """
+    Reads the full request body from the ASGI receive channel.
+    """
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def send_json(send, payload, status=200, extra_headers=None):
+    body = json.dumps(payload, default=str).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ] + CORS_HEADERS
+    if extra_headers:
+        headers += [
+            (name.lower().encode(), value.encode())
+            for name, value in extra_headers.items()
+        ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_preflight(send):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 204,
+            "headers": CORS_HEADERS
+            + [
+                (b"access-control-allow-methods", b"GET, POST, PUT, DELETE, OPTIONS"),
+                (b"access-control-allow-headers", b"*"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": b""})
+
+
+def check_request_headers(req):
+    """
+    Header checks from require_api_key that need no Firestore round trip.
+    Returns (api_key, None) if they pass, otherwise (None, (payload, status)).
+    """
+    if req.header(b"content-type") != "application/json":
+        return None, (
+            {"success": False, "error": "Content-Type must be application/json"},
+            415,
+        )
+
+    api_key = req.api_key()
+    if not api_key:
+        return None, (
+            {
+                "success": False,
+                "error": "X-API-Key header is required (also accepts API_KEY, Api-Key)",
+            },
+            401,
+        )
+
+    return api_key, None
+
+
+async def check_empresa(empresa, api_key, rate_limit):
+    """
+    Firestore-dependent part of require_api_key.
+    Returns None if the empresa may use the API, otherwise (payload, status).
+    """
+    if not empresa:
+        return {"success": False, "error": "Invalid API key"}, 401
+
+    plan = api_rate_limiter.resolve_plan(empresa.get("plan"))
+    if rate_limit.needs_plan(plan):
+        await asyncio.to_thread(api_rate_limiter.set_plan, api_key, plan)
+
+    if not empresa.get("suscripcionActiva", False):
+        return (
+            {
+                "success": False,
+                "error": "Active subscription required to use the API",
+            },
+            403,
+        )
+
+    return None
+
+
+def firestore_unavailable(error, path):
+    """
+    Same 503 answer as the Flask error handler for FirestoreUnavailableError.
+    Returns (payload, status, headers).
+    """
+    if isinstance(error, FirestoreCircuitOpenError):
+        reason = "circuit_open"
+    elif isinstance(error, FirestoreDeadlineError):
+        reason = "timeout"
+    else:
+        reason = "unavailable"
+
+    print(f"Firestore unavailable ({reason}) on {path}: {error}")
+
+    return (
+        {
+            "success": False,
+            "error": "Service temporarily unavailable, please retry later",
+            "reason": reason,
+        },
+        503,
+        {"Retry-After": str(max(1, math.ceil(breaker.retry_after())))},
+    )
+
+
+def vacante_belongs_to(vacante, empresa_id):
+    return vacante is not None and vacante.empresa_doc_id == empresa_id
+
+
+NOT_OWNED = (
+    {
+        "success": False,
+        "error": "Vacante not found or does not belong to your empresa",
+    },
+    404,
+)
+
+
+async def api_get_vacantes(req, api_key):
+    """
+    GET /api/vacantes
+    The API key is the empresa doc ID, so the key check and the vacantes
+    query are independent and run concurrently. Listings come from the
+    shared cache when they are there (see the Flask route).
+    """
+    cache_key = shared_cache.listing_key(api_key)
+    cached = await asyncio.to_thread(shared_cache.shared_cache.get, cache_key)
+    if cached is shared_cache.MISS:
+        empresa, vacantes = await asyncio.gather(
+            get_empresa_by_id_async(api_key),
+            get_vacantes_by_empresa_id_async(api_key),
+        )
+        vacantes_list = [vacante.to_json() for vacante in vacantes]
+    else:
+        empresa = await get_empresa_by_id_async(api_key)
+        vacantes_list = cached
+
+    error = await check_empresa(empresa, api_key, req.rate_limit)
+    if error:
+        return error
+
+    if cached is shared_cache.MISS and vacantes_list:
+        await asyncio.to_thread(
+            shared_cache.shared_cache.set,
+            cache_key,
+            vacantes_list,
+            shared_cache.LISTING_TTL,
+        )
+    return {
+        "success": True,
+        "count": len(vacantes_list),
+        "vacantes": vacantes_list,
+    }, 200
+
+
+async def api_create_vacante(req, api_key):
+    """
+    POST /api/vacante
+    nombreEmpresa comes from the empresa document, so the write waits for it.
+    Honours the Idempotency-Key header like the Flask route.
+    """
+    empresa = await get_empresa_by_id_async(api_key)
+
+    error = await check_empresa(empresa, api_key, req.rate_limit)
+    if error:
+        return error
+
+    idempotency_key = req.header(b"idempotency-key")
+    if not idempotency_key:
+        return await create_vacante_from_request(req, api_key, empresa)
+
+    if len(idempotency_key) > 255:
+        return (
+            {
+                "success": False,
+                "error": "Idempotency-Key must be at most 255 characters",
+            },
+            400,
+        )
+
+    key = idempotency.scoped_key(api_key, idempotency_key)
+    request_fingerprint = idempotency.fingerprint(req.body)
+    store = idempotency.idempotency_store
+
+    try:
+        state, stored = await asyncio.to_thread(store.begin, key, request_fingerprint)
+    except Exception as e:
+        print(f"Error reading idempotency store: {e}")
+        return await create_vacante_from_request(req, api_key, empresa)
+
+    if state == idempotency.REPLAY:
+        status, body = stored
+        return json.loads(body), status
+    if state == idempotency.IN_PROGRESS:
+        return (
+            {
+                "success": False,
+                "error": "A request with this Idempotency-Key is still in progress",
+            },
+            409,
+        )
+    if state == idempotency.MISMATCH:
+        return (
+            {
+                "success": False,
+                "error": "Idempotency-Key was already used with a different request body",
+            },
+            422,
+        )
+
+    try:
+        payload, status = await create_vacante_from_request(req, api_key, empresa)
+    except BaseException:
+        await asyncio.to_thread(store.release, key)
+        raise
+
+    # Server errors are not stored so the client can retry them
+    try:
+        if status >= 500:
+            await asyncio.to_thread(store.release, key)
+        else:
+            await asyncio.to_thread(
+                store.complete,
+                key,
+                request_fingerprint,
+                status,
+                json.dumps(payload).encode("utf-8"),
+            )
+    except Exception as e:
+        print(f"Error writing idempotency store: {e}")
+
+    return payload, status
+
+
+async def create_vacante_from_request(req, api_key, empresa):
+    data = req.get_json()
+
+    if not data:
+        return {"success": False, "error": "Request body is required"}, 400
+
+    vacante_data, errors = VACANTE.validate(data)
+    if errors:
+        return {"success": False, "error": first_error(errors), "errors": errors}, 400
+    vacante_data["nombreEmpresa"] = empresa.get("nombre", "")
+
+    vacante_id, merged = await create_vacante_async(api_key, vacante_data)
+
+    if vacante_id and merged:
+        webhooks.emit(
+            empresa,
+            "vacante.updated",
+            {"vacante_id": vacante_id, "campos": sorted(vacante_data)},
+        )
+        return (
+            {
+                "success": True,
+                "message": "Vacante merged into an existing duplicate",
+                "vacante_id": vacante_id,
+                "merged_into": vacante_id,
+            },
+            200,
+        )
+    if vacante_id:
+        webhooks.emit(
+            empresa,
+            "vacante.created",
+            {"vacante_id": vacante_id, "titulo": vacante_data["titulo"]},
+        )
+        return (
+            {
+                "success": True,
+                "message": "Vacante created successfully",
+                "vacante_id": vacante_id,
+            },
+            201,
+        )
+    return {"success": False, "error": "Failed to create vacante"}, 500
+
+
+async def api_update_vacante(req, api_key, vacante_id):
+    """
+    PUT /api/vacante/{id}
+    The key check and the ownership lookup run concurrently.
+    """
+    empresa, vacante = await asyncio.gather(
+        get_empresa_by_id_async(api_key),
+        get_vacante_by_id_async(vacante_id),
+    )
+
+    error = await check_empresa(empresa, api_key, req.rate_limit)
+    if error:
+        return error
+
+    data = req.get_json()
+
+    if not data:
+        return {"success": False, "error": "Request body is required"}, 400
+
+    if not vacante_belongs_to(vacante, api_key):
+        return NOT_OWNED
+
+    vacante_data, errors = VACANTE.validate(data, partial=True)
+    if errors:
+        return {"success": False, "error": first_error(errors), "errors": errors}, 400
+
+    if not vacante_data:
+        return {"success": False, "error": "No valid fields provided for update"}, 400
+
+    if await update_vacante_async(vacante_id, vacante_data):
+        webhooks.emit(
+            empresa,
+            "vacante.updated",
+            {"vacante_id": vacante_id, "campos": sorted(vacante_data)},
+        )
+        return (
+            {
+                "success": True,
+                "message": "Vacante updated successfully",
+                "vacante_id": vacante_id,
+            },
+            200,
+        )
+    return {"success": False, "error": "Failed to update vacante"}, 500
+
+
+async def api_delete_vacante(req, api_key, vacante_id):
+    """
+    DELETE /api/vacante/{id}
+    The key check and the ownership lookup run concurrently.
+    """
+    empresa, vacante = await asyncio.gather(
+        get_empresa_by_id_async(api_key),
+        get_vacante_by_id_async(vacante_id),
+    )
+
+    error = await check_empresa(empresa, api_key, req.rate_limit)
+    if error:
+        return error
+
+    if not vacante_belongs_to(vacante, api_key):
+        return NOT_OWNED
+
+    if await delete_vacante_async(vacante_id):
+        webhooks.emit(empresa, "vacante.deleted", {"vacante_id": vacante_id})
+        return (
+            {
+                "success": True,
+                "message": "Vacante deleted successfully",
+                "vacante_id": vacante_id,
+            },
+            200,
+        )
+    return {"success": False, "error": "Failed to delete vacante"}, 500
+
+
+def route_rule(path):
+    """
+    The Flask rule of an API path, to label its Firestore usage the same
+    way in both servers.
+    """
+    if VACANTE_PATH.match(path):
+        return "/api/vacante/<vacante_id>"
+    return path
+
+
+def resolve_route(method, path):
+    """
+    Returns (handler, path_kwargs) for an API path, or (None, None).
+    """
+    if path == "/api/vacantes" and method == "GET":
+        return api_get_vacantes, {}
+    if path == "/api/vacante" and method == "POST":
+        return api_create_vacante, {}
+
+    match = VACANTE_PATH.match(path)
+    if match:
+        if method == "PUT":
+            return api_update_vacante, match.groupdict()
+        if method == "DELETE":
+            return api_delete_vacante, match.groupdict()
+
+    return None, None
+
+
+async def app(scope, receive, send):
+    """
+    ASGI entrypoint. The /api/* routes in resolve_route are served natively,
+    everything else by Flask.
+    """
+    if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+        if scope["type"] == "lifespan":
+            # Nothing to set up; Firebase is initialized when app.py is imported
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        await wsgi_fallback(scope, receive, send)
+        return
+
+    if scope["method"] == "OPTIONS":
+        await send_preflight(send)
+        return
+
+    handler, path_kwargs = resolve_route(scope["method"], scope["path"])
+    if handler is None:
+        await wsgi_fallback(scope, receive, send)
+        return
+
+    req = ApiRequest(scope, await read_body(receive))
+
+    api_key, error = check_request_headers(req)
+    if error:
+        await send_json(send, *error)
+        return
+
+    # Rate limit per API key before spending a Firestore read on it
+    client = scope.get("client")
+    req.rate_limit = await asyncio.to_thread(
+        api_rate_limiter.hit, api_key, client[0] if client else None
+    )
+    if not req.rate_limit.allowed:
+        await send_json(
+            send,
+            {"success": False, "error": "Rate limit exceeded"},
+            429,
+            req.rate_limit.headers(),
+        )
+        return
+
+    try:
+        with query_budget.checked(f"{req.method} {route_rule(req.path)}"):
+            payload, status = await handler(req, api_key, **path_kwargs)
+    except FirestoreUnavailableError as e:
+        payload, status, headers = firestore_unavailable(e, req.path)
+        await send_json(send, payload, status, {**req.rate_limit.headers(), **headers})
+        return
+    except Exception as e:
+        payload, status = (
+            {"success": False, "error": f"Internal server error: {str(e)}"},
+            500,
+        )
+
+    await send_json(send, payload, status, req.rate_limit.headers())
@@ -0,0 +1,285 @@
+"""
+Frequency-weighted prefix tries for autocompleting free-text fields.
+
+One trie per field family:
+    habilidades          vacante habilidadesDuras + alumno habilidades_tecnicas
+    habilidades_blandas  alumno habilidades_blandas
+    idiomas              vacante idiomas + alumno idiomas
+    titulos              vacante titulo
+
+Keys are accent-folded and lowercased, so "Inglés" and "ingles" count as one
+term; suggestions show the most common spelling. Every node caches its top
+TOP_K completions, so a lookup is a walk down the prefix plus a slice, with
+no subtree traversal per keystroke. Counts are updated incrementally per
+document: set_document replaces what a document contributed before.
+"""
+
+import os
+import threading
+
+from backend import snapshot
+from backend.live_index import LiveIndex
+from backend.text import fold
+
+TOP_K = 10
+
+FIELDS = ("habilidades", "habilidades_blandas", "idiomas", "titulos")
+
+
+def split_terms(value):
+    """
+    Normalizes a field value to a list of terms. Accepts lists (vacantes)
+    and comma-separated strings (alumnos).
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [term.strip() for term in value if term and term.strip()]
+
+
+class TrieNode:
+    __slots__ = ("children", "count", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0  # documents using the term that ends here
+        self.top = ()  # ((count, key), ...) best completions in this subtree
+
+
+class PrefixTrie:
+    """
+    Prefix trie with per-node cached top-k completions.
+    """
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.root = TrieNode()
+        self.surfaces = {}  # key -> {surface form: count}
+        self.lock = threading.Lock()
+
+    def add(self, term, delta=1):
+        key = fold(term).strip()
+        if not key:
+            return
+        with self.lock:
+            path = [self.root]
+            node = self.root
+            for ch in key:
+                child = node.children.get(ch)
+                if child is None:
+                    child = node.children[ch] = TrieNode()
+                node = child
+                path.append(node)
+            node.count = max(0, node.count + delta)
+
+            surfaces = self.surfaces.setdefault(key, {})
+            surfaces[term] = surfaces.get(term, 0) + delta
+            if surfaces[term] <= 0:
+                del surfaces[term]
+            if not surfaces:
+                del self.surfaces[key]
+
+            # Refresh cached completions bottom-up along the path
+            for depth in range(len(path) - 1, -1, -1):
+                self._refresh(path[depth], key[:depth])
+
+    def _refresh(self, node, prefix):
+        candidates = []
+        if node.count > 0:
+            candidates.append((node.count, prefix))
+        for child in node.children.values():
+            candidates.extend(child.top)
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        node.top = tuple(candidates[: self.top_k])
+
+    def complete(self, prefix, k=TOP_K):
+        """
+        Returns up to k (display term, count) pairs starting with prefix.
+        """
+        key = fold(prefix).strip()
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        results = []
+        for count, term_key in node.top[:k]:
+            surfaces = self.surfaces.get(term_key)
+            display = max(surfaces, key=surfaces.get) if surfaces else term_key
+            results.append((display, count))
+        return results
+
+
+class AutocompleteIndex:
+    """
+    One PrefixTrie per field, with per-document bookkeeping so documents can
+    be updated or removed without rebuilding.
+    """
+
+    def __init__(self):
+        self.tries = {field: PrefixTrie() for field in FIELDS}
+        self.documents = {}  # doc key -> {field: {folded key: surface form}}
+        self.lock = threading.Lock()
+
+    def set_document(self, doc_key, fields, partial=False):
+        """
+        Records the terms of a document. fields maps field name to a list of
+        terms. With partial=True, fields not given keep their old terms.
+        """
+        with self.lock:
+            old = self.documents.get(doc_key, {})
+            new = dict(old) if partial else {}
+            for field, terms in fields.items():
+                keyed = {fold(term): term for term in terms}
+                if keyed:
+                    new[field] = keyed
+                else:
+                    new.pop(field, None)
+
+            for field in FIELDS:
+                old_terms = old.get(field, {})
+                new_terms = new.get(field, {})
+                trie = self.tries[field]
+                for key, term in old_terms.items():
+                    if new_terms.get(key) != term:
+                        trie.add(term, -1)
+                for key, term in new_terms.items():
+                    if old_terms.get(key) != term:
+                        trie.add(term, 1)
+
+            if new:
+                self.documents[doc_key] = new
+            else:
+                self.documents.pop(doc_key, None)
+
+    @classmethod
+    def from_snapshot(cls, loaded):
+        """
+        Index of the vacantes in a snapshot catalog (alumnos not included).
+        """
+        index = cls()
+        for record in loaded.catalog:
+            index.set_document(("vacante", record["id"]), vacante_terms(record))
+        return index
+
+    def remove_document(self, doc_key):
+        self.set_document(doc_key, {})
+
+    def complete(self, field, prefix, k=TOP_K):
+        trie = self.tries.get(field)
+        if trie is None:
+            return []
+        return trie.complete(prefix, k)
+
+
+def vacante_terms(vacante):
+    """
+    Autocomplete terms of a Vacante model or a vacante dict.
+    """
+    if isinstance(vacante, dict):
+        get = vacante.get
+    else:
+        get = lambda field: getattr(vacante, field, None)
+    titulo = get("titulo")
+    return {
+        "habilidades": split_terms(get("habilidadesDuras")),
+        "idiomas": split_terms(get("idiomas")),
+        "titulos": [titulo.strip()] if titulo and titulo.strip() else [],
+    }
+
+
+def alumno_terms(alumno):
+    """
+    Autocomplete terms present in an alumno dict (full or partial update).
+    """
+    fields = {}
+    if "habilidades_tecnicas" in alumno:
+        fields["habilidades"] = split_terms(alumno["habilidades_tecnicas"])
+    if "habilidades_blandas" in alumno:
+        fields["habilidades_blandas"] = split_terms(alumno["habilidades_blandas"])
+    if "idiomas" in alumno:
+        fields["idiomas"] = split_terms(alumno["idiomas"])
+    return fields
+
+
+# Vacante fields whose update requires re-indexing
+INDEXED_FIELDS = frozenset({"titulo", "habilidadesDuras", "idiomas", "activa"})
+
+INDEX_MAX_AGE = float(os.getenv("AUTOCOMPLETE_INDEX_MAX_AGE", "600"))
+
+
+def apply_vacante(index, vacante_id, vacante):
+    """
+    Inactive vacantes stop contributing terms.
+    """
+    active = (
+        vacante.get("activa", True) if isinstance(vacante, dict) else vacante.activa
+    )
+    if active is False:
+        index.remove_document(("vacante", vacante_id))
+    else:
+        index.set_document(("vacante", vacante_id), vacante_terms(vacante))
+
+
+def build_index():
+    """
+    Builds the tries from every active vacante (from the vacantes snapshot
+    when there is a current one) and every alumno.
+    """
+    # Imported here: firebase imports this module for its write hooks
+    from firebase import get_active_vacantes, get_all_alumnos
+
+    index = snapshot.restore(AutocompleteIndex.from_snapshot, apply_vacante)
+    if index is None:
+        index = AutocompleteIndex()
+        for vacante in get_active_vacantes():
+            index.set_document(("vacante", vacante.id), vacante_terms(vacante))
+    for alumno in get_all_alumnos():
+        index.set_document(("alumno", alumno.doc_id), alumno_terms(alumno.to_dict()))
+    return index
+
+
+_live = LiveIndex("autocomplete index", build_index, INDEX_MAX_AGE)
+
+
+def get_index():
+    """
+    Returns the index, building it on first use and refreshing it in the
+    background (to pick up other workers' writes) once it is older than
+    AUTOCOMPLETE_INDEX_MAX_AGE seconds.
+    """
+    return _live.get()
+
+
+def is_loaded():
+    return _live.is_loaded()
+
+
+def autocomplete(field, prefix, k=TOP_K):
+    """
+    Returns up to k suggestions (display term, count) for prefix in field.
+    """
+    return get_index().complete(field, prefix, k)
+
+
+def index_vacante(vacante_id, vacante):
+    """
+    Write hook for vacantes (see apply_vacante).
+    No-op until the index has been built (the build will include it).
+    """
+    _live.apply(lambda index: apply_vacante(index, vacante_id, vacante))
+
+
+def unindex_vacante(vacante_id):
+    _live.apply(lambda index: index.remove_document(("vacante", vacante_id)))
+
+
+def index_alumno(doc_id, data):
+    """
+    Write hook for alumnos; data may be a partial update.
+    """
+    terms = alumno_terms(data)
+    _live.apply(
+        lambda index: index.set_document(("alumno", doc_id), terms, partial=True)
+    )
@@ -0,0 +1,225 @@
+"""
+Bulk import of vacantes from a CSV or XLSX upload.
+
+The first row holds the column names; they are matched without regard to
+case, accents or spaces against COLUMNS (e.g. "Título", "tipo contrato",
+"habilidadesDuras"). Unknown columns are ignored and "titulo" is required.
+Values are validated and coerced with backend.validation.VACANTE, like the
+new vacante form: habilidadesDuras and idiomas are split on commas or
+semicolons and sueldo accepts "15000", "15,000.50" or "$15000".
+
+Rows are parsed one at a time from the uploaded stream (CSV via the csv
+module, XLSX via openpyxl in read-only mode), validated, and written
+IMPORT_CHUNK_SIZE at a time with firebase.create_vacantes_batch, so memory
+holds one chunk and a few thousand rows take a handful of round trips. A
+row that fails validation, or belongs to a chunk whose write failed, is
+reported with its row number instead of aborting the import.
+"""
+
+import csv
+import io
+import os
+
+from backend.resilience import FirestoreUnavailableError
+from backend.skills import normalize_key
+from backend.validation import VACANTE
+from firebase import create_vacantes_batch
+
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "400"))  # Firestore max is 500
+MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "5000"))
+MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_REPORTED_ERRORS = 200
+
+# Folded column name -> VACANTE schema field; nombreEmpresa always comes
+# from the empresa
+COLUMNS = {
+    normalize_key(field).replace(" ", ""): field
+    for field in VACANTE.names
+    if field != "nombreEmpresa"
+}
+COLUMNS.update(
+    {
+        "tipodecontrato": "tipoContrato",
+        "experiencia": "experienciaRequerida",
+        "habilidades": "habilidadesDuras",
+        "salario": "sueldo",
+    }
+)
+
+
+class ImportFormatError(Exception):
+    """
+    The file cannot be read at all (unknown format, no header, no titulo).
+    """
+
+
+def column_map(header):
+    """
+    Returns [(position, field)] for the header cells that name a field.
+    """
+    mapping = []
+    for position, name in enumerate(header):
+        key = normalize_key(str(name or "")).replace(" ", "")
+        field = COLUMNS.get(key)
+        if field and field not in (f for _, f in mapping):
+            mapping.append((position, field))
+    if "titulo" not in (field for _, field in mapping):
+        raise ImportFormatError("El archivo debe tener una columna 'titulo'")
+    return mapping
+
+
+def parse_row(cells, mapping):
+    """
+    Maps one row to create_vacante data with the VACANTE schema. Raises
+    ValueError with the reasons if the row is invalid.
+    """
+    row = {
+        field: cells[position]
+        for position, field in mapping
+        if position < len(cells) and cells[position] is not None
+    }
+    vacante, errors = VACANTE.validate(row, form=True, lang="es")
+    if errors:
+        raise ValueError(" ".join(errors.values()))
+    return vacante
+
+
+def iter_csv(stream):
+    """
+    Yields the rows (lists of strings) of a CSV byte stream. The delimiter
+    (comma, semicolon or tab) is detected from the header line.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    header_line = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield next(csv.reader([header_line], dialect))
+    yield from csv.reader(text, dialect)
+
+
+def iter_xlsx(stream):
+    """
+    Yields the rows of the first sheet of an XLSX byte stream.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("La importación de XLSX requiere openpyxl")
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Archivo XLSX ilegible: {e}")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def iter_rows(stream, filename):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return iter_csv(stream)
+    if extension == ".xlsx":
+        return iter_xlsx(stream)
+    raise ImportFormatError("Formato no soportado: sube un archivo .csv o .xlsx")
+
+
+def import_vacantes(empresa_doc_id, nombre_empresa, stream, filename):
+    """
+    Imports the vacantes in an uploaded file for an empresa.
+
+    Returns:
+        {"procesadas", "creadas", "fusionadas",
+        "vacantes": [{"fila", "id", "titulo", "fusionada", "campos"}],
+        "errores": [{"fila", "error"}], "errores_omitidos"}; fila is the
+        row number in the file (the header is row 1). A re-post merged
+        into an existing vacante (DEDUPE_MODE=merge) is listed with that
+        vacante's id, fusionada true and the fields it wrote (campos), and
+        counted in fusionadas instead of creadas.
+    """
+    rows = iter_rows(stream, filename)
+    try:
+        mapping = column_map(next(rows))
+    except StopIteration:
+        raise ImportFormatError("El archivo está vacío")
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Archivo ilegible: {e}")
+
+    result = {
+        "procesadas": 0,
+        "creadas": 0,
+        "fusionadas": 0,
+        "vacantes": [],
+        "errores": [],
+        "errores_omitidos": 0,
+    }
+
+    def report(line, error):
+        if len(result["errores"]) < MAX_REPORTED_ERRORS:
+            result["errores"].append({"fila": line, "error": error})
+        else:
+            result["errores_omitidos"] += 1
+
+    chunk = []  # (line, vacante data)
+
+    def write_chunk():
+        try:
+            written = create_vacantes_batch(
+                empresa_doc_id, [vacante for _, vacante in chunk]
+            )
+        except FirestoreUnavailableError:
+            # Earlier chunks are already committed, so the report stays valid
+            # and only this chunk's rows are marked for a retry
+            written = None
+            error = "Servicio no disponible, intenta de nuevo más tarde"
+        else:
+            error = "No se pudo guardar la vacante"
+        if written is None:
+            for line, _ in chunk:
+                report(line, error)
+        else:
+            doc_ids, merged = written
+            for (line, vacante), doc_id in zip(chunk, doc_ids):
+                fusionada = doc_id in merged
+                result["fusionadas" if fusionada else "creadas"] += 1
+                entry = {
+                    "fila": line,
+                    "id": doc_id,
+                    "titulo": vacante["titulo"],
+                    "fusionada": fusionada,
+                }
+                if fusionada:
+                    entry["campos"] = sorted(vacante)
+                result["vacantes"].append(entry)
+        chunk.clear()
+
+    line = 1
+    try:
+        for line, cells in enumerate(rows, start=2):
+            if not any(cell not in (None, "") for cell in cells):
+                continue
+            if result["procesadas"] >= MAX_ROWS:
+                report(line, f"Se excedió el máximo de {MAX_ROWS} filas")
+                break
+            result["procesadas"] += 1
+
+            try:
+                vacante = parse_row(cells, mapping)
+            except ValueError as e:
+                report(line, str(e))
+                continue
+            vacante["nombreEmpresa"] = nombre_empresa
+            chunk.append((line, vacante))
+            if len(chunk) >= CHUNK_SIZE:
+                write_chunk()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The rows read so far are still imported
+        report(line + 1, f"Archivo ilegible a partir de esta fila: {e}")
+
+    if chunk:
+        write_chunk()
+    return result
@@ -0,0 +1,273 @@
+"""
+Columnar store of alumno attributes for the empresa candidate search.
+
+Each alumno is one row of a set of NumPy columns:
+
+    semestre  int16    leading number of the free-text field ("5°" -> 5), -1 if unknown
+    promedio  float32  NaN if unknown
+    estatus   int16    category code ("Activo", "Inactivo"), -1 if unknown
+    areas     int32    (n, 3) category codes of area1..area3, -1 if empty
+    skills    uint64   (n, WORDS) bitset of canonical skill IDs from
+                       habilidades_tecnicas, habilidades_blandas and idiomas
+
+A query such as "promedio >= 8.5, semestre >= 6, knows SQL and English"
+becomes a handful of vectorized comparisons and bitwise ANDs over these
+columns, so no Firestore read happens per search.
+
+The store is built from Firestore on first use and kept current by
+firebase.create_alumno / update_alumno. Writes made by other gunicorn
+workers are picked up by a background rebuild once the store is older than
+CANDIDATE_INDEX_MAX_AGE seconds (default 300).
+"""
+
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+from backend import skills
+from backend.live_index import LiveIndex
+from backend.text import fold
+
+WORDS = (len(skills.VOCABULARY) + 63) // 64
+
+# Bits owned by each alumno field, so a partial update can replace them
+FIELD_KINDS = skills.ALUMNO_FIELDS
+KIND_MASKS = {}
+for _skill_id, (_kind, _) in enumerate(skills.VOCABULARY):
+    KIND_MASKS.setdefault(_kind, np.zeros(WORDS, dtype=np.uint64))
+    KIND_MASKS[_kind][_skill_id // 64] |= np.uint64(1 << (_skill_id % 64))
+
+AREA_FIELDS = ("area1", "area2", "area3")
+
+INITIAL_CAPACITY = 1024
+
+SEMESTRE_RE = re.compile(r"\d+")
+SEMESTRE_MAX = np.iinfo(np.int16).max
+
+INDEX_MAX_AGE = float(os.getenv("CANDIDATE_INDEX_MAX_AGE", "300"))
+
+
+def skill_bits(skill_ids):
+    """
+    Returns the bitset (uint64 array of WORDS words) of a list of skill IDs.
+    """
+    bits = np.zeros(WORDS, dtype=np.uint64)
+    for skill_id in skill_ids:
+        bits[skill_id // 64] |= np.uint64(1 << (skill_id % 64))
+    return bits
+
+
+def parse_semestre(value):
+    """
+    Semestre is typed freely ("5", "5°", "Quinto"); keep the leading number.
+    Numbers that do not fit the int16 column ("99999") count as unknown.
+    """
+    if isinstance(value, (int, float)):
+        number = int(value) if math.isfinite(value) else -1
+    else:
+        match = SEMESTRE_RE.search(value) if isinstance(value, str) else None
+        try:
+            number = int(match.group()) if match else -1
+        except ValueError:  # more digits than int() accepts
+            number = -1
+    return number if 0 <= number <= SEMESTRE_MAX else -1
+
+
+def parse_promedio(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return np.nan
+
+
+class Categories:
+    """
+    Maps folded category strings to small integer codes.
+    """
+
+    def __init__(self):
+        self.codes = {}
+
+    def code(self, value, create=True):
+        key = " ".join(fold(value).split()) if isinstance(value, str) else ""
+        if not key:
+            return -1
+        code = self.codes.get(key)
+        if code is None and create:
+            code = self.codes[key] = len(self.codes)
+        return -1 if code is None else code
+
+
+class CandidateStore:
+    """
+    Growable NumPy columns with one row per alumno.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.rows = {}  # doc id -> row
+        self.doc_ids = []  # row -> doc id
+        self.size = 0
+        self.estatus_codes = Categories()
+        self.area_codes = Categories()
+        self.lock = threading.RLock()
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self.size
+
+    def _allocate(self, capacity):
+        self.semestre = np.full(capacity, -1, dtype=np.int16)
+        self.promedio = np.full(capacity, np.nan, dtype=np.float32)
+        self.estatus = np.full(capacity, -1, dtype=np.int16)
+        self.areas = np.full((capacity, len(AREA_FIELDS)), -1, dtype=np.int32)
+        self.skills = np.zeros((capacity, WORDS), dtype=np.uint64)
+
+    def _grow(self):
+        old = (self.semestre, self.promedio, self.estatus, self.areas, self.skills)
+        self._allocate(len(self.semestre) * 2)
+        for new, column in zip(
+            (self.semestre, self.promedio, self.estatus, self.areas, self.skills),
+            old,
+        ):
+            new[: len(column)] = column
+
+    def set_alumno(self, doc_id, data):
+        """
+        Inserts or updates the row of an alumno. data may be a partial update:
+        only the columns of the fields present are changed.
+        """
+        with self.lock:
+            row = self.rows.get(doc_id)
+            if row is None:
+                if self.size == len(self.semestre):
+                    self._grow()
+                row = self.rows[doc_id] = self.size
+                self.doc_ids.append(doc_id)
+                self.size += 1
+
+            if "semestre" in data:
+                self.semestre[row] = parse_semestre(data["semestre"])
+            if "promedio" in data:
+                self.promedio[row] = parse_promedio(data["promedio"])
+            if "estatus" in data:
+                self.estatus[row] = self.estatus_codes.code(data["estatus"])
+            for column, field in enumerate(AREA_FIELDS):
+                if field in data:
+                    self.areas[row, column] = self.area_codes.code(data[field])
+            for field, kind in FIELD_KINDS.items():
+                if field in data:
+                    self.skills[row] &= ~KIND_MASKS[kind]
+                    self.skills[row] |= skill_bits(skills.skill_ids(data[field], kind))
+
+    def search(
+        self,
+        promedio_min=None,
+        semestre_min=None,
+        semestre_max=None,
+        estatus=None,
+        area=None,
+        skill_ids=(),
+        offset=0,
+        limit=20,
+    ):
+        """
+        Returns (total matches, page of doc IDs). Results are ordered by
+        promedio, highest first; alumnos without promedio go last.
+        """
+        with self.lock:
+            n = self.size
+            mask = np.ones(n, dtype=bool)
+
+            if promedio_min is not None:
+                # NaN compares False, so unknown promedios are excluded
+                mask &= self.promedio[:n] >= promedio_min
+            if semestre_min is not None:
+                mask &= self.semestre[:n] >= semestre_min
+            if semestre_max is not None:
+                semestre = self.semestre[:n]
+                mask &= (semestre >= 0) & (semestre <= semestre_max)
+            if estatus:
+                code = self.estatus_codes.code(estatus, create=False)
+                mask &= self.estatus[:n] == code if code >= 0 else False
+            if area:
+                code = self.area_codes.code(area, create=False)
+                mask &= (self.areas[:n] == code).any(axis=1) if code >= 0 else False
+            if skill_ids:
+                required = skill_bits(skill_ids)
+                mask &= ((self.skills[:n] & required) == required).all(axis=1)
+
+            rows = np.flatnonzero(mask)
+            promedio = np.nan_to_num(self.promedio[rows], nan=-np.inf)
+            # Stable sort keeps insertion order among equal promedios
+            ordered = rows[np.argsort(-promedio, kind="stable")]
+            page = ordered[offset : offset + limit]
+            return len(rows), [self.doc_ids[row] for row in page]
+
+
+def resolve_skills(terms):
+    """
+    Maps free-text skill and language names to skill IDs, trying each kind
+    of vocabulary. Returns (skill IDs, terms that matched nothing).
+    """
+    ids = []
+    unknown = []
+    for term in skills.split_terms(terms):
+        for kind in (skills.HABILIDADES, skills.IDIOMAS, skills.HABILIDADES_BLANDAS):
+            _, skill_id = skills.canonicalize(term, kind)
+            if skill_id is not None:
+                ids.append(skill_id)
+                break
+        else:
+            unknown.append(term.strip())
+    return ids, unknown
+
+
+def build_store():
+    """
+    Builds a fresh store from every alumno in Firestore.
+    """
+    # Imported here: firebase imports this module for its write hooks
+    from firebase import get_all_alumnos
+
+    store = CandidateStore()
+    for alumno in get_all_alumnos():
+        try:
+            store.set_alumno(alumno.doc_id, alumno.to_dict())
+        except Exception as e:
+            # One malformed alumno must not keep the whole store from building
+            print(f"Error indexing alumno {alumno.doc_id} as a candidate: {e}")
+    return store
+
+
+_live = LiveIndex("candidate store", build_store, INDEX_MAX_AGE)
+
+
+def get_store():
+    """
+    Returns the candidate store, building it on first use and refreshing it
+    in the background once it is older than CANDIDATE_INDEX_MAX_AGE.
+    """
+    return _live.get()
+
+
+def is_loaded():
+    return _live.is_loaded()
+
+
+def search_candidates(**filters):
+    """
+    Filters alumnos by the given criteria (see CandidateStore.search).
+    Returns (total matches, page of doc IDs).
+    """
+    return get_store().search(**filters)
+
+
+def index_alumno(doc_id, data):
+    """
+    Write hook for alumnos; data may be a partial update.
+    No-op until the store has been built (the build will include it).
+    """
+    _live.apply(lambda store: store.set_alumno(doc_id, data))
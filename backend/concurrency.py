@@ -0,0 +1,61 @@
+"""
+Small helper to issue independent blocking calls (mostly Firestore reads)
+in parallel from a request thread.
+
+All callers share one bounded thread pool, so a burst of dashboard requests
+cannot spawn an unbounded number of threads against Firestore. The pool size
+is read from FIRESTORE_FANOUT_WORKERS (default 8).
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the shared thread pool, creating it on first use.
+    Created lazily so each gunicorn worker builds its own after fork.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = int(os.getenv("FIRESTORE_FANOUT_WORKERS", "8"))
+                _executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="firestore-fanout"
+                )
+    return _executor
+
+
+def run_parallel(*calls):
+    """
+    Runs independent zero-argument callables concurrently and returns their
+    results in the same order. Use functools.partial or a lambda to bind
+    arguments:
+
+        empresa, vacantes = run_parallel(
+            partial(get_empresa_by_id, doc_id),
+            partial(get_vacantes_by_empresa_id, doc_id),
+        )
+
+    A single call runs inline on the caller's thread. An exception raised by
+    any call is re-raised on the caller's thread. Calls run in a copy of the
+    caller's context, so context variables (e.g. backend.query_budget's
+    per-request recorder) follow them to the pool.
+    """
+    if len(calls) == 1:
+        return [calls[0]()]
+
+    executor = get_executor()
+    # The caller's thread runs the first call itself instead of idling
+    futures = [
+        executor.submit(contextvars.copy_context().run, call) for call in calls[1:]
+    ]
+    results = [calls[0]()]
+    results.extend(future.result() for future in futures)
+    return results
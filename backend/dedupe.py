@@ -0,0 +1,369 @@
+"""
+Near-duplicate detection for vacantes with MinHash and LSH.
+
+The text of a vacante (titulo + descripcion + requisitos) goes through
+backend.text.analyze and is cut into overlapping word shingles. Its MinHash
+signature (NUM_PERM minimums of random hash permutations) estimates the
+Jaccard similarity between two shingle sets: the fraction of equal
+positions. Signatures are split into BANDS bands of ROWS values; two
+vacantes become candidates when any band matches exactly, so a lookup only
+touches a few buckets instead of every vacante. Candidates are then
+confirmed with the estimated similarity (DEDUPE_THRESHOLD, default 0.7).
+
+Only vacantes of the same empresa are compared: different companies may
+legitimately share templated text.
+
+At write time firebase.create_vacante either flags a re-post with
+duplicadoDe (DEDUPE_MODE=flag, the default), merges it into the existing
+vacante (DEDUPE_MODE=merge, opt-in: no new vacante is created, and callers
+report the merge), or does nothing (DEDUPE_MODE=off). The existing
+collection can be deduplicated with:
+
+    python -m backend.dedupe [--apply]
+
+which lists each cluster and, with --apply, deactivates every copy except
+the most recently updated one, setting duplicadoDe on them.
+"""
+
+import os
+import sys
+import threading
+import zlib
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backend import snapshot
+from backend.live_index import LiveIndex
+from backend.text import analyze
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS  # candidate threshold ~ (1 / BANDS) ** (1 / ROWS) = 0.42
+# Word pairs: a re-post with a couple of edits stays around 0.75 similar,
+# while different vacantes of the same kind score around 0.1
+SHINGLE_SIZE = 2
+
+THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.7"))
+MODE = os.getenv("DEDUPE_MODE", "flag")  # flag, merge or off
+
+TEXT_FIELDS = ("titulo", "descripcion", "requisitos")
+
+# Sort key for vacantes without timestamps (Firestore returns aware datetimes)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Vacante fields whose update requires re-indexing
+INDEXED_FIELDS = frozenset(TEXT_FIELDS) | {"activa"}
+
+INDEX_MAX_AGE = float(os.getenv("DEDUPE_INDEX_MAX_AGE", "300"))
+
+# Universal hashing (a * x + b) mod p with a Mersenne prime; x < p keeps the
+# product below 2**62, so it fits in uint64 without overflow
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(0x5EED)
+PERM_A = _rng.integers(1, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.integers(0, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+
+
+def vacante_text(vacante):
+    if isinstance(vacante, dict):
+        get = vacante.get
+    else:
+        get = lambda field: getattr(vacante, field, None)
+    return " ".join(get(field) or "" for field in TEXT_FIELDS)
+
+
+def shingles(text):
+    """
+    Returns the set of word shingles of text (the whole text if shorter).
+    """
+    terms = analyze(text)
+    if len(terms) <= SHINGLE_SIZE:
+        return {" ".join(terms)} if terms else set()
+    return {
+        " ".join(terms[i : i + SHINGLE_SIZE])
+        for i in range(len(terms) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """
+    Returns the MinHash signature (uint32 array of NUM_PERM values) of text,
+    or None if it has no terms.
+    """
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set),
+        dtype=np.uint64,
+        count=len(shingle_set),
+    )
+    hashes %= MERSENNE_PRIME
+    permuted = (np.outer(hashes, PERM_A) + PERM_B) % MERSENNE_PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of the shingle sets behind two signatures.
+    """
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_PERM
+
+
+def band_keys(sig):
+    return [
+        (band, sig[band * ROWS : (band + 1) * ROWS].tobytes()) for band in range(BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    LSH buckets of MinHash signatures, scoped by empresa.
+    """
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.signatures = {}  # vacante id -> (empresa id, signature)
+        self.buckets = {}  # (empresa id, band, band bytes) -> set of vacante ids
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, vacante_id, empresa_id, text):
+        self.add_signature(vacante_id, empresa_id, signature(text))
+
+    def add_signature(self, vacante_id, empresa_id, sig):
+        with self.lock:
+            self.remove(vacante_id)
+            if sig is None:
+                return
+            self.signatures[vacante_id] = (empresa_id, sig)
+            for band, key in band_keys(sig):
+                self.buckets.setdefault((empresa_id, band, key), set()).add(vacante_id)
+
+    def remove(self, vacante_id):
+        with self.lock:
+            entry = self.signatures.pop(vacante_id, None)
+            if entry is None:
+                return
+            empresa_id, sig = entry
+            for band, key in band_keys(sig):
+                bucket = self.buckets.get((empresa_id, band, key))
+                if bucket is not None:
+                    bucket.discard(vacante_id)
+                    if not bucket:
+                        del self.buckets[(empresa_id, band, key)]
+
+    @classmethod
+    def from_snapshot(cls, loaded):
+        """
+        Index over the signatures of a snapshot; each signature is a view of
+        the mapped file.
+        """
+        index = cls()
+        catalog = loaded.catalog
+        rows = loaded.array("dedupe.rows", "I")
+        signatures = loaded.numpy("dedupe.signatures", np.uint32).reshape(-1, NUM_PERM)
+        for position, sig in zip(rows, signatures):
+            record = catalog[position]
+            index.add_signature(record["id"], record["empresa"], sig)
+        return index
+
+    def candidates(self, empresa_id, sig):
+        with self.lock:
+            found = set()
+            for band, key in band_keys(sig):
+                found.update(self.buckets.get((empresa_id, band, key), ()))
+            return found
+
+    def find(self, empresa_id, text, exclude=None):
+        """
+        Returns [(vacante id, similarity)] of the empresa's vacantes similar
+        to text, most similar first.
+        """
+        sig = signature(text)
+        if sig is None:
+            return []
+        matches = []
+        with self.lock:
+            for vacante_id in self.candidates(empresa_id, sig):
+                if vacante_id == exclude:
+                    continue
+                score = similarity(sig, self.signatures[vacante_id][1])
+                if score >= self.threshold:
+                    matches.append((vacante_id, score))
+        matches.sort(key=lambda item: -item[1])
+        return matches
+
+
+def empresa_id_of(vacante):
+    """
+    Empresa doc ID of a Vacante model or of the dict written to Firestore
+    (where empresaId is a DocumentReference).
+    """
+    if not isinstance(vacante, dict):
+        return vacante.empresa_doc_id
+    empresa_ref = vacante.get("empresaId")
+    return getattr(empresa_ref, "id", empresa_ref)
+
+
+def is_active(vacante):
+    if isinstance(vacante, dict):
+        return vacante.get("activa", True) is not False
+    return vacante.activa is not False
+
+
+def apply_vacante(index, vacante_id, vacante):
+    if is_active(vacante):
+        index.add(vacante_id, empresa_id_of(vacante), vacante_text(vacante))
+    else:
+        index.remove(vacante_id)
+
+
+def snapshot_sections(vacantes):
+    """
+    Signatures of the vacantes (in catalog order) as snapshot sections:
+    dedupe.rows holds the catalog position of each dedupe.signatures row.
+    """
+    rows = array("I")
+    signatures = []
+    for position, vacante in enumerate(vacantes):
+        sig = signature(vacante_text(vacante))
+        if sig is not None:
+            rows.append(position)
+            signatures.append(sig)
+    matrix = np.array(signatures, dtype=np.uint32).reshape(-1, NUM_PERM)
+    return {"dedupe.rows": rows, "dedupe.signatures": matrix.tobytes()}
+
+
+def build_index():
+    """
+    Builds a fresh index from the vacantes snapshot (caught up with later
+    writes) or else from every active vacante in Firestore.
+    """
+    index = snapshot.restore(DuplicateIndex.from_snapshot, apply_vacante)
+    if index is not None:
+        return index
+
+    # Imported here: firebase imports this module for its write hooks
+    from firebase import get_active_vacantes
+
+    index = DuplicateIndex()
+    for vacante in get_active_vacantes():
+        index.add(vacante.id, vacante.empresa_doc_id, vacante_text(vacante))
+    return index
+
+
+_live = LiveIndex("duplicate index", build_index, INDEX_MAX_AGE)
+
+
+def get_index():
+    """
+    Returns the duplicate index, building it on first use and refreshing it
+    in the background once it is older than DEDUPE_INDEX_MAX_AGE.
+    """
+    return _live.get()
+
+
+def is_loaded():
+    return _live.is_loaded()
+
+
+def find_duplicate(empresa_id, vacante):
+    """
+    Returns the ID of the empresa's active vacante that vacante (a dict or
+    model) most likely duplicates, or None. Always None with DEDUPE_MODE=off.
+    """
+    if MODE == "off":
+        return None
+    matches = get_index().find(empresa_id, vacante_text(vacante))
+    return matches[0][0] if matches else None
+
+
+def index_vacante(vacante_id, vacante):
+    """
+    Write hook: (re)indexes a vacante, or drops it if it is inactive.
+    No-op until the index has been built (the build will include it).
+    """
+    _live.apply(lambda index: apply_vacante(index, vacante_id, vacante))
+
+
+def unindex_vacante(vacante_id):
+    """
+    Write hook: drops a deleted vacante from the index.
+    """
+    _live.apply(lambda index: index.remove(vacante_id))
+
+
+def find_clusters(vacantes):
+    """
+    Groups Vacante models into clusters of near-duplicates (same empresa).
+    Returns a list of lists of models, each with two or more entries.
+    """
+    index = DuplicateIndex()
+    by_id = {}
+    for vacante in vacantes:
+        by_id[vacante.id] = vacante
+        index.add(vacante.id, vacante.empresa_doc_id, vacante_text(vacante))
+
+    # Union-find over confirmed candidate pairs
+    parent = {vacante_id: vacante_id for vacante_id in index.signatures}
+
+    def root(vacante_id):
+        while parent[vacante_id] != vacante_id:
+            parent[vacante_id] = parent[parent[vacante_id]]
+            vacante_id = parent[vacante_id]
+        return vacante_id
+
+    for vacante_id, (empresa_id, sig) in index.signatures.items():
+        for other in index.candidates(empresa_id, sig):
+            if other != vacante_id and (
+                similarity(sig, index.signatures[other][1]) >= index.threshold
+            ):
+                parent[root(other)] = root(vacante_id)
+
+    clusters = {}
+    for vacante_id in parent:
+        clusters.setdefault(root(vacante_id), []).append(by_id[vacante_id])
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+
+def batch_dedupe(apply=False):
+    """
+    Finds clusters of duplicate active vacantes. Keeps the most recently
+    updated vacante of each cluster and, with apply=True, deactivates the
+    others with duplicadoDe pointing to it. Returns the number of copies.
+    """
+    from firebase import get_active_vacantes, update_vacante
+
+    copies = 0
+    for cluster in find_clusters(get_active_vacantes()):
+        cluster.sort(
+            key=lambda vacante: vacante.updated_at or vacante.created_at or EPOCH,
+            reverse=True,
+        )
+        keep, duplicates = cluster[0], cluster[1:]
+        print(
+            f"{keep.empresa_doc_id}: keeping {keep.id} ({keep.titulo!r}), "
+            f"duplicates: {', '.join(vacante.id for vacante in duplicates)}"
+        )
+        copies += len(duplicates)
+        if apply:
+            for vacante in duplicates:
+                update_vacante(vacante.id, {"activa": False, "duplicadoDe": keep.id})
+    print(f"{copies} duplicate vacantes {'deactivated' if apply else 'found'}")
+    return copies
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    batch_dedupe(apply="--apply" in sys.argv)
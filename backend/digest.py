@@ -0,0 +1,313 @@
+"""
+Periodic email digests of new postulaciones, one per empresa.
+
+Instead of one email per postulacion (stored by /alumnos/postular, which
+also notifies the empresa's webhooks), the server sends each empresa a
+summary of the postulaciones received in the last window (DIGEST_WINDOW
+seconds, default one hour):
+
+    1. a scheduler thread in every worker checks once a minute whether the
+       current window has ended; the first worker to advance the window
+       marker (digests/postulaciones, updated with a precondition) enqueues
+       a "postulaciones_digest" job and the others do nothing; if the job
+       cannot be enqueued the marker is moved back, to be claimed again
+    2. the job reads the window's postulaciones, looks up their vacantes
+       and groups them by the vacante's empresaId reference
+    3. one summary email per empresa is rendered and the emails are sent
+       DIGEST_BATCH_SIZE at a time, each batch over a single SMTP connection
+    4. after each batch the empresas already notified are recorded in
+       digests/postulaciones-<end of window>, so a retried job (the queue
+       retries failures with backoff) does not email them twice
+
+A window can be sent by hand (useful against a local SMTP sink, see
+backend.mail) with:
+
+    python -m backend.digest
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+from google.api_core import exceptions as google_exceptions
+
+from backend import mail
+from backend.jobs import job_queue
+from backend.resilience import resilient_read, resilient_write
+
+WINDOW = timedelta(seconds=float(os.getenv("DIGEST_WINDOW", "3600")))
+BATCH_SIZE = int(os.getenv("DIGEST_BATCH_SIZE", "50"))
+CHECK_INTERVAL = min(WINDOW.total_seconds(), 60.0)
+
+COLLECTION = "digests"
+STATE_DOC = "postulaciones"
+
+# Longest mensaje quoted in the email
+MAX_MENSAJE = 300
+
+
+def claim_window(now=None):
+    """
+    Advances the window marker if the current window has ended.
+    Returns (desde, hasta, update time of the marker) for the caller to
+    send, or None if the window is still open or another worker claimed it
+    first.
+    """
+    db = firestore.client()
+    state_ref = db.collection(COLLECTION).document(STATE_DOC)
+    now = now or datetime.now(timezone.utc)
+
+    snapshot = resilient_read(lambda timeout: state_ref.get(timeout=timeout))
+    try:
+        if not snapshot.exists:
+            desde = now - WINDOW
+            result = resilient_write(
+                lambda timeout: state_ref.create({"hasta": now}, timeout=timeout)
+            )
+        else:
+            desde = snapshot.get("hasta")
+            if now - desde < WINDOW:
+                return None
+            result = resilient_write(
+                lambda timeout: state_ref.update(
+                    {"hasta": now},
+                    option=db.write_option(last_update_time=snapshot.update_time),
+                    timeout=timeout,
+                )
+            )
+    except (google_exceptions.AlreadyExists, google_exceptions.FailedPrecondition):
+        return None
+    return desde, now, result.update_time
+
+
+def release_window(desde, claimed_at):
+    """
+    Moves the window marker back to desde, undoing a claim whose job could
+    not be enqueued, so a later check (of any worker) claims the window
+    again. Does nothing if the marker changed since the claim.
+    """
+    db = firestore.client()
+    state_ref = db.collection(COLLECTION).document(STATE_DOC)
+    try:
+        resilient_write(
+            lambda timeout: state_ref.update(
+                {"hasta": desde},
+                option=db.write_option(last_update_time=claimed_at),
+                timeout=timeout,
+            )
+        )
+    except google_exceptions.FailedPrecondition:
+        pass
+
+
+def collect_digests(desde, hasta):
+    """
+    Returns {empresa doc id: digest} for the postulaciones with
+    desde <= fecha < hasta, where digest is
+    {"correo", "nombre", "vacantes": [{"titulo", "postulaciones": [...]}]}.
+    """
+    db = firestore.client()
+    query = (
+        db.collection("postulaciones")
+        .where("fecha", ">=", desde)
+        .where("fecha", "<", hasta)
+    )
+    postulaciones = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+
+    by_vacante = {}
+    for doc in postulaciones:
+        data = doc.to_dict() or {}
+        if data.get("vacanteId"):
+            by_vacante.setdefault(data["vacanteId"], []).append(data)
+    if not by_vacante:
+        return {}
+
+    vacante_refs = [db.collection("vacantes").document(v) for v in by_vacante]
+    vacantes = resilient_read(
+        lambda timeout: list(
+            db.get_all(
+                vacante_refs, field_paths=["titulo", "empresaId"], timeout=timeout
+            )
+        )
+    )
+
+    digests = {}
+    for vacante in vacantes:
+        data = vacante.to_dict() if vacante.exists else None
+        if not data or not data.get("empresaId"):
+            continue
+        empresa_id = data["empresaId"].id
+        digest = digests.setdefault(empresa_id, {"vacantes": []})
+        digest["vacantes"].append(
+            {
+                "titulo": data.get("titulo") or "(sin título)",
+                "postulaciones": by_vacante[vacante.id],
+            }
+        )
+
+    empresa_refs = [db.collection("empresas").document(e) for e in digests]
+    empresas = resilient_read(
+        lambda timeout: list(
+            db.get_all(empresa_refs, field_paths=["correo", "nombre"], timeout=timeout)
+        )
+    )
+    for empresa in empresas:
+        data = (empresa.to_dict() if empresa.exists else None) or {}
+        digests[empresa.id]["correo"] = data.get("correo")
+        digests[empresa.id]["nombre"] = data.get("nombre")
+
+    return {
+        empresa_id: digest
+        for empresa_id, digest in digests.items()
+        if digest.get("correo")
+    }
+
+
+def render_digest(digest, desde, hasta):
+    """
+    Returns the (subject, body) of an empresa's digest email.
+    """
+    total = sum(len(v["postulaciones"]) for v in digest["vacantes"])
+    subject = (
+        "Tienes 1 nueva postulación"
+        if total == 1
+        else f"Tienes {total} nuevas postulaciones"
+    )
+
+    lines = [
+        f"Hola {digest.get('nombre') or ''}".rstrip() + ",",
+        "",
+        f"Entre el {desde:%d/%m/%Y %H:%M} y el {hasta:%d/%m/%Y %H:%M} (UTC) "
+        f"recibiste {total} {'postulación' if total == 1 else 'postulaciones'}:",
+    ]
+    for vacante in sorted(digest["vacantes"], key=lambda v: v["titulo"]):
+        lines += ["", f"{vacante['titulo']} ({len(vacante['postulaciones'])})"]
+        for postulacion in vacante["postulaciones"]:
+            mensaje = " ".join((postulacion.get("mensaje") or "").split())
+            if len(mensaje) > MAX_MENSAJE:
+                mensaje = mensaje[:MAX_MENSAJE].rstrip() + "…"
+            lines.append(
+                f"  - {postulacion.get('nombre') or 'Sin nombre'}"
+                f" <{postulacion.get('correo') or 'sin correo'}>"
+            )
+            if mensaje:
+                lines.append(f"    {mensaje}")
+    lines += ["", "Puedes revisar tus vacantes en tu panel de empresa."]
+    return subject, "\n".join(lines) + "\n"
+
+
+@job_queue.handler("postulaciones_digest")
+def send_digests(desde, hasta):
+    """
+    Sends the digests of one window (ISO timestamps). Safe to retry: the
+    empresas already notified are skipped.
+    """
+    desde = datetime.fromisoformat(desde)
+    hasta = datetime.fromisoformat(hasta)
+
+    db = firestore.client()
+    progress_ref = db.collection(COLLECTION).document(
+        f"{STATE_DOC}-{hasta:%Y%m%dT%H%M%S}"
+    )
+    progress = resilient_read(lambda timeout: progress_ref.get(timeout=timeout))
+    enviados = set((progress.to_dict() or {}).get("enviados", []))
+
+    digests = collect_digests(desde, hasta)
+    pending = [
+        (empresa_id, digest)
+        for empresa_id, digest in sorted(digests.items())
+        if empresa_id not in enviados
+    ]
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start : start + BATCH_SIZE]
+        messages = [
+            mail.build_message(digest["correo"], *render_digest(digest, desde, hasta))
+            for _, digest in batch
+        ]
+        mail.send_messages(messages)
+        resilient_write(
+            lambda timeout: progress_ref.set(
+                {"enviados": firestore.ArrayUnion([e for e, _ in batch])},
+                merge=True,
+                timeout=timeout,
+            )
+        )
+
+    print(
+        f"Postulaciones digest {desde:%Y-%m-%d %H:%M} - {hasta:%H:%M}: "
+        f"{len(pending)} empresas notified"
+    )
+
+
+def check_window():
+    """
+    Enqueues the digest job if this worker claims an ended window. The
+    claim is released if the job cannot be enqueued (full or failing
+    spool), so the window is not skipped.
+    """
+    window = claim_window()
+    if window:
+        desde, hasta, claimed_at = window
+        try:
+            job_queue.enqueue(
+                "postulaciones_digest",
+                {"desde": desde.isoformat(), "hasta": hasta.isoformat()},
+            )
+        except Exception:
+            release_window(desde, claimed_at)
+            raise
+
+
+_scheduler = None
+
+
+def start_scheduler():
+    """
+    Starts the thread that checks for ended windows every CHECK_INTERVAL
+    seconds.
+    """
+    global _scheduler
+
+    def loop():
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            try:
+                check_window()
+            except Exception as e:
+                print(f"Error scheduling postulaciones digest: {e}")
+
+    _scheduler = threading.Thread(target=loop, daemon=True, name="digest-scheduler")
+    _scheduler.start()
+    return _scheduler
+
+
+def _restart_after_fork():
+    """
+    Threads do not survive a fork: a child of a process running the
+    scheduler (a gunicorn worker of a --preload app) starts its own.
+    """
+    if _scheduler is not None:
+        start_scheduler()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    hasta = datetime.now(timezone.utc)
+    desde = hasta - WINDOW
+    if len(sys.argv) > 1:
+        desde = datetime.fromisoformat(sys.argv[1])
+    send_digests(desde.isoformat(), hasta.isoformat())
@@ -0,0 +1,168 @@
+"""
+Resumable streaming export of Firestore collections to gzip NDJSON.
+
+    python -m backend.export DIRECTORY [COLLECTION ...] [--restart]
+
+exports empresas, vacantes, alumnos and postulaciones (or the collections
+given) to DIRECTORY/<collection>.ndjson.gz, one document per line:
+
+    {"id": "<doc id>", "data": {...}}
+
+DocumentReference values are written as their path ("empresas/<id>"),
+timestamps as ISO 8601 strings, GeoPoints as {"latitude", "longitude"} and
+bytes as base64.
+
+Each collection is read in pages of EXPORT_PAGE_SIZE documents ordered by
+document ID, using the last ID as the cursor, so memory stays bounded by
+one page whatever the collection size. Every page is written as its own
+gzip member (concatenated members are a valid gzip file) and then
+checkpointed in DIRECTORY/<collection>.checkpoint.json with the cursor and
+the file size. An interrupted export truncates the file back to the last
+checkpoint and resumes after its cursor; --restart starts over.
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.document import DocumentReference
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from backend.resilience import resilient_read
+
+COLLECTIONS = ("empresas", "vacantes", "alumnos", "postulaciones")
+
+PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+
+def serialize(value):
+    """
+    json.dumps default= hook for the Firestore types JSON does not know.
+    """
+    if isinstance(value, DocumentReference):
+        return value.path
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if hasattr(value, "latitude") and hasattr(value, "longitude"):
+        return {"latitude": value.latitude, "longitude": value.longitude}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def to_line(snapshot):
+    record = {"id": snapshot.id, "data": snapshot.to_dict() or {}}
+    return json.dumps(record, default=serialize, ensure_ascii=False) + "\n"
+
+
+def iter_pages(collection, cursor=None, page_size=PAGE_SIZE):
+    """
+    Yields the collection's documents in pages (lists of snapshots) ordered
+    by document ID, starting after the cursor document ID.
+    """
+    collection_ref = firestore.client().collection(collection)
+    while True:
+        query = collection_ref.order_by(FieldPath.document_id()).limit(page_size)
+        if cursor:
+            query = query.start_after(
+                {FieldPath.document_id(): collection_ref.document(cursor)}
+            )
+        page = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+        if page:
+            yield page
+            cursor = page[-1].id
+        if len(page) < page_size:
+            return
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    """
+    Replaces the checkpoint atomically, so a crash leaves the old or the
+    new one but never half of it.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def export_collection(collection, directory, restart=False):
+    """
+    Exports (or resumes exporting) one collection. Returns the number of
+    documents in the finished file.
+    """
+    data_path = os.path.join(directory, f"{collection}.ndjson.gz")
+    checkpoint_path = os.path.join(directory, f"{collection}.checkpoint.json")
+
+    checkpoint = None if restart else read_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get("done"):
+        print(f"{collection}: already exported ({checkpoint['exported']} documents)")
+        return checkpoint["exported"]
+    if checkpoint is None or not os.path.exists(data_path):
+        checkpoint = {"cursor": None, "exported": 0, "offset": 0, "done": False}
+
+    with open(data_path, "r+b" if checkpoint["offset"] else "wb") as raw:
+        # Drop whatever was written after the last checkpoint
+        raw.truncate(checkpoint["offset"])
+        raw.seek(checkpoint["offset"])
+
+        for page in iter_pages(collection, checkpoint["cursor"]):
+            with gzip.GzipFile(fileobj=raw, mode="wb") as member:
+                for snapshot in page:
+                    member.write(to_line(snapshot).encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+            checkpoint["cursor"] = page[-1].id
+            checkpoint["exported"] += len(page)
+            checkpoint["offset"] = raw.tell()
+            write_checkpoint(checkpoint_path, checkpoint)
+            print(f"{collection}: {checkpoint['exported']} documents")
+
+    checkpoint["done"] = True
+    write_checkpoint(checkpoint_path, checkpoint)
+    return checkpoint["exported"]
+
+
+def export_collections(directory, collections=COLLECTIONS, restart=False):
+    """
+    Exports several collections one after the other. Returns
+    {collection: number of documents}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return {
+        collection: export_collection(collection, directory, restart)
+        for collection in collections
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        sys.exit(f"Usage: python -m backend.export DIRECTORY [{' '.join(COLLECTIONS)}]")
+    unknown = set(args[1:]) - set(COLLECTIONS)
+    if unknown:
+        sys.exit(f"Unknown collections: {', '.join(sorted(unknown))}")
+
+    initialize_firebase()
+    export_collections(args[0], args[1:] or COLLECTIONS, "--restart" in sys.argv)
@@ -0,0 +1,205 @@
+import asyncio
+
+from firebase_admin import firestore, firestore_async
+
+from backend import dedupe, shared_cache, skills, validation
+from backend.models import Vacante
+from backend.resilience import (
+    FirestoreUnavailableError,
+    resilient_read_async,
+    resilient_write_async,
+)
+from firebase import (
+    VACANTE_INDEXED_FIELDS,
+    VACANTE_UPDATE_FIELDS,
+    sync_vacante_indexes,
+    vacante_document,
+)
+
+
+def get_async_db():
+    """
+    Returns the Firestore AsyncClient bound to the default Firebase app.
+    The SDK caches the client per app, so this is cheap to call per request.
+    """
+    return firestore_async.client()
+
+
+async def get_empresa_by_id_async(empresa_doc_id):
+    """
+    Async version of firebase.get_empresa_by_id (same shared cache entries).
+    Returns the document data if found, otherwise None.
+    """
+    cache_key = shared_cache.empresa_key(empresa_doc_id)
+    cached = await asyncio.to_thread(shared_cache.shared_cache.get, cache_key)
+    if cached is not shared_cache.MISS:
+        return cached
+
+    try:
+        db = get_async_db()
+        doc_ref = db.collection("empresas").document(empresa_doc_id)
+        doc = await resilient_read_async(lambda timeout: doc_ref.get(timeout=timeout))
+
+        if doc.exists:
+            data = doc.to_dict()
+            data["doc_id"] = doc.id
+            await asyncio.to_thread(
+                shared_cache.shared_cache.set,
+                cache_key,
+                data,
+                shared_cache.EMPRESA_TTL,
+            )
+            return data
+
+        await asyncio.to_thread(
+            shared_cache.shared_cache.set,
+            cache_key,
+            None,
+            shared_cache.MISSING_TTL,
+        )
+        return None
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving empresa by ID (async): {e}")
+        return None
+
+
+async def get_vacantes_by_empresa_id_async(empresa_doc_id):
+    """
+    Async version of firebase.get_vacantes_by_empresa_id.
+    Returns a list of Vacante models.
+    """
+    try:
+        db = get_async_db()
+        empresa_ref = db.collection("empresas").document(empresa_doc_id)
+
+        query = db.collection("vacantes").where("empresaId", "==", empresa_ref)
+
+        async def stream(timeout):
+            return [doc async for doc in query.stream(timeout=timeout)]
+
+        docs = await resilient_read_async(stream)
+        return [Vacante.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving vacantes by empresa ID (async): {e}")
+        return []
+
+
+async def get_vacante_by_id_async(vacante_id):
+    """
+    Async version of firebase.get_vacante_by_id.
+    Returns a Vacante model if found, otherwise None.
+    """
+    try:
+        db = get_async_db()
+        doc_ref = db.collection("vacantes").document(vacante_id)
+        doc = await resilient_read_async(lambda timeout: doc_ref.get(timeout=timeout))
+
+        if doc.exists:
+            return Vacante.from_snapshot(doc)
+
+        return None
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving vacante by ID (async): {e}")
+        return None
+
+
+async def create_vacante_async(empresa_doc_id, vacante_data):
+    """
+    Async version of firebase.create_vacante.
+    Returns (vacante ID, merged), or (None, False) if the write failed.
+    """
+    try:
+        db = get_async_db()
+        empresa_ref = db.collection("empresas").document(empresa_doc_id)
+        doc_ref = db.collection("vacantes").document()
+
+        data = vacante_document(empresa_ref, vacante_data)
+        skills.canonicalize_vacante(data)
+
+        # Same duplicate handling as firebase.create_vacante
+        try:
+            duplicate_of = await asyncio.to_thread(
+                dedupe.find_duplicate, empresa_doc_id, data
+            )
+        except Exception as e:
+            print(f"Error checking for duplicate vacantes (async): {e}")
+            duplicate_of = None
+        if duplicate_of and dedupe.MODE == "merge":
+            print(f"Vacante is a duplicate of {duplicate_of}, merging")
+            if await update_vacante_async(duplicate_of, data):
+                return duplicate_of, True
+            return None, False
+        if duplicate_of:
+            data["duplicadoDe"] = duplicate_of
+
+        await resilient_write_async(lambda timeout: doc_ref.set(data, timeout=timeout))
+
+        print(f"New vacante created with ID: {doc_ref.id}")
+        await asyncio.to_thread(shared_cache.invalidate_listings, empresa_doc_id)
+        await asyncio.to_thread(sync_vacante_indexes, doc_ref.id, data)
+        return doc_ref.id, False
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error creating vacante (async): {e}")
+        return None, False
+
+
+async def update_vacante_async(vacante_id, vacante_data):
+    """
+    Async version of firebase.update_vacante.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        db = get_async_db()
+
+        update_data = {
+            field: value
+            for field, value in validation.VACANTE.to_stored(vacante_data).items()
+            if field in VACANTE_UPDATE_FIELDS
+        }
+        skills.canonicalize_vacante(update_data)
+        update_data["updated_at"] = firestore.SERVER_TIMESTAMP
+
+        doc_ref = db.collection("vacantes").document(vacante_id)
+        await resilient_write_async(
+            lambda timeout: doc_ref.update(update_data, timeout=timeout)
+        )
+
+        print(f"Vacante {vacante_id} updated successfully")
+        await asyncio.to_thread(shared_cache.invalidate_listings)
+        if VACANTE_INDEXED_FIELDS.intersection(update_data):
+            await asyncio.to_thread(sync_vacante_indexes, vacante_id)
+        return True
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error updating vacante (async): {e}")
+        return False
+
+
+async def delete_vacante_async(vacante_id):
+    """
+    Async version of firebase.delete_vacante.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        db = get_async_db()
+        doc_ref = db.collection("vacantes").document(vacante_id)
+        await resilient_write_async(lambda timeout: doc_ref.delete(timeout=timeout))
+
+        print(f"Vacante {vacante_id} deleted successfully")
+        await asyncio.to_thread(shared_cache.invalidate_listings)
+        await asyncio.to_thread(sync_vacante_indexes, vacante_id, deleted=True)
+        return True
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error deleting vacante (async): {e}")
+        return False
@@ -0,0 +1,365 @@
+"""
+Firebase ID token verification with cached results and signing keys.
+
+auth.verify_id_token checks the RSA signature of every token it is given
+and fetches Google's signing certificates whenever its HTTP cache has
+expired, on the request that happens to find it stale. At a login spike
+the same tokens are also verified again and again (client retries, double
+submits, several tabs). Here:
+
+    * the signing certificates are kept in memory and refreshed by a
+      background thread (start_refresher) when their Cache-Control
+      lifetime ends, through a CacheControl session; a request only
+      fetches them itself if there are none yet, if they are past their
+      lifetime (the refresher is late or failing), or if a token is signed
+      with a key id they do not contain (Google rotated its keys). Those
+      fetches happen at most once per MIN_REFETCH_INTERVAL; expired
+      certificates are never used
+    * a verified token's claims are cached under the SHA-256 of the token
+      until the token's exp, so repeating a verification is a dict lookup
+    * concurrent verifications of the same token are single-flight: one
+      thread verifies and the others wait for its result
+
+Tokens are checked like firebase_admin does (RS256 signature by a current
+key, aud and iss of this project, a non-empty sub of at most 128
+characters, exp and iat); "uid" is set to sub. With the Auth emulator
+(FIREBASE_AUTH_EMULATOR_HOST), whose tokens are unsigned, verification is
+left to auth.verify_id_token.
+
+The revocation check (revoked refresh tokens, disabled users) costs an
+Auth API call, so it is opt-in: verify_id_token(token, check_revoked=True)
+or ID_TOKEN_CHECK_REVOKED=1. A cached token is then checked again once its
+last check is older than ID_TOKEN_REVOCATION_TTL seconds.
+
+Configuration (environment variables):
+    ID_TOKEN_CHECK_REVOKED    "1" to check revocation by default
+    ID_TOKEN_REVOCATION_TTL   seconds a revocation check is trusted (60)
+    ID_TOKEN_CACHE_SIZE       verified tokens kept per process (10000)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/"
+    "securetoken@system.gserviceaccount.com"
+)
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+CHECK_REVOKED = os.getenv("ID_TOKEN_CHECK_REVOKED", "0") in ("1", "true")
+REVOCATION_TTL = float(os.getenv("ID_TOKEN_REVOCATION_TTL", "60"))
+CACHE_SIZE = int(os.getenv("ID_TOKEN_CACHE_SIZE", "10000"))
+
+# Certificates without cache headers are refreshed after this long
+DEFAULT_CERTS_MAX_AGE = 3600
+# An unknown key id triggers at most one fetch per this many seconds
+MIN_REFETCH_INTERVAL = 10.0
+# Retry delay of the refresher after a failed fetch
+RETRY_INTERVAL = 30.0
+
+
+class InvalidIdToken(ValueError):
+    """
+    The token is malformed, expired, not signed by Google or not issued to
+    this project.
+    """
+
+
+class SigningCertsUnavailable(Exception):
+    """
+    The signing certificates are expired and could not be refreshed.
+    """
+
+
+class SigningCerts:
+    """
+    Google's current token signing certificates, by key id.
+    """
+
+    def __init__(self, url=CERTS_URL):
+        self.url = url
+        self.certs = {}
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self.attempted_at = 0.0  # last fetch by a request, successful or not
+        self.fetch_lock = threading.Lock()
+        self._session = None
+        self.thread = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+    def after_fork(self):
+        """
+        Threads do not survive a fork: a child of a process running the
+        refresher (a gunicorn worker of a --preload app) starts its own, with
+        its own fetch_lock and HTTP session.
+        """
+        running = self.thread is not None
+        self.fetch_lock = threading.Lock()
+        self._session = None
+        self.thread = None
+        if running:
+            self.start_refresher()
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from cachecontrol import CacheControl
+
+            self._session = CacheControl(requests.Session())
+        return self._session
+
+    def fetch(self):
+        """
+        Replaces the certificates with the current ones (served by the HTTP
+        cache while they are fresh) and returns their expiry time.
+        """
+        response = self.session.get(self.url, timeout=10)
+        response.raise_for_status()
+        certs = response.json()
+        expires_at = lifetime_end(response.headers)
+        self.certs, self.expires_at = certs, expires_at
+        self.fetched_at = time.time()
+        return expires_at
+
+    def usable(self, now):
+        """
+        Whether the certificates are within their lifetime. Just fetched
+        ones count as usable even with a max-age of 0, so that they are not
+        fetched again for every token.
+        """
+        return now < max(self.expires_at, self.fetched_at + MIN_REFETCH_INTERVAL)
+
+    def get(self, key_id):
+        """
+        Returns the certificate of key_id, fetching the certificates first if
+        they are expired or key_id is not among them (at most once per
+        MIN_REFETCH_INTERVAL). Returns None for key ids Google does not
+        publish; raises SigningCertsUnavailable (or the fetch error) if the
+        certificates are expired and cannot be refreshed.
+        """
+        certs = self.certs
+        if key_id in certs and self.usable(time.time()):
+            return certs[key_id]
+        with self.fetch_lock:
+            # Another thread may have fetched while this one waited
+            now = time.time()
+            outdated = key_id not in self.certs or not self.usable(now)
+            if outdated and now - self.attempted_at >= MIN_REFETCH_INTERVAL:
+                self.attempted_at = now
+                self.fetch()
+            if not self.usable(time.time()):
+                raise SigningCertsUnavailable(
+                    "Google's token signing certificates are expired and could"
+                    " not be refreshed"
+                )
+        return self.certs.get(key_id)
+
+    def start_refresher(self):
+        """
+        Starts the thread that fetches the certificates ahead of the
+        requests that need them, then again whenever they expire.
+        """
+        if self.thread is not None:
+            return self.thread
+
+        def loop():
+            while True:
+                try:
+                    with self.fetch_lock:
+                        expires_at = self.fetch()
+                    delay = max(expires_at - time.time(), RETRY_INTERVAL)
+                except Exception as e:
+                    print(f"Error refreshing ID token signing certificates: {e}")
+                    delay = RETRY_INTERVAL
+                time.sleep(delay)
+
+        self.thread = threading.Thread(target=loop, daemon=True, name="id-token-certs")
+        self.thread.start()
+        return self.thread
+
+
+def lifetime_end(headers):
+    """
+    Expiry time of a response from its Cache-Control max-age (with Age) or
+    Expires header.
+    """
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() == "max-age" and value.isdigit():
+            age = int(headers.get("Age", "0") or 0)
+            return time.time() + max(int(value) - age, 0)
+    try:
+        return parsedate_to_datetime(headers["Expires"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time() + DEFAULT_CERTS_MAX_AGE
+
+
+signing_certs = SigningCerts()
+
+
+def project_id():
+    import firebase_admin
+
+    return firebase_admin.get_app().project_id
+
+
+def decode_token(id_token):
+    """
+    Verifies the signature and the claims of an ID token and returns its
+    claims, or raises InvalidIdToken.
+    """
+    from google.auth import jwt
+
+    try:
+        header = jwt.decode_header(id_token)
+    except ValueError as e:
+        raise InvalidIdToken(f"Malformed ID token: {e}") from e
+    if header.get("alg") != "RS256" or not header.get("kid"):
+        raise InvalidIdToken("ID token is not signed with a Google RS256 key")
+
+    cert = signing_certs.get(header["kid"])
+    if cert is None:
+        raise InvalidIdToken(f"ID token signed with unknown key {header['kid']}")
+
+    project = project_id()
+    try:
+        claims = jwt.decode(id_token, certs=cert, audience=project)
+    except ValueError as e:
+        raise InvalidIdToken(str(e)) from e
+
+    if claims.get("iss") != ISSUER_PREFIX + project:
+        raise InvalidIdToken(f"ID token has incorrect issuer {claims.get('iss')}")
+    subject = claims.get("sub")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise InvalidIdToken("ID token has an invalid sub claim")
+    claims["uid"] = subject
+    return claims
+
+
+def check_not_revoked(claims):
+    """
+    Raises InvalidIdToken if the user is disabled or their tokens were
+    revoked after this one was issued (one Auth API call).
+    """
+    from firebase_admin import auth
+
+    user = auth.get_user(claims["uid"])
+    if user.disabled:
+        raise InvalidIdToken("The user record is disabled")
+    if claims["iat"] * 1000 < (user.tokens_valid_after_timestamp or 0):
+        raise InvalidIdToken("The ID token has been revoked")
+
+
+class Flight:
+    """
+    A verification in progress; other threads wait for its outcome.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.claims = None
+        self.error = None
+
+
+class VerifiedTokens:
+    """
+    Claims of verified tokens by token hash, until the token expires
+    (least recently used entries are dropped beyond max_size).
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        # hash -> (claims, expires at, last revocation check or None)
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def verify(self, id_token, check_revoked=False):
+        """
+        Returns a copy of the token's claims, verifying it unless a usable
+        result is cached or being computed. Raises InvalidIdToken.
+        """
+        key = hashlib.sha256(id_token.encode("utf-8")).digest()
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self.entries[key]
+                entry = None
+            if entry is not None and (
+                not check_revoked
+                or (entry[2] is not None and now - entry[2] < REVOCATION_TTL)
+            ):
+                self.entries.move_to_end(key)
+                return dict(entry[0])
+            flight = self.flights.get((key, check_revoked))
+            leader = flight is None
+            if leader:
+                flight = self.flights[(key, check_revoked)] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.claims)
+
+        try:
+            claims = entry[0] if entry is not None else decode_token(id_token)
+            checked_at = entry[2] if entry is not None else None
+            if check_revoked:
+                check_not_revoked(claims)
+                checked_at = time.time()
+            with self.lock:
+                self.entries[key] = (claims, float(claims["exp"]), checked_at)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+            flight.claims = claims
+            return dict(claims)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[(key, check_revoked)]
+            flight.done.set()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+verified_tokens = VerifiedTokens()
+
+
+def verify_id_token(id_token, check_revoked=None):
+    """
+    Verifies a Firebase ID token and returns its claims. check_revoked
+    defaults to ID_TOKEN_CHECK_REVOKED. Raises InvalidIdToken (or the
+    firebase_admin errors under the Auth emulator).
+    """
+    if check_revoked is None:
+        check_revoked = CHECK_REVOKED
+    if not isinstance(id_token, str) or not id_token:
+        raise InvalidIdToken("ID token must be a non-empty string")
+    if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+        from firebase_admin import auth
+
+        return auth.verify_id_token(id_token, check_revoked=check_revoked)
+    return verified_tokens.verify(id_token, check_revoked)
+
+
+def start_refresher():
+    """
+    Keeps the signing certificates fetched ahead of logins. Does nothing
+    with the Auth emulator, which does not sign its tokens.
+    """
+    if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+        return None
+    return signing_certs.start_refresher()
@@ -0,0 +1,196 @@
+"""
+Idempotency-Key support for non-idempotent API calls (POST /api/vacante).
+
+The first request with a given key runs normally and its response is
+stored; a retry with the same key gets the stored response back without
+running the handler again. Keys are scoped per empresa and bound to a
+fingerprint of the request body, so reusing a key for a different payload
+is rejected instead of silently replayed.
+
+Responses are kept for IDEMPOTENCY_TTL seconds (default 24h) in a bounded
+store. 5xx responses are not stored, so a failed call can be retried.
+
+A retry may land on another gunicorn worker than the original request, so
+the default store is a SQLite file shared by every worker on the host. The
+per-process memory store only deduplicates retries that reach the same
+process; it is meant for single-worker runs and tests.
+
+Configuration (environment variables):
+    IDEMPOTENCY_BACKEND   "sqlite" (shared by every worker on the host,
+                          default) or "memory" (per process)
+    IDEMPOTENCY_DB        path of the SQLite file
+    IDEMPOTENCY_TTL       seconds a stored response is replayed (86400)
+    IDEMPOTENCY_MAX_KEYS  maximum stored keys (10000)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+
+from backend.shared_cache import private_file, private_temp_path
+
+# A request that crashed mid-flight must not block its key forever
+IN_PROGRESS_TIMEOUT = 60
+
+NEW = "new"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+
+def fingerprint(body):
+    """
+    Returns a stable fingerprint of the raw request body.
+    """
+    return hashlib.sha256(body or b"").hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """
+    Per-process store on a cachetools.TTLCache (LRU-bounded, TTL-evicted).
+    """
+
+    def __init__(self, ttl, max_keys):
+        # key -> (fingerprint, status, body, started_at); status None = in flight
+        self.entries = TTLCache(maxsize=max_keys, ttl=ttl)
+        self.lock = threading.Lock()
+
+    def begin(self, key, request_fingerprint):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                stored_fingerprint, status, body, started_at = entry
+                if stored_fingerprint != request_fingerprint:
+                    return MISMATCH, None
+                if status is not None:
+                    return REPLAY, (status, body)
+                if time.time() - started_at < IN_PROGRESS_TIMEOUT:
+                    return IN_PROGRESS, None
+            self.entries[key] = (request_fingerprint, None, None, time.time())
+            return NEW, None
+
+    def complete(self, key, request_fingerprint, status, body):
+        with self.lock:
+            self.entries[key] = (request_fingerprint, status, body, time.time())
+
+    def release(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class SQLiteIdempotencyStore:
+    """
+    Store in a local SQLite file shared by every worker on the host.
+    """
+
+    def __init__(self, path, ttl, max_keys):
+        self.path = path
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.local = threading.local()
+        private_file(path)
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " status INTEGER,"
+            " body BLOB,"
+            " started_at REAL NOT NULL)"
+        )
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def begin(self, key, request_fingerprint):
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT fingerprint, status, body, started_at FROM idempotency"
+                " WHERE key = ? AND started_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is not None:
+                stored_fingerprint, status, body, started_at = row
+                if stored_fingerprint != request_fingerprint:
+                    conn.execute("COMMIT")
+                    return MISMATCH, None
+                if status is not None:
+                    conn.execute("COMMIT")
+                    return REPLAY, (status, body)
+                if now - started_at < IN_PROGRESS_TIMEOUT:
+                    conn.execute("COMMIT")
+                    return IN_PROGRESS, None
+
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency"
+                " (key, fingerprint, status, body, started_at)"
+                " VALUES (?, ?, NULL, NULL, ?)",
+                (key, request_fingerprint, now),
+            )
+            self.evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return NEW, None
+
+    def evict(self, conn, now):
+        conn.execute("DELETE FROM idempotency WHERE started_at <= ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM idempotency WHERE key IN ("
+            " SELECT key FROM idempotency ORDER BY started_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    def complete(self, key, request_fingerprint, status, body):
+        self.connection().execute(
+            "UPDATE idempotency SET status = ?, body = ?, started_at = ?"
+            " WHERE key = ? AND fingerprint = ?",
+            (status, body, time.time(), key, request_fingerprint),
+        )
+
+    def release(self, key):
+        self.connection().execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+
+def create_store():
+    """
+    Builds the idempotency store configured by the environment.
+    """
+    ttl = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    max_keys = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+    if os.getenv("IDEMPOTENCY_BACKEND", "sqlite") == "memory":
+        return MemoryIdempotencyStore(ttl, max_keys)
+    path = os.getenv("IDEMPOTENCY_DB")
+    try:
+        path = path or private_temp_path("idempotency.sqlite3")
+        return SQLiteIdempotencyStore(path, ttl, max_keys)
+    except Exception as e:
+        print(
+            f"Error opening idempotency store {path}, falling back to a per-process"
+            f" store (retries on other workers are not deduplicated): {e}"
+        )
+        return MemoryIdempotencyStore(ttl, max_keys)
+
+
+idempotency_store = create_store()
+
+
+def scoped_key(empresa_id, idempotency_key):
+    """
+    Keys are only unique per client, so they are namespaced by empresa.
+    """
+    return f"{empresa_id}:{idempotency_key}"
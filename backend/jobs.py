@@ -0,0 +1,328 @@
+"""
+In-process background job queue with a durable SQLite spool.
+
+Request handlers enqueue a job (a registered handler name plus a JSON
+payload) and return immediately; a pool of worker threads runs the jobs.
+Jobs live in a local SQLite file until they succeed, so pending work
+survives restarts, and every gunicorn worker on the host drains the same
+spool.
+
+    * a failing job is retried with exponential backoff and jitter, up to
+      its max_attempts; after that it stays in the spool as "failed", for
+      JOB_FAILED_TTL seconds and at most JOB_FAILED_MAX such rows
+    * a job claimed by a worker that died is picked up again once its lease
+      (JOB_LEASE seconds) expires
+    * the spool holds at most JOB_QUEUE_MAX unfinished jobs: enqueue waits
+      up to JOB_ENQUEUE_TIMEOUT seconds for room and then raises
+      QueueFullError, so callers see backpressure instead of unbounded growth
+
+Configuration (environment variables):
+    JOB_WORKERS          worker threads per process (4)
+    JOB_QUEUE_MAX        maximum pending + running jobs (1000)
+    JOB_ENQUEUE_TIMEOUT  seconds enqueue waits for room (2)
+    JOB_MAX_ATTEMPTS     default attempts per job (5)
+    JOB_RETRY_BASE_DELAY first retry delay in seconds, doubled each time (2)
+    JOB_RETRY_MAX_DELAY  retry delay cap in seconds (300)
+    JOB_LEASE            seconds before a running job is considered lost (300)
+    JOB_FAILED_TTL       seconds failed jobs are kept for inspection (604800)
+    JOB_FAILED_MAX       failed jobs kept at most (1000)
+    JOBS_DB              path of the SQLite spool
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from backend.shared_cache import private_file, private_temp_path
+
+WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+ENQUEUE_TIMEOUT = float(os.getenv("JOB_ENQUEUE_TIMEOUT", "2"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+LEASE = float(os.getenv("JOB_LEASE", "300"))
+FAILED_TTL = float(os.getenv("JOB_FAILED_TTL", str(7 * 24 * 3600)))
+FAILED_MAX = int(os.getenv("JOB_FAILED_MAX", "1000"))
+
+# Idle workers also wake up this often to pick up retries and jobs
+# enqueued by other processes
+POLL_INTERVAL = 1.0
+
+PENDING = "pending"
+RUNNING = "running"
+FAILED = "failed"
+
+# Jobs a worker may claim: due pending jobs and running jobs whose lease
+# expired
+DUE = "(status = ? AND run_after <= ?) OR (status = ? AND locked_until <= ?)"
+
+
+class QueueFullError(Exception):
+    """
+    The spool is at JOB_QUEUE_MAX and did not drain within the timeout.
+    """
+
+
+def retry_delay(attempts):
+    """
+    Delay before the next attempt: exponential, capped, with full jitter.
+    """
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempts))
+
+
+class JobQueue:
+    def __init__(self, path, workers=WORKERS, max_size=QUEUE_MAX):
+        self.path = path
+        self.workers = workers
+        self.max_size = max_size
+        self.handlers = {}
+        self.local = threading.local()
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.start_lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+        private_file(path)
+        conn = self.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " name TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " run_after REAL NOT NULL,"
+            " locked_until REAL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_after)")
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def handler(self, name):
+        """
+        Decorator registering fn as the handler of jobs called name. The
+        handler receives the payload as keyword arguments; raising an
+        exception makes the job retry.
+        """
+
+        def register(fn):
+            self.handlers[name] = fn
+            return fn
+
+        return register
+
+    def enqueue(self, name, payload=None, max_attempts=MAX_ATTEMPTS, timeout=None):
+        """
+        Adds a job to the spool and wakes a worker. Returns the job ID.
+        Raises QueueFullError if the spool stays full for timeout seconds.
+        """
+        if name not in self.handlers:
+            raise ValueError(f"No handler registered for job {name!r}")
+
+        self.start()
+        body = json.dumps(payload or {})
+        deadline = time.monotonic() + (ENQUEUE_TIMEOUT if timeout is None else timeout)
+        conn = self.connection()
+
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (unfinished,) = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status != ?", (FAILED,)
+                ).fetchone()
+                job_id = None
+                if unfinished < self.max_size:
+                    job_id = conn.execute(
+                        "INSERT INTO jobs (name, payload, status, max_attempts,"
+                        " run_after, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (name, body, PENDING, max_attempts, now, now),
+                    ).lastrowid
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if job_id is not None:
+                with self.wakeup:
+                    self.wakeup.notify()
+                return job_id
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise QueueFullError(f"Job queue is full ({self.max_size} jobs)")
+            time.sleep(min(0.1, remaining))
+
+    def claim(self):
+        """
+        Marks the next due job as running. Returns (id, name, payload,
+        attempts, max_attempts) or None.
+        """
+        now = time.time()
+        due = (PENDING, now, RUNNING, now)
+        conn = self.connection()
+        # Idle workers poll every POLL_INTERVAL: a plain read (which WAL
+        # never blocks) spares them the write lock when nothing is due
+        found = conn.execute(f"SELECT 1 FROM jobs WHERE {DUE} LIMIT 1", due)
+        if found.fetchone() is None:
+            return None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, name, payload, attempts, max_attempts FROM jobs"
+                f" WHERE {DUE} ORDER BY run_after LIMIT 1",
+                due,
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1,"
+                    " locked_until = ? WHERE id = ?",
+                    (RUNNING, now + LEASE, row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job_id, name, payload, attempts, max_attempts = row
+        return job_id, name, json.loads(payload), attempts + 1, max_attempts
+
+    def run_once(self):
+        """
+        Runs the next due job in the calling thread.
+        Returns False if there was nothing to run.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+
+        job_id, name, payload, attempts, max_attempts = job
+        conn = self.connection()
+        try:
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise LookupError(f"No handler registered for job {name!r}")
+            handler(**payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempts >= max_attempts:
+                print(f"Job {job_id} ({name}) failed permanently: {error}")
+                conn.execute(
+                    "UPDATE jobs SET status = ?, last_error = ? WHERE id = ?",
+                    (FAILED, error, job_id),
+                )
+                self.prune_failed()
+            else:
+                delay = retry_delay(attempts)
+                print(
+                    f"Job {job_id} ({name}) failed, retrying in {delay:.1f}s: {error}"
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = ?, run_after = ?, last_error = ?"
+                    " WHERE id = ?",
+                    (PENDING, time.time() + delay, error, job_id),
+                )
+        else:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return True
+
+    def prune_failed(self):
+        """
+        Deletes failed jobs enqueued more than FAILED_TTL seconds ago and
+        all but the newest FAILED_MAX failed jobs.
+        """
+        conn = self.connection()
+        conn.execute(
+            "DELETE FROM jobs WHERE status = ? AND (created_at < ? OR id NOT IN"
+            " (SELECT id FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?))",
+            (FAILED, time.time() - FAILED_TTL, FAILED, FAILED_MAX),
+        )
+
+    def worker(self):
+        while not self.stopping.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"Error in job worker: {e}")
+            with self.wakeup:
+                self.wakeup.wait(POLL_INTERVAL)
+
+    def start(self):
+        """
+        Starts the worker threads (once per process).
+        """
+        if self.threads:
+            return
+        with self.start_lock:
+            if self.threads:
+                return
+            self.stopping.clear()
+            self.threads = [
+                threading.Thread(
+                    target=self.worker, daemon=True, name=f"job-worker-{i}"
+                )
+                for i in range(self.workers)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def after_fork(self):
+        """
+        Threads and SQLite connections do not survive a fork: a child of a
+        process running the workers (a gunicorn worker of a --preload app)
+        gets fresh connections and locks and starts its own workers.
+        """
+        running = bool(self.threads)
+        self.local = threading.local()
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.start_lock = threading.Lock()
+        self.threads = []
+        if running:
+            self.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the workers after their current job. Pending jobs stay spooled.
+        """
+        self.stopping.set()
+        with self.wakeup:
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def stats(self):
+        """
+        Returns {status: count} for the jobs in the spool.
+        """
+        rows = self.connection().execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        )
+        return dict(rows.fetchall())
+
+
+def create_queue():
+    path = os.getenv("JOBS_DB") or private_temp_path("jobs.sqlite3")
+    return JobQueue(path)
+
+
+job_queue = create_queue()
@@ -0,0 +1,93 @@
+"""
+Holder for the in-process indexes (search, autocomplete, salary, dedupe and
+the candidate store).
+
+Each index is built on first use, kept current by the firebase.py write
+hooks through apply(), and rebuilt in a background thread once it is older
+than its max age, to pick up the writes of other gunicorn workers.
+
+Writes keep landing on the current index while a rebuild runs, and the
+rebuild may have read Firestore (or the snapshot) before some of them. So
+every write made while a build is in progress is also recorded, and
+replayed in order onto the new index before it is swapped in. Replaying a
+write the build already saw is harmless: the hooks set a document's state,
+they do not increment it.
+"""
+
+import threading
+import time
+
+
+class LiveIndex:
+    def __init__(self, name, build, max_age):
+        self.name = name
+        self.build = build
+        self.max_age = max_age
+        self.index = None
+        self.loaded_at = 0.0
+        self.build_lock = threading.Lock()  # one initial build at a time
+        self.lock = threading.Lock()  # index swaps and the pending writes
+        self.pending = None  # writes made during a build, or None
+
+    def get(self):
+        """
+        Returns the index, building it on first use (errors propagate) and
+        starting a background rebuild once it is older than max_age.
+        """
+        if self.index is None:
+            with self.build_lock:
+                if self.index is None:
+                    self.rebuild(raise_errors=True)
+        elif time.monotonic() - self.loaded_at > self.max_age:
+            with self.lock:
+                if self.pending is not None:
+                    return self.index
+                self.pending = []
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return self.index
+
+    def is_loaded(self):
+        return self.index is not None
+
+    def apply(self, write):
+        """
+        Applies write(index) to the current index and records it for the
+        build in progress, if any. No-op before the first build starts (it
+        will include the write).
+        """
+        with self.lock:
+            if self.index is not None:
+                write(self.index)
+            if self.pending is not None:
+                self.pending.append(write)
+
+    def rebuild(self, raise_errors=False):
+        """
+        Builds a new index, replays the writes made meanwhile and swaps it
+        in. Returns the new index, or None if the build failed.
+        """
+        with self.lock:
+            if self.pending is None:
+                self.pending = []
+        try:
+            index = self.build()
+        except Exception as e:
+            with self.lock:
+                self.pending = None
+            if raise_errors:
+                raise
+            print(f"Error rebuilding {self.name}: {e}")
+            return None
+
+        with self.lock:
+            for write in self.pending:
+                try:
+                    write(index)
+                except Exception as e:
+                    print(f"Error replaying a write onto the new {self.name}: {e}")
+            self.index, self.loaded_at = index, time.monotonic()
+            self.pending = None
+        return index
+
+    def _rebuild_in_background(self):
+        self.rebuild()
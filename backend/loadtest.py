@@ -0,0 +1,540 @@
+"""
+Load-testing harness that replays a hiring-fair traffic mix.
+
+Everything runs against the Firestore emulator (the local stand-in
+datastore, see firebase.initialize_firebase) with verify_google_id_token
+stubbed, so no real users or Google sign-ins are needed:
+
+    export FIRESTORE_EMULATOR_HOST=localhost:8080
+
+    # 1. seed empresas (loadtest-e<n>) and active vacantes (loadtest-v<n>)
+    python -m backend.loadtest seed --empresas 20 --vacantes 2000
+
+    # 2. replay the mix against 4 gunicorn workers, ramping virtual users
+    python -m backend.loadtest run --spawn 4 --stages 10,25,50,100,200
+
+    # or against a server started by hand with the stubbed login:
+    gunicorn -w 4 -b 127.0.0.1:8000 "backend.loadtest:create_app()"
+    python -m backend.loadtest run --url http://127.0.0.1:8000
+
+The default mix (DEFAULT_MIX, or a JSON file given with --mix) has two
+scenarios, picked by weight each time a virtual user starts over:
+
+    alumno   signs in through /alumnos/google-login, opens the vacantes
+             page, searches, filters by sueldo, autocompletes and applies
+    empresa  bulk-posts vacantes through POST /api/vacante, then lists them
+
+Each stage runs its number of virtual users (each with its own cookie
+session) for --stage-seconds and reports, overall and per route:
+throughput, error rate (network errors and HTTP status >= 400, including
+429 from the API rate limiter) and p50/p90/p99/max latency. The stage after
+which throughput stops growing while p99 keeps rising is reported as the
+saturation point.
+
+Step fields in a mix: name, method, path, json, headers, repeat. Strings
+may use the placeholders {n} (virtual user), {token} (a stub ID token),
+{email}, {query}, {prefix}, {vacante_id}, {api_key} and {sueldo}.
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+EMPRESA_PREFIX = "loadtest-e"
+VACANTE_PREFIX = "loadtest-v"
+TOKEN_PREFIX = "loadtest:"
+
+# API rate limit plan of the seeded empresas (create_app registers it)
+PLAN = "loadtest"
+PLAN_LIMITS = {"rate": 1000, "burst": 1000}
+
+WORDS = (
+    "desarrollador python java backend frontend datos analista ventas "
+    "marketing contador soporte redes diseño ingeniero becario atención "
+    "cliente logística recursos humanos administración sql react nube"
+).split()
+SKILLS = ("Python", "Java", "SQL", "React", "Excel", "Docker", "Linux", "AWS")
+IDIOMAS = ("Inglés", "Francés", "Alemán", "Portugués")
+
+DEFAULT_MIX = {
+    "think_time": 0.5,
+    "scenarios": {
+        "alumno": {
+            "weight": 9,
+            "steps": [
+                {
+                    "name": "google-login",
+                    "method": "POST",
+                    "path": "/alumnos/google-login",
+                    "json": {"idToken": "{token}"},
+                },
+                {"name": "vacantes", "method": "GET", "path": "/alumnos/vacantes"},
+                {
+                    "name": "buscar",
+                    "method": "GET",
+                    "path": "/alumnos/vacantes/buscar?q={query}",
+                    "repeat": 3,
+                },
+                {
+                    "name": "sueldo",
+                    "method": "GET",
+                    "path": "/alumnos/vacantes/sueldo?min={sueldo}",
+                },
+                {
+                    "name": "autocompletar",
+                    "method": "GET",
+                    "path": "/autocompletar?campo=habilidades&q={prefix}",
+                },
+                {
+                    "name": "postular",
+                    "method": "POST",
+                    "path": "/alumnos/postular",
+                    "json": {
+                        "vacanteId": "{vacante_id}",
+                        "nombre": "Alumno {n}",
+                        "correo": "{email}",
+                        "mensaje": "Me interesa la vacante.",
+                    },
+                },
+            ],
+        },
+        "empresa": {
+            "weight": 1,
+            "steps": [
+                {
+                    "name": "api-crear-vacante",
+                    "method": "POST",
+                    "path": "/api/vacante",
+                    "headers": {"X-API-Key": "{api_key}"},
+                    "json": {
+                        "titulo": "Vacante de carga {query}",
+                        "descripcion": "Publicada por el harness de carga.",
+                        "sueldo": "{sueldo}",
+                        "habilidadesDuras": ["Python", "SQL"],
+                    },
+                    "repeat": 10,
+                },
+                {
+                    "name": "api-vacantes",
+                    "method": "GET",
+                    "path": "/api/vacantes",
+                    "headers": {"X-API-Key": "{api_key}"},
+                },
+            ],
+        },
+    },
+}
+
+
+def require_emulator():
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit(
+            "Set FIRESTORE_EMULATOR_HOST: the load test only runs against the emulator"
+        )
+
+
+def stub_verify_google_id_token(id_token):
+    """
+    Accepts "loadtest:<n>" tokens as the decoded token of a fake user.
+    """
+    if not isinstance(id_token, str) or not id_token.startswith(TOKEN_PREFIX):
+        return None
+    user = id_token[len(TOKEN_PREFIX) :]
+    return {
+        "uid": f"loadtest-{user}",
+        "email": f"alumno{user}@loadtest.example",
+        "name": f"Alumno {user}",
+    }
+
+
+def create_app():
+    """
+    gunicorn factory: the Flask app with the stubbed token verification and
+    a rate limit plan for the seeded empresas. Emulator only.
+    """
+    require_emulator()
+    plans = json.loads(os.getenv("API_RATE_LIMITS") or "{}")
+    plans.setdefault(PLAN, PLAN_LIMITS)
+    os.environ["API_RATE_LIMITS"] = json.dumps(plans)
+
+    import app as app_module
+
+    app_module.verify_google_id_token = stub_verify_google_id_token
+    return app_module.app
+
+
+def seed(empresas, vacantes):
+    """
+    Writes loadtest-e<n> empresas (active API subscription) and loadtest-v<n>
+    active vacantes spread over them, 400 per batch.
+    """
+    require_emulator()
+    from firebase_admin import firestore
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    db = firestore.client()
+    rng = random.Random(0)
+
+    batch = db.batch()
+    for n in range(empresas):
+        batch.set(
+            db.collection("empresas").document(f"{EMPRESA_PREFIX}{n}"),
+            {
+                "correo": f"empresa{n}@loadtest.example",
+                "nombre": f"Empresa de carga {n}",
+                "suscripcionActiva": True,
+                "plan": PLAN,
+                "created_at": firestore.SERVER_TIMESTAMP,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            },
+        )
+    batch.commit()
+
+    batch = db.batch()
+    for n in range(vacantes):
+        empresa = n % empresas
+        batch.set(
+            db.collection("vacantes").document(f"{VACANTE_PREFIX}{n}"),
+            {
+                "empresaId": db.collection("empresas").document(
+                    f"{EMPRESA_PREFIX}{empresa}"
+                ),
+                "titulo": " ".join(rng.sample(WORDS, 3)).capitalize(),
+                "descripcion": " ".join(rng.choices(WORDS, k=40)),
+                "requisitos": " ".join(rng.choices(WORDS, k=15)),
+                "modalidad": rng.choice(("Presencial", "Remoto", "Híbrido")),
+                "sueldo": rng.choice((None, rng.randrange(5000, 60000, 500))),
+                "habilidadesDuras": rng.sample(SKILLS, 3),
+                "idiomas": rng.sample(IDIOMAS, 1),
+                "nombreEmpresa": f"Empresa de carga {empresa}",
+                "activa": True,
+                "created_at": firestore.SERVER_TIMESTAMP,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            },
+        )
+        if (n + 1) % 400 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    print(f"Seeded {empresas} empresas and {vacantes} vacantes")
+
+
+def fill(value, context):
+    """
+    Substitutes the placeholders in the strings of a step value.
+    """
+    if isinstance(value, str):
+        return value.format_map(context)
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    return value
+
+
+def route_label(step):
+    return f"{step['method']} {step['path'].split('?', 1)[0]}"
+
+
+class StageStats:
+    def __init__(self, users):
+        self.users = users
+        self.latencies = defaultdict(list)  # route -> [seconds]
+        self.errors = defaultdict(int)  # route -> count
+        self.statuses = defaultdict(int)  # status code (0 = network error) -> count
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def record(self, route, seconds, status):
+        self.latencies[route].append(seconds)
+        self.statuses[status] += 1
+        if status == 0 or status >= 400:
+            self.errors[route] += 1
+
+    @property
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self):
+        return sum(self.errors.values()) / self.requests if self.requests else 0.0
+
+    def p99(self):
+        return percentile(
+            sorted(value for values in self.latencies.values() for value in values),
+            0.99,
+        )
+
+    def summary(self):
+        rows = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "p50_ms": percentile(values, 0.5) * 1000,
+                "p90_ms": percentile(values, 0.9) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return {
+            "users": self.users,
+            "seconds": round(self.elapsed, 2),
+            "requests": self.requests,
+            "throughput": round(self.throughput, 2),
+            "error_rate": round(self.error_rate, 4),
+            "p99_ms": self.p99() * 1000,
+            "statuses": dict(self.statuses),
+            "routes": rows,
+        }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[position]
+
+
+class Replay:
+    def __init__(self, base_url, mix, empresas, vacantes, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.empresas = empresas
+        self.vacantes = vacantes
+        self.timeout = timeout
+        scenarios = mix["scenarios"]
+        self.names = list(scenarios)
+        self.weights = [scenarios[name].get("weight", 1) for name in self.names]
+        self.think_time = mix.get("think_time", 0)
+        self.users_started = 0
+
+    def context(self, n, rng):
+        word = rng.choice(WORDS)
+        return {
+            "n": n,
+            "token": f"{TOKEN_PREFIX}{n}",
+            "email": f"alumno{n}@loadtest.example",
+            "query": f"{word} {rng.choice(WORDS)}",
+            "prefix": rng.choice(SKILLS)[:2].lower(),
+            "vacante_id": f"{VACANTE_PREFIX}{rng.randrange(self.vacantes)}",
+            "api_key": f"{EMPRESA_PREFIX}{rng.randrange(self.empresas)}",
+            "sueldo": rng.randrange(5000, 40000, 1000),
+        }
+
+    async def request(self, client, step, context, stats):
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                step["method"],
+                fill(step["path"], context),
+                json=fill(step.get("json"), context),
+                headers=fill(step.get("headers") or {}, context),
+            )
+            status = response.status_code
+        except Exception:
+            status = 0
+        stats.record(route_label(step), time.perf_counter() - started, status)
+
+    async def user(self, stats, stop_at):
+        import httpx
+
+        self.users_started += 1
+        rng = random.Random(self.users_started)
+        async with httpx.AsyncClient(
+            base_url=self.base_url, timeout=self.timeout, follow_redirects=False
+        ) as client:
+            while time.monotonic() < stop_at:
+                # A new user of the chosen scenario, with a fresh session
+                n = rng.randrange(1_000_000)
+                client.cookies.clear()
+                name = rng.choices(self.names, self.weights)[0]
+                for step in self.mix["scenarios"][name]["steps"]:
+                    for _ in range(step.get("repeat", 1)):
+                        if time.monotonic() >= stop_at:
+                            return
+                        await self.request(client, step, self.context(n, rng), stats)
+                        if self.think_time:
+                            await asyncio.sleep(rng.uniform(0, 2 * self.think_time))
+
+    async def stage(self, users, seconds):
+        stats = StageStats(users)
+        stop_at = time.monotonic() + seconds
+        await asyncio.gather(*(self.user(stats, stop_at) for _ in range(users)))
+        stats.elapsed = time.monotonic() - stats.started
+        return stats
+
+
+def print_stage(stats):
+    summary = stats.summary()
+    print(
+        f"\n{summary['users']} users, {summary['seconds']}s: "
+        f"{summary['requests']} requests, {summary['throughput']} req/s, "
+        f"{summary['error_rate']:.2%} errors, statuses {summary['statuses']}"
+    )
+    print(
+        f"    {'route':<34} {'count':>6} {'err':>5} "
+        f"{'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)"
+    )
+    for route, row in summary["routes"].items():
+        print(
+            f"    {route:<34} {row['count']:>6} {row['errors']:>5} "
+            f"{row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+
+
+def saturation(stages, min_gain=0.1):
+    """
+    Returns the users of the last stage whose successor gained less than
+    min_gain throughput while p99 latency went up, or None.
+    """
+    for previous, current in zip(stages, stages[1:]):
+        gain = (current.throughput - previous.throughput) / (previous.throughput or 1)
+        if gain < min_gain and current.p99() > previous.p99():
+            return previous.users
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers, threads):
+    """
+    Starts gunicorn with the stubbed app on a free port and waits until it
+    accepts connections. Returns (process, base url).
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-w",
+            str(workers),
+            "--threads",
+            str(threads),
+            "-b",
+            f"127.0.0.1:{port}",
+            "backend.loadtest:create_app()",
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("gunicorn exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    sys.exit("gunicorn did not start listening within 60s")
+
+
+async def run(options):
+    mix = DEFAULT_MIX
+    if options.mix:
+        with open(options.mix, encoding="utf-8") as f:
+            mix = json.load(f)
+    replay = Replay(options.url, mix, options.empresas, options.vacantes)
+
+    # Warm up: build the indexes before measuring
+    await replay.stage(1, options.warmup)
+
+    stages = []
+    for users in options.stages:
+        stats = await replay.stage(users, options.stage_seconds)
+        print_stage(stats)
+        stages.append(stats)
+
+    saturated = saturation(stages)
+    best = max(stages, key=lambda stats: stats.throughput)
+    print(
+        f"\nPeak throughput {best.throughput:.1f} req/s at {best.users} users; "
+        + (
+            f"saturation around {saturated} users"
+            if saturated
+            else "no saturation within the stages"
+        )
+    )
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "stages": [stats.summary() for stats in stages],
+                    "saturation_users": saturated,
+                },
+                f,
+                indent=2,
+            )
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m backend.loadtest")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="seed the emulator")
+    seed_parser.add_argument("--empresas", type=int, default=20)
+    seed_parser.add_argument("--vacantes", type=int, default=2000)
+
+    run_parser = commands.add_parser("run", help="replay the traffic mix")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    run_parser.add_argument(
+        "--spawn", type=int, metavar="WORKERS", help="start gunicorn with N workers"
+    )
+    run_parser.add_argument("--threads", type=int, default=1)
+    run_parser.add_argument("--mix", help="JSON file with the traffic mix")
+    run_parser.add_argument(
+        "--stages",
+        type=lambda value: [int(users) for users in value.split(",")],
+        default=[10, 25, 50, 100, 200],
+        help="comma-separated virtual users per stage",
+    )
+    run_parser.add_argument("--stage-seconds", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=5)
+    run_parser.add_argument("--empresas", type=int, default=20)
+    run_parser.add_argument("--vacantes", type=int, default=2000)
+    run_parser.add_argument("--json", help="write the results to this file")
+
+    options = parser.parse_args(argv)
+    require_emulator()
+
+    if options.command == "seed":
+        seed(options.empresas, options.vacantes)
+        return
+
+    process = None
+    if options.spawn:
+        process, options.url = spawn_server(options.spawn, options.threads)
+    try:
+        asyncio.run(run(options))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    main(sys.argv[1:])
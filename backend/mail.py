@@ -0,0 +1,134 @@
+"""
+Outgoing email, sent from the background job queue (backend.jobs).
+
+Request handlers never talk to the SMTP server: they enqueue a job and
+return. The "email" job sends one message and is retried by the queue if
+the server is unavailable.
+
+Configuration (environment variables):
+    SMTP_HOST       server host (localhost)
+    SMTP_PORT       server port (587 with STARTTLS, 1025 for a local stand-in)
+    SMTP_USER       login user; no login if empty
+    SMTP_PASSWORD   login password
+    SMTP_STARTTLS   "true" to upgrade the connection with STARTTLS (true)
+    SMTP_TIMEOUT    socket timeout in seconds (10)
+    MAIL_FROM       sender address
+
+For local development any SMTP sink works, for example:
+
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false flask run
+"""
+
+import os
+import smtplib
+from email.message import EmailMessage
+
+from firebase_admin import auth
+
+from backend.jobs import job_queue
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+MAIL_FROM = os.getenv("MAIL_FROM", "no-reply@vinculacion.local")
+
+
+def build_message(to, subject, body):
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+def smtp_connection():
+    """
+    Opens an SMTP connection, upgraded and logged in as configured.
+    """
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USER:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+def send_messages(messages):
+    """
+    Sends several messages over one SMTP connection. A recipient the server
+    refuses is logged and skipped; any other error aborts the batch.
+    Returns the number of messages accepted.
+    """
+    sent = 0
+    with smtp_connection() as smtp:
+        for message in messages:
+            try:
+                smtp.send_message(message)
+                sent += 1
+            except smtplib.SMTPRecipientsRefused as e:
+                print(f"Email to {message['To']} refused: {e.recipients}")
+    return sent
+
+
+@job_queue.handler("email")
+def send_email_now(to, subject, body):
+    """
+    Sends one email synchronously. Runs inside the job workers.
+    """
+    with smtp_connection() as smtp:
+        smtp.send_message(build_message(to, subject, body))
+
+
+def send_email(to, subject, body):
+    """
+    Queues an email. Returns True if it was queued, False if the queue is
+    full or the spool is unavailable.
+    """
+    try:
+        job_queue.enqueue("email", {"to": to, "subject": subject, "body": body})
+        return True
+    except Exception as e:
+        print(f"Error queueing email to {to}: {e}")
+        return False
+
+
+@job_queue.handler("password_reset")
+def send_password_reset_now(email):
+    """
+    Generates a Firebase password reset link and emails it. Unknown emails
+    are skipped silently so the form does not reveal which accounts exist.
+    """
+    try:
+        link = auth.generate_password_reset_link(email)
+    except auth.UserNotFoundError:
+        print(f"Password reset requested for unknown email {email}")
+        return
+
+    body = (
+        "Hola,\n\n"
+        "Recibimos una solicitud para restablecer la contraseña de tu cuenta.\n"
+        f"Puedes hacerlo en el siguiente enlace:\n\n{link}\n\n"
+        "Si no solicitaste el cambio, puedes ignorar este correo.\n"
+    )
+    send_email_now(email, "Restablece tu contraseña", body)
+
+
+def send_password_reset_email(email):
+    """
+    Queues the password reset email. Returns True if it was queued.
+    """
+    try:
+        job_queue.enqueue("password_reset", {"email": email})
+        return True
+    except Exception as e:
+        print(f"Error queueing password reset for {email}: {e}")
+        return False
@@ -0,0 +1,315 @@
+"""
+Compact domain models for Firestore documents.
+
+Listings (vacantes of an empresa, all empresas for the admin, in-memory
+indexes) used to keep one dict per document and then build a second dict per
+document for the API response. These classes use __slots__, so an instance
+has no per-object __dict__, and are built in one pass from a snapshot.
+
+Attribute names are the Firestore field names, so templates keep working
+(vacante.tipoContrato, empresa.suscripcionActiva). The only exception is
+Vacante.educacion: documents written by create_vacante store it as
+"educación", and from_dict accepts both spellings.
+"""
+
+from operator import attrgetter
+
+
+class Vacante:
+    __slots__ = (
+        "id",
+        "empresaId",
+        "titulo",
+        "descripcion",
+        "requisitos",
+        "modalidad",
+        "tipoContrato",
+        "duracion",
+        "horario",
+        "sueldo",
+        "educacion",
+        "experienciaRequerida",
+        "habilidadesDuras",
+        "idiomas",
+        "nombreEmpresa",
+        "activa",
+        "created_at",
+        "updated_at",
+        "duplicadoDe",
+    )
+
+    # Field order of the REST API representation
+    JSON_FIELDS = (
+        "id",
+        "titulo",
+        "descripcion",
+        "requisitos",
+        "modalidad",
+        "tipoContrato",
+        "duracion",
+        "horario",
+        "sueldo",
+        "educacion",
+        "experienciaRequerida",
+        "habilidadesDuras",
+        "idiomas",
+        "nombreEmpresa",
+        "activa",
+        "duplicadoDe",
+    )
+    _json_values = attrgetter(*JSON_FIELDS)
+
+    def __init__(
+        self,
+        id=None,
+        empresaId=None,
+        titulo="",
+        descripcion="",
+        requisitos="",
+        modalidad="",
+        tipoContrato="",
+        duracion="",
+        horario="",
+        sueldo=None,
+        educacion="",
+        experienciaRequerida="",
+        habilidadesDuras=None,
+        idiomas=None,
+        nombreEmpresa="",
+        activa=True,
+        created_at=None,
+        updated_at=None,
+        duplicadoDe=None,
+    ):
+        self.id = id
+        self.empresaId = empresaId
+        self.titulo = titulo
+        self.descripcion = descripcion
+        self.requisitos = requisitos
+        self.modalidad = modalidad
+        self.tipoContrato = tipoContrato
+        self.duracion = duracion
+        self.horario = horario
+        self.sueldo = sueldo
+        self.educacion = educacion
+        self.experienciaRequerida = experienciaRequerida
+        self.habilidadesDuras = habilidadesDuras if habilidadesDuras is not None else []
+        self.idiomas = idiomas if idiomas is not None else []
+        self.nombreEmpresa = nombreEmpresa
+        self.activa = activa
+        self.created_at = created_at
+        self.updated_at = updated_at
+        # ID of the vacante this one re-posts (backend.dedupe), if flagged
+        self.duplicadoDe = duplicadoDe
+
+    @classmethod
+    def from_dict(cls, doc_id, data):
+        get = data.get
+        educacion = get("educación")
+        if educacion is None:
+            educacion = get("educacion")
+        return cls(
+            doc_id,
+            get("empresaId"),
+            get("titulo"),
+            get("descripcion"),
+            get("requisitos"),
+            get("modalidad"),
+            get("tipoContrato"),
+            get("duracion"),
+            get("horario"),
+            get("sueldo"),
+            educacion,
+            get("experienciaRequerida"),
+            get("habilidadesDuras"),
+            get("idiomas"),
+            get("nombreEmpresa"),
+            get("activa", True),
+            get("created_at"),
+            get("updated_at"),
+            get("duplicadoDe"),
+        )
+
+    @classmethod
+    def from_snapshot(cls, doc):
+        return cls.from_dict(doc.id, doc.to_dict() or {})
+
+    @property
+    def empresa_doc_id(self):
+        """
+        Document ID of the owning empresa (empresaId is a DocumentReference).
+        """
+        return self.empresaId.id if self.empresaId is not None else None
+
+    def to_json(self):
+        """
+        REST API representation (same keys as the original hand-built dict).
+        """
+        return dict(zip(self.JSON_FIELDS, self._json_values(self)))
+
+    def __repr__(self):
+        return f"Vacante(id={self.id!r}, titulo={self.titulo!r})"
+
+
+class Empresa:
+    __slots__ = (
+        "doc_id",
+        "correo",
+        "nombre",
+        "contactoPrincipal",
+        "estado",
+        "giro",
+        "mun_alcaldia",
+        "suscripcionActiva",
+        "plan",
+        "created_at",
+        "updated_at",
+    )
+
+    FIELDS = __slots__[1:]
+    _values = attrgetter(*FIELDS)
+
+    def __init__(
+        self,
+        doc_id=None,
+        correo=None,
+        nombre=None,
+        contactoPrincipal=None,
+        estado=None,
+        giro=None,
+        mun_alcaldia=None,
+        suscripcionActiva=False,
+        plan=None,
+        created_at=None,
+        updated_at=None,
+    ):
+        self.doc_id = doc_id
+        self.correo = correo
+        self.nombre = nombre
+        self.contactoPrincipal = contactoPrincipal
+        self.estado = estado
+        self.giro = giro
+        self.mun_alcaldia = mun_alcaldia
+        self.suscripcionActiva = suscripcionActiva
+        self.plan = plan
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_dict(cls, doc_id, data):
+        get = data.get
+        return cls(
+            doc_id,
+            get("correo"),
+            get("nombre"),
+            get("contactoPrincipal"),
+            get("estado"),
+            get("giro"),
+            get("mun_alcaldia"),
+            get("suscripcionActiva", False),
+            get("plan"),
+            get("created_at"),
+            get("updated_at"),
+        )
+
+    @classmethod
+    def from_snapshot(cls, doc):
+        return cls.from_dict(doc.id, doc.to_dict() or {})
+
+    def to_dict(self):
+        data = dict(zip(self.FIELDS, self._values(self)))
+        data["doc_id"] = self.doc_id
+        return data
+
+    def __repr__(self):
+        return f"Empresa(doc_id={self.doc_id!r}, nombre={self.nombre!r})"
+
+
+class Alumno:
+    __slots__ = (
+        "doc_id",
+        "correo",
+        "nombre",
+        "edad",
+        "estatus",
+        "semestre",
+        "promedio",
+        "area1",
+        "area2",
+        "area3",
+        "habilidades_tecnicas",
+        "habilidades_blandas",
+        "idiomas",
+        "created_at",
+        "updated_at",
+    )
+
+    FIELDS = __slots__[1:]
+    _values = attrgetter(*FIELDS)
+
+    def __init__(
+        self,
+        doc_id=None,
+        correo=None,
+        nombre=None,
+        edad=None,
+        estatus=None,
+        semestre=None,
+        promedio=None,
+        area1=None,
+        area2=None,
+        area3=None,
+        habilidades_tecnicas=None,
+        habilidades_blandas=None,
+        idiomas=None,
+        created_at=None,
+        updated_at=None,
+    ):
+        self.doc_id = doc_id
+        self.correo = correo
+        self.nombre = nombre
+        self.edad = edad
+        self.estatus = estatus
+        self.semestre = semestre
+        self.promedio = promedio
+        self.area1 = area1
+        self.area2 = area2
+        self.area3 = area3
+        self.habilidades_tecnicas = habilidades_tecnicas
+        self.habilidades_blandas = habilidades_blandas
+        self.idiomas = idiomas
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_dict(cls, doc_id, data):
+        get = data.get
+        return cls(
+            doc_id,
+            get("correo"),
+            get("nombre"),
+            get("edad"),
+            get("estatus"),
+            get("semestre"),
+            get("promedio"),
+            get("area1"),
+            get("area2"),
+            get("area3"),
+            get("habilidades_tecnicas"),
+            get("habilidades_blandas"),
+            get("idiomas"),
+            get("created_at"),
+            get("updated_at"),
+        )
+
+    @classmethod
+    def from_snapshot(cls, doc):
+        return cls.from_dict(doc.id, doc.to_dict() or {})
+
+    def to_dict(self):
+        data = dict(zip(self.FIELDS, self._values(self)))
+        data["doc_id"] = self.doc_id
+        return data
+
+    def __repr__(self):
+        return f"Alumno(doc_id={self.doc_id!r}, nombre={self.nombre!r})"
@@ -0,0 +1,192 @@
+"""
+Opt-in sampling profiler for live requests.
+
+A request is profiled when:
+    * a PROFILE_SAMPLE_RATE fraction of requests is drawn (0, the default,
+      draws none), or
+    * it carries "X-Profile: <PROFILE_TOKEN>" (an admin-only secret; the
+      header is ignored while PROFILE_TOKEN is unset)
+
+While at least one request is being profiled, a sampler thread records
+the stack of every profiled request thread each PROFILE_INTERVAL seconds
+(default 0.005) from sys._current_frames(). The profiled code itself is not
+instrumented, so the cost is a few microseconds per sample and nothing
+between samples. With no sample rate and no token, init_app registers no
+hooks at all.
+
+When the request ends, its samples are appended in collapsed-stack format
+(one "frame;frame;frame count" line per distinct stack) to
+PROFILE_DIR/<endpoint>.collapsed, e.g. admin_dashboard.collapsed. Lines
+from several requests and workers add up, and the files can be fed to
+flamegraph.pl or opened in speedscope as they are. Profiled responses
+carry X-Profile-Samples with the number of samples taken.
+
+Configuration (environment variables):
+    PROFILE_SAMPLE_RATE  fraction of requests profiled (0)
+    PROFILE_TOKEN        secret for the X-Profile header (unset: disabled)
+    PROFILE_INTERVAL     seconds between samples (0.005)
+    PROFILE_DIR          directory of the collapsed-stack files
+"""
+
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+TOKEN = os.getenv("PROFILE_TOKEN", "")
+INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+DIRECTORY = os.getenv(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "vinculacion_profiles")
+)
+
+HEADER = "X-Profile"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def frame_name(code):
+    """
+    "function (file:first line)", with paths relative to the repository
+    or, for libraries, to their package directory.
+    """
+    filename = code.co_filename
+    if filename.startswith(ROOT) and "site-packages" not in filename:
+        filename = os.path.relpath(filename, ROOT)
+    else:
+        filename = filename.rsplit("site-packages" + os.sep, 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """
+    The stack of frame as "outermost;...;innermost".
+    """
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Sampler:
+    """
+    Samples the stacks of the registered threads while there are any.
+    """
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self.samples = {}  # thread id -> Counter of collapsed stacks
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.samples[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, daemon=True, name="request-profiler"
+                )
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self, thread_id):
+        """
+        Unregisters a thread and returns its Counter of stacks.
+        """
+        with self.lock:
+            return self.samples.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                if not self.samples:
+                    self.wakeup.clear()
+                    continue
+                thread_ids = list(self.samples)
+            frames = sys._current_frames()
+            stacks = {
+                thread_id: collapse(frames[thread_id])
+                for thread_id in thread_ids
+                if thread_id in frames
+            }
+            with self.lock:
+                for thread_id, stack in stacks.items():
+                    counter = self.samples.get(thread_id)
+                    if counter is not None:
+                        counter[stack] += 1
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+def should_profile(headers):
+    if TOKEN:
+        value = headers.get(HEADER)
+        if value and hmac.compare_digest(value, TOKEN):
+            return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def write_samples(label, stacks):
+    """
+    Appends the stacks of one request to PROFILE_DIR/<label>.collapsed with
+    a single write, so concurrent workers do not interleave lines.
+    """
+    if not stacks:
+        return
+    os.makedirs(DIRECTORY, exist_ok=True)
+    safe_label = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in label)
+    data = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    fd = os.open(
+        os.path.join(DIRECTORY, f"{safe_label}.collapsed"),
+        os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+        0o600,
+    )
+    try:
+        os.write(fd, data.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def init_app(app):
+    """
+    Profiles the sampled or admin-flagged requests of a Flask app. Registers
+    nothing unless PROFILE_SAMPLE_RATE or PROFILE_TOKEN is set.
+    """
+    if SAMPLE_RATE <= 0 and not TOKEN:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def start_profiling():
+        if should_profile(request.headers):
+            g.profiled_thread = threading.get_ident()
+            sampler.start(g.profiled_thread)
+
+    @app.after_request
+    def report_profiling(response):
+        thread_id = g.pop("profiled_thread", None)
+        if thread_id is not None:
+            stacks = sampler.stop(thread_id)
+            response.headers["X-Profile-Samples"] = str(sum(stacks.values()))
+            try:
+                write_samples(request.endpoint or "unknown", stacks)
+            except OSError as e:
+                print(f"Error writing request profile: {e}")
+        return response
+
+    @app.teardown_request
+    def stop_profiling(error=None):
+        # Requests that failed before after_request ran
+        thread_id = g.pop("profiled_thread", None)
+        if thread_id is not None:
+            sampler.stop(thread_id)
@@ -0,0 +1,245 @@
+"""
+Background propagation of denormalized empresa fields to their vacantes.
+
+create_vacante copies the empresa name into every vacante (nombreEmpresa)
+so listings never need a join. When update_empresa changes the name, this
+module rewrites the copies in the background:
+
+    * the empresa's vacantes are read with a projection (only the
+      propagated fields), ordered by document ID and paged CHUNK_SIZE at a
+      time
+    * each page that needs changes is written with one WriteBatch commit
+    * after each page the job document (propagaciones/<empresa doc id>)
+      records the last vacante ID processed, so an interrupted job resumes
+      from there instead of starting over
+
+A worker holds a lease on the job while it runs; other workers (and
+resume_propagations at startup) leave leased jobs alone. A rename that
+arrives while a job is running resets the job's cursor, and the running
+worker notices on its next checkpoint and starts over with the new value.
+
+Interrupted jobs can also be resumed by hand with:
+
+    python -m backend.propagation
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+
+from firebase_admin import firestore
+from google.api_core import exceptions as google_exceptions
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from backend import shared_cache
+from backend.resilience import resilient_read, resilient_write
+
+COLLECTION = "propagaciones"
+
+# Empresa field -> vacante field holding its copy
+PROPAGATED_FIELDS = {"nombre": "nombreEmpresa"}
+
+# Firestore allows at most 500 writes per batch
+CHUNK_SIZE = int(os.getenv("PROPAGATION_CHUNK_SIZE", "400"))
+LEASE_SECONDS = float(os.getenv("PROPAGATION_LEASE_SECONDS", "60"))
+
+ESTADO_EN_CURSO = "en_curso"
+ESTADO_COMPLETADA = "completada"
+
+_threads = {}  # empresa doc id -> running thread
+_threads_lock = threading.Lock()
+
+
+def vacante_updates(empresa_data, stored=None):
+    """
+    Returns the vacante fields to rewrite for an empresa update, or {}.
+    stored is the empresa document before the update; fields the update
+    leaves unchanged are skipped.
+    """
+    stored = stored or {}
+    return {
+        vacante_field: empresa_data[empresa_field]
+        for empresa_field, vacante_field in PROPAGATED_FIELDS.items()
+        if empresa_field in empresa_data
+        and (
+            empresa_field not in stored
+            or stored[empresa_field] != empresa_data[empresa_field]
+        )
+    }
+
+
+def start_propagation(empresa_doc_id, valores):
+    """
+    Records a propagation job for the empresa and runs it in a background
+    thread. valores maps vacante field to its new value. A job already
+    running for the same empresa restarts with the new values.
+    """
+    db = firestore.client()
+    job_ref = db.collection(COLLECTION).document(empresa_doc_id)
+    job = {
+        "valores": valores,
+        "cursor": None,
+        "actualizadas": 0,
+        "estado": ESTADO_EN_CURSO,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+    # merge keeps the current lease, so a worker already running it carries on
+    resilient_write(lambda timeout: job_ref.set(job, merge=True, timeout=timeout))
+    run_in_background(empresa_doc_id)
+
+
+def run_in_background(empresa_doc_id):
+    with _threads_lock:
+        thread = _threads.get(empresa_doc_id)
+        if thread is not None and thread.is_alive():
+            return thread
+        thread = threading.Thread(
+            target=_run_safely, args=(empresa_doc_id,), daemon=True
+        )
+        _threads[empresa_doc_id] = thread
+        thread.start()
+        return thread
+
+
+def _run_safely(empresa_doc_id):
+    try:
+        run_propagation(empresa_doc_id)
+    except Exception as e:
+        # The job stays en_curso and is picked up again once the lease expires
+        print(f"Error propagating empresa {empresa_doc_id}: {e}")
+    finally:
+        with _threads_lock:
+            if _threads.get(empresa_doc_id) is threading.current_thread():
+                del _threads[empresa_doc_id]
+
+
+def run_propagation(empresa_doc_id):
+    """
+    Runs (or resumes) the propagation job of an empresa until it completes,
+    one chunk per iteration. Returns without doing anything if another
+    worker holds the lease.
+    """
+    db = firestore.client()
+    job_ref = db.collection(COLLECTION).document(empresa_doc_id)
+    empresa_ref = db.collection("empresas").document(empresa_doc_id)
+    vacantes_ref = db.collection("vacantes")
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    while True:
+        snapshot = resilient_read(lambda timeout: job_ref.get(timeout=timeout))
+        job = snapshot.to_dict() if snapshot.exists else None
+        if not job or job.get("estado") != ESTADO_EN_CURSO:
+            return
+        if job.get("lease_owner") not in (None, owner) and (
+            job.get("lease_until", 0) > time.time()
+        ):
+            return
+
+        valores = job["valores"]
+        cursor = job.get("cursor")
+
+        query = (
+            vacantes_ref.where("empresaId", "==", empresa_ref)
+            .select(list(valores))
+            .order_by(FieldPath.document_id())
+            .limit(CHUNK_SIZE)
+        )
+        if cursor:
+            query = query.start_after(
+                {FieldPath.document_id(): vacantes_ref.document(cursor)}
+            )
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+
+        batch = db.batch()
+        changed = 0
+        for doc in docs:
+            data = doc.to_dict() or {}
+            if any(data.get(field) != value for field, value in valores.items()):
+                batch.update(
+                    doc.reference,
+                    {**valores, "updated_at": firestore.SERVER_TIMESTAMP},
+                )
+                changed += 1
+        if changed:
+            # A batch commit is atomic (all of its writes or none), and it
+            # sets absolute values, so retrying one that failed or timed out
+            # after applying is safe
+            resilient_write(lambda timeout: batch.commit(timeout=timeout))
+            shared_cache.invalidate_listings(empresa_doc_id)
+
+        checkpoint = {
+            "cursor": docs[-1].id if docs else cursor,
+            "actualizadas": job.get("actualizadas", 0) + changed,
+            "lease_owner": owner,
+            "lease_until": time.time() + LEASE_SECONDS,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
+        if len(docs) < CHUNK_SIZE:
+            checkpoint["estado"] = ESTADO_COMPLETADA
+            checkpoint["lease_owner"] = None
+
+        try:
+            # Fails if the job changed since it was read (e.g. a new rename)
+            resilient_write(
+                lambda timeout: job_ref.update(
+                    checkpoint,
+                    option=db.write_option(last_update_time=snapshot.update_time),
+                    timeout=timeout,
+                )
+            )
+        except google_exceptions.FailedPrecondition:
+            continue
+
+        if checkpoint.get("estado") == ESTADO_COMPLETADA:
+            print(
+                f"Propagation for empresa {empresa_doc_id} completed: "
+                f"{checkpoint['actualizadas']} vacantes updated"
+            )
+            return
+
+
+def resume_propagations():
+    """
+    Starts a background thread for every unfinished job whose lease has
+    expired. Returns the threads started.
+    """
+    db = firestore.client()
+    query = db.collection(COLLECTION).where("estado", "==", ESTADO_EN_CURSO)
+    docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+
+    now = time.time()
+    return [
+        run_in_background(doc.id)
+        for doc in docs
+        if (doc.to_dict() or {}).get("lease_until", 0) <= now
+    ]
+
+
+def resume_in_background():
+    """
+    Resumes interrupted jobs without blocking startup.
+    """
+
+    def resume():
+        try:
+            resume_propagations()
+        except Exception as e:
+            print(f"Error resuming propagations: {e}")
+
+    threading.Thread(target=resume, daemon=True).start()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    threads = resume_propagations()
+    print(f"Resuming {len(threads)} propagation job(s)")
+    for thread in threads:
+        thread.join()
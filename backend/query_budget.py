@@ -0,0 +1,542 @@
+"""
+Firestore call accounting: per-endpoint budgets and N+1 detection.
+
+With FIRESTORE_ACCOUNTING=warn (staging) or strict (tests), install() wraps
+the Firestore client methods the data layer uses, sync and async, so every
+round trip is recorded with its call site (the innermost frame in this
+repository, e.g. "firebase.py:98 get_empresa_by_correo"):
+
+    read    DocumentReference.get, Client.get_all
+    query   Query / CollectionReference .stream and .get
+    write   set, create, update, delete, CollectionReference.add and
+            WriteBatch.commit (one write per batch, counting its documents)
+
+Every Flask request is recorded on its own, and so is every request the
+ASGI API (backend.asgi_api) serves natively, through checked(). When it
+ends, its usage is checked against BUDGETS (keyed "METHOD /rule", e.g.
+"GET /api/vacantes") and scanned for:
+
+    repeated   the same document or the identical query read twice
+    N+1        one call site issuing N1_THRESHOLD (3) or more reads of
+               different documents (a lookup per item of a list)
+
+Findings are printed (warn) or raised as BudgetExceeded (strict; the Flask
+test client re-raises it when app.testing is set, otherwise the request
+answers 500). Tests can also check a block directly:
+
+    with query_budget.expect(reads=2, writes=0):
+        client.get("/api/vacantes", headers={"X-API-Key": empresa_id})
+
+reads counts round trips (gets and queries), documents counts the
+documents they returned (what Firestore bills). Nothing is patched with
+FIRESTORE_ACCOUNTING=off, the default, so production pays nothing.
+
+Run it against the Firestore emulator (see firebase.initialize_firebase),
+never against production data:
+
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m backend.query_budget \\
+        "GET /api/vacantes" "GET /api/vacante/<id>" --api-key EMPRESA_DOC_ID
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+MODE = os.getenv("FIRESTORE_ACCOUNTING", "off")  # off, warn or strict
+N1_THRESHOLD = int(os.getenv("FIRESTORE_N1_THRESHOLD", "3"))
+
+READ = "read"
+QUERY = "query"
+WRITE = "write"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Plumbing between a data function and the client: never a call site
+SKIPPED_FILES = frozenset(
+    os.path.join(ROOT, "backend", name)
+    for name in ("query_budget.py", "resilience.py", "concurrency.py")
+)
+
+
+class Budget:
+    """
+    Maximum reads (round trips), writes and documents read per request;
+    None means unlimited.
+    """
+
+    def __init__(self, reads=None, writes=None, documents=None):
+        self.reads = reads
+        self.writes = writes
+        self.documents = documents
+
+    def violations(self, usage):
+        problems = []
+        for name in ("reads", "writes", "documents"):
+            limit = getattr(self, name)
+            used = getattr(usage, name)
+            if limit is not None and used > limit:
+                problems.append(f"{used} {name}, budget is {limit}")
+        return problems
+
+
+# "METHOD /rule" -> Budget. Tests and staging add their own entries
+BUDGETS = {
+    # Empresa (API key) + the vacantes query; both may come from the cache
+    "GET /api/vacantes": Budget(reads=2),
+}
+
+
+class BudgetExceeded(AssertionError):
+    """
+    A request went over its budget or repeated reads (strict mode).
+    """
+
+
+class Call:
+    __slots__ = ("kind", "target", "site", "documents")
+
+    def __init__(self, kind, target, site, documents=0):
+        self.kind = kind
+        self.target = target
+        self.site = site
+        self.documents = documents
+
+    def __repr__(self):
+        return f"{self.kind} {self.target} ({self.documents} docs) at {self.site}"
+
+
+class Usage:
+    """
+    The Firestore calls of one request (or expect() block).
+    """
+
+    def __init__(self, label=None):
+        self.label = label
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def record(self, call):
+        with self.lock:
+            self.calls.append(call)
+
+    @property
+    def reads(self):
+        return sum(1 for call in self.calls if call.kind in (READ, QUERY))
+
+    @property
+    def writes(self):
+        return sum(1 for call in self.calls if call.kind == WRITE)
+
+    @property
+    def documents(self):
+        return sum(call.documents for call in self.calls if call.kind != WRITE)
+
+    def repeated(self):
+        """
+        Returns [(target, times)] of documents or queries read more than once.
+        """
+        counts = Counter(
+            (call.kind, call.target)
+            for call in self.calls
+            if call.kind in (READ, QUERY)
+        )
+        return [(target, times) for (_, target), times in counts.items() if times > 1]
+
+    def n_plus_one(self):
+        """
+        Returns [(site, distinct targets)] of call sites that read
+        N1_THRESHOLD or more different documents or queries.
+        """
+        targets = defaultdict(set)
+        for call in self.calls:
+            if call.kind in (READ, QUERY):
+                targets[call.site].add(call.target)
+        return [
+            (site, len(found))
+            for site, found in targets.items()
+            if len(found) >= N1_THRESHOLD
+        ]
+
+    def problems(self, budget=None):
+        problems = budget.violations(self) if budget else []
+        problems.extend(
+            f"repeated {times}x: {target}" for target, times in self.repeated()
+        )
+        problems.extend(
+            f"N+1: {site} read {count} different targets"
+            for site, count in self.n_plus_one()
+        )
+        return problems
+
+    def report(self):
+        lines = [
+            f"{self.label or 'Firestore usage'}: {self.reads} reads, "
+            f"{self.writes} writes, {self.documents} documents"
+        ]
+        lines.extend(f"    {call!r}" for call in self.calls)
+        return "\n".join(lines)
+
+
+_current = contextvars.ContextVar("firestore_usage", default=None)
+# Set while an instrumented method runs, so the calls it makes internally
+# (Query.get -> Query.stream) are not counted twice
+_inside = contextvars.ContextVar("firestore_call_inside", default=False)
+
+
+@contextmanager
+def recording(label=None):
+    """
+    Records the Firestore calls made inside the block (install() first).
+    """
+    usage = Usage(label)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def expect(reads=None, writes=None, documents=None, allow_repeats=False):
+    """
+    Raises BudgetExceeded if the block exceeds the given budget or, unless
+    allow_repeats, repeats a read or has an N+1 pattern.
+    """
+    install()
+    with recording() as usage:
+        yield usage
+    budget = Budget(reads, writes, documents)
+    problems = budget.violations(usage) if allow_repeats else usage.problems(budget)
+    if problems:
+        raise BudgetExceeded("; ".join(problems) + "\n" + usage.report())
+
+
+def call_site():
+    """
+    Innermost frame of this repository outside the plumbing, as
+    "path:line function". Lambdas (lambda timeout: ref.get(...)) are only
+    used when no named function is on the stack (pool threads).
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if (
+            filename.startswith(ROOT)
+            and filename not in SKIPPED_FILES
+            and "site-packages" not in filename
+        ):
+            site = f"{os.path.relpath(filename, ROOT)}:{frame.f_lineno} {code.co_name}"
+            if code.co_name != "<lambda>":
+                return site
+            fallback = fallback or site
+        frame = frame.f_back
+    return fallback or "?"
+
+
+def query_target(query):
+    """
+    Text identifying a query: its collection plus the structured query, so
+    identical queries compare equal.
+    """
+    if hasattr(query, "_query"):  # CollectionReference
+        query = query._query()
+    try:
+        structured = " ".join(str(query._to_protobuf()).split())
+    except Exception:
+        structured = repr(query)
+    return f"{query._parent.id}: {structured}"
+
+
+def document_target(reference, *args, **kwargs):
+    return reference.path, 1
+
+
+def query_call_target(query, *args, **kwargs):
+    return query_target(query), 0
+
+
+def add_target(collection, *args, **kwargs):
+    return f"{collection.id}/<new>", 1
+
+
+def batch_target(batch, *args, **kwargs):
+    count = len(batch._write_pbs)
+    return f"batch of {count}", count
+
+
+def begin(kind, describe, args, kwargs):
+    usage = _current.get()
+    if usage is None or _inside.get():
+        return None
+    target, documents = describe(*args, **kwargs)
+    call = Call(kind, target, call_site(), documents)
+    usage.record(call)
+    return call
+
+
+def instrument(cls, name, kind, describe, style):
+    """
+    Replaces cls.name with a recording wrapper. style tells how the
+    original returns: "value", "iter" (generator of snapshots), "await"
+    (coroutine) or "aiter" (async generator of snapshots).
+    """
+    original = getattr(cls, name)
+    if getattr(original, "_accounted", False):
+        return
+
+    if style == "value":
+
+        def wrapper(*args, **kwargs):
+            call = begin(kind, describe, args, kwargs)
+            token = _inside.set(True)
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                _inside.reset(token)
+            if call is not None and kind == QUERY:
+                call.documents = len(result)
+            return result
+
+    elif style == "iter":
+
+        def wrapper(*args, **kwargs):
+            call = begin(kind, describe, args, kwargs)
+            token = _inside.set(True)
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                _inside.reset(token)
+            if call is None:
+                return result
+            call.documents = 0
+            return counted(result, call)
+
+    elif style == "await":
+
+        async def wrapper(*args, **kwargs):
+            call = begin(kind, describe, args, kwargs)
+            token = _inside.set(True)
+            try:
+                result = await original(*args, **kwargs)
+            finally:
+                _inside.reset(token)
+            if call is not None and kind == QUERY:
+                call.documents = len(result)
+            return result
+
+    else:
+
+        def wrapper(*args, **kwargs):
+            call = begin(kind, describe, args, kwargs)
+            result = original(*args, **kwargs)
+            if call is None:
+                return result
+            call.documents = 0
+            return acounted(result, call)
+
+    wrapper._accounted = True
+    wrapper.__name__ = name
+    wrapper.__doc__ = original.__doc__
+    setattr(cls, name, wrapper)
+
+
+def counted(snapshots, call):
+    for snapshot in snapshots:
+        call.documents += 1
+        yield snapshot
+
+
+async def acounted(snapshots, call):
+    async for snapshot in snapshots:
+        call.documents += 1
+        yield snapshot
+
+
+def get_all_target(client, references, *args, **kwargs):
+    if not isinstance(references, (list, tuple)):
+        return "get_all", 0  # an iterator: listing it would consume it
+    return "get_all: " + ", ".join(reference.path for reference in references), 0
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """
+    Wraps the Firestore client classes (once per process).
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from google.cloud.firestore_v1 import (
+            async_batch,
+            async_client,
+            async_collection,
+            async_document,
+            async_query,
+            batch,
+            client,
+            collection,
+            document,
+            query,
+        )
+
+        for document_cls, write_style in (
+            (document.DocumentReference, "value"),
+            (async_document.AsyncDocumentReference, "await"),
+        ):
+            instrument(document_cls, "get", READ, document_target, write_style)
+            for name in ("set", "create", "update", "delete"):
+                instrument(document_cls, name, WRITE, document_target, write_style)
+
+        for query_cls, collection_cls, sync in (
+            (query.Query, collection.CollectionReference, True),
+            (async_query.AsyncQuery, async_collection.AsyncCollectionReference, False),
+        ):
+            for cls in (query_cls, collection_cls):
+                instrument(
+                    cls, "stream", QUERY, query_call_target, "iter" if sync else "aiter"
+                )
+                instrument(
+                    cls, "get", QUERY, query_call_target, "value" if sync else "await"
+                )
+            instrument(
+                collection_cls, "add", WRITE, add_target, "value" if sync else "await"
+            )
+
+        instrument(batch.WriteBatch, "commit", WRITE, batch_target, "value")
+        instrument(async_batch.AsyncWriteBatch, "commit", WRITE, batch_target, "await")
+        instrument(client.Client, "get_all", READ, get_all_target, "iter")
+        instrument(async_client.AsyncClient, "get_all", READ, get_all_target, "aiter")
+        _installed = True
+
+
+def enforce(usage, budget=None, mode=None):
+    """
+    Prints (warn) or raises (strict) the problems found in usage.
+    """
+    mode = mode or MODE
+    problems = usage.problems(budget)
+    if not problems:
+        return
+    message = "; ".join(problems) + "\n" + usage.report()
+    if mode == "strict":
+        raise BudgetExceeded(message)
+    print(f"Firestore budget warning: {message}")
+
+
+@contextmanager
+def checked(label):
+    """
+    Records the block as one request labeled "METHOD /rule" and checks it
+    against BUDGETS when it ends, like init_app does for Flask requests.
+    Does nothing with FIRESTORE_ACCOUNTING=off.
+    """
+    if MODE == "off":
+        yield None
+        return
+    install()
+    with recording(label) as usage:
+        yield usage
+    enforce(usage, BUDGETS.get(label))
+
+
+def request_label(request):
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return f"{request.method} {rule}"
+
+
+def init_app(app):
+    """
+    Records every request of a Flask app and checks it against BUDGETS.
+    Does nothing with FIRESTORE_ACCOUNTING=off.
+    """
+    if MODE == "off":
+        return
+    from flask import g, request
+
+    install()
+
+    @app.before_request
+    def start_firestore_usage():
+        usage = Usage(request_label(request))
+        g.firestore_usage = usage
+        g.firestore_usage_token = _current.set(usage)
+
+    @app.after_request
+    def check_firestore_usage(response):
+        usage = g.get("firestore_usage")
+        if usage is not None:
+            enforce(usage, BUDGETS.get(usage.label))
+        return response
+
+    @app.teardown_request
+    def stop_firestore_usage(error=None):
+        token = g.pop("firestore_usage_token", None)
+        if token is not None:
+            _current.reset(token)
+
+
+def main(argv):
+    """
+    Sends the given "METHOD /path" requests through the Flask test client
+    against the emulator and prints each request's usage and findings.
+    """
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit(
+            "Set FIRESTORE_EMULATOR_HOST: this tool only runs against the emulator"
+        )
+
+    headers = {"Content-Type": "application/json"}
+    body = None
+    requests_to_send = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--api-key":
+            headers["X-API-Key"] = next(args)
+        elif arg == "--json":
+            body = json.loads(next(args))
+        else:
+            requests_to_send.append(arg.split(" ", 1))
+    if not requests_to_send:
+        sys.exit(
+            'Usage: python -m backend.query_budget "GET /path" ... [--api-key KEY]'
+        )
+
+    install()
+    from werkzeug.exceptions import HTTPException
+
+    from app import app
+
+    client = app.test_client()
+    urls = app.url_map.bind("localhost")
+    failed = False
+    for method, path in requests_to_send:
+        with recording(f"{method} {path}") as usage:
+            response = client.open(path, method=method, headers=headers, json=body)
+        try:
+            rule, _ = urls.match(path, method=method, return_rule=True)
+            budget = BUDGETS.get(f"{method} {rule.rule}")
+        except HTTPException:
+            budget = None
+        problems = usage.problems(budget)
+        print(f"{usage.report()}\n    -> HTTP {response.status_code}")
+        for problem in problems:
+            print(f"    !! {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,319 @@
+"""
+Token-bucket rate limiting for the REST API, keyed by API key (the empresa
+document ID used by require_api_key).
+
+The check runs before the API key is looked up in Firestore, so a client
+hammering the API is turned away without costing a Firestore read. Since
+the key is not validated yet, only keys that require_api_key has validated
+(set_plan) get a bucket of their own, on their empresa's plan. Requests
+with any other key are charged to one "default" plan bucket per client
+address, so sending random keys neither grows the store per key nor evicts
+the buckets of real keys.
+
+Two stores are available:
+    memory  per-process buckets (default). With N gunicorn workers a client
+            effectively gets N times the limit.
+    sqlite  buckets in a local SQLite file shared by every worker on the
+            host. Buckets idle long enough to be full again are pruned.
+
+Configuration (environment variables):
+    API_RATE_LIMIT_BACKEND  "memory" or "sqlite"
+    API_RATE_LIMIT_DB       path of the SQLite file
+    API_RATE_LIMITS         JSON with the plans, e.g.
+                            {"default": {"rate": 5, "burst": 20},
+                             "premium": {"rate": 50, "burst": 200}}
+                            rate is tokens per second (> 0), burst the bucket
+                            size (>= 1); invalid plans are ignored.
+    API_RATE_LIMIT_MAX_KEYS buckets kept by the memory store, per kind (10000)
+
+The plan of an empresa is read from its "plan" field (missing means "default").
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from backend.shared_cache import private_file, private_temp_path
+
+DEFAULT_PLANS = {"default": {"rate": 5, "burst": 20}}
+
+
+def valid_plan(limits):
+    try:
+        return float(limits["rate"]) > 0 and float(limits["burst"]) >= 1
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def load_plans():
+    """
+    Returns the plan table from API_RATE_LIMITS, falling back to DEFAULT_PLANS.
+    Plans whose rate is not positive or whose burst is below 1 are ignored.
+    """
+    raw = os.getenv("API_RATE_LIMITS")
+    if not raw:
+        return dict(DEFAULT_PLANS)
+    try:
+        plans = json.loads(raw)
+    except ValueError as e:
+        print(f"Invalid API_RATE_LIMITS, using defaults: {e}")
+        return dict(DEFAULT_PLANS)
+    if not isinstance(plans, dict):
+        print("Invalid API_RATE_LIMITS, using defaults: not an object")
+        return dict(DEFAULT_PLANS)
+    for name, limits in list(plans.items()):
+        if not valid_plan(limits):
+            print(f"Invalid API_RATE_LIMITS plan {name!r} ignored: {limits}")
+            del plans[name]
+    plans.setdefault("default", DEFAULT_PLANS["default"])
+    return plans
+
+
+def idle_timeout(plans):
+    """
+    Seconds after which an untouched bucket is full again under any plan,
+    so dropping it changes nothing.
+    """
+    return max(limits["burst"] / limits["rate"] for limits in plans.values())
+
+
+class RateLimitResult:
+    """
+    Outcome of a single rate-limit check. known is False when the request
+    was charged to its client's bucket because the key has none yet.
+    """
+
+    __slots__ = ("allowed", "plan", "limit", "remaining", "retry_after", "known")
+
+    def __init__(self, allowed, plan, limit, remaining, retry_after, known=True):
+        self.allowed = allowed
+        self.plan = plan
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+        self.known = known
+
+    def needs_plan(self, plan):
+        """
+        Whether set_plan must be called for a key validated on plan.
+        """
+        return self.plan is not None and (not self.known or self.plan != plan)
+
+    def headers(self):
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def refill(tokens, updated_at, now, rate, burst):
+    """
+    Token-bucket step. Returns (allowed, new_tokens, retry_after).
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """
+    Buckets in bounded, LRU-evicted dicts, one for validated keys and one
+    for client addresses. State is per process.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self.keys = OrderedDict()  # key -> [tokens, updated_at, plan]
+        self.clients = OrderedDict()  # client address -> [tokens, updated_at]
+        self.lock = threading.Lock()
+
+    def take(self, key, client, plans, now):
+        with self.lock:
+            bucket = self.keys.get(key)
+            known = bucket is not None
+            if known:
+                self.keys.move_to_end(key)
+                plan = bucket[2]
+            else:
+                plan = "default"
+                bucket = self.clients.get(client)
+                if bucket is None:
+                    bucket = [float(plans[plan]["burst"]), now]
+                    self.clients[client] = bucket
+                    if len(self.clients) > self.max_keys:
+                        self.clients.popitem(last=False)
+                else:
+                    self.clients.move_to_end(client)
+
+            limits = plans.get(plan, plans["default"])
+            allowed, bucket[0], retry_after = refill(
+                bucket[0], bucket[1], now, limits["rate"], limits["burst"]
+            )
+            bucket[1] = now
+            return allowed, plan, bucket[0], retry_after, limits["burst"], known
+
+    def set_plan(self, key, plan, plans, now):
+        with self.lock:
+            bucket = self.keys.get(key)
+            if bucket is not None:
+                bucket[2] = plan
+                return
+            self.keys[key] = [float(plans[plan]["burst"]), now, plan]
+            if len(self.keys) > self.max_keys:
+                self.keys.popitem(last=False)
+
+
+class SQLiteBucketStore:
+    """
+    Buckets in a local SQLite file, shared by every worker process on the
+    host. Each check is a single IMMEDIATE transaction. Rows are keyed
+    "key:<API key>" or "client:<address>".
+    """
+
+    # Idle buckets are pruned every this many checks per process
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.takes = 0
+        private_file(path)
+        conn = self.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " plan TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated_at)"
+        )
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def take(self, key, client, plans, now):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            bucket_key = f"key:{key}"
+            row = conn.execute(
+                "SELECT tokens, updated_at, plan FROM buckets WHERE key = ?",
+                (bucket_key,),
+            ).fetchone()
+            known = row is not None
+            if not known:
+                bucket_key = f"client:{client}"
+                row = conn.execute(
+                    "SELECT tokens, updated_at, plan FROM buckets WHERE key = ?",
+                    (bucket_key,),
+                ).fetchone()
+            if row is None:
+                plan = "default"
+                tokens, updated_at = float(plans[plan]["burst"]), now
+            else:
+                tokens, updated_at, plan = row
+
+            limits = plans.get(plan, plans["default"])
+            allowed, tokens, retry_after = refill(
+                tokens, updated_at, now, limits["rate"], limits["burst"]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at, plan)"
+                " VALUES (?, ?, ?, ?)",
+                (bucket_key, tokens, now, plan),
+            )
+            self.takes += 1
+            if self.takes % self.PRUNE_INTERVAL == 0:
+                conn.execute(
+                    "DELETE FROM buckets WHERE updated_at < ?",
+                    (now - idle_timeout(plans),),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, plan, tokens, retry_after, limits["burst"], known
+
+    def set_plan(self, key, plan, plans, now):
+        self.connection().execute(
+            "INSERT INTO buckets (key, tokens, updated_at, plan) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET plan = excluded.plan",
+            (f"key:{key}", float(plans[plan]["burst"]), now, plan),
+        )
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter over a bucket store.
+    """
+
+    def __init__(self, store, plans=None):
+        self.store = store
+        self.plans = plans or load_plans()
+
+    def hit(self, key, client=None):
+        """
+        Consumes one token from the bucket of key, or of client (the remote
+        address) while key has not been validated. Returns a RateLimitResult.
+        """
+        try:
+            allowed, plan, tokens, retry_after, burst, known = self.store.take(
+                key, client or "unknown", self.plans, time.time()
+            )
+        except Exception as e:
+            # Never fail a request because the limiter store is unavailable
+            print(f"Error checking rate limit: {e}")
+            return RateLimitResult(True, None, 0, 0, 0)
+        return RateLimitResult(allowed, plan, burst, int(tokens), retry_after, known)
+
+    def resolve_plan(self, plan):
+        """
+        Name of the configured plan used for plan: unconfigured or missing
+        plans fall back to "default". Pass the result to needs_plan so an
+        unknown plan does not look like a change on every request.
+        """
+        return plan if isinstance(plan, str) and plan in self.plans else "default"
+
+    def set_plan(self, key, plan):
+        """
+        Gives a validated API key its own bucket on plan (or moves its
+        bucket to plan). Callers only need this when
+        RateLimitResult.needs_plan(plan).
+        """
+        plan = self.resolve_plan(plan)
+        try:
+            self.store.set_plan(key, plan, self.plans, time.time())
+        except Exception as e:
+            print(f"Error updating rate limit plan: {e}")
+
+
+def create_limiter():
+    """
+    Builds the limiter configured by the environment.
+    """
+    backend = os.getenv("API_RATE_LIMIT_BACKEND", "memory")
+    if backend == "sqlite":
+        path = os.getenv("API_RATE_LIMIT_DB") or private_temp_path("rate_limit.sqlite3")
+        store = SQLiteBucketStore(path)
+    else:
+        store = MemoryBucketStore(int(os.getenv("API_RATE_LIMIT_MAX_KEYS", "10000")))
+    return RateLimiter(store)
+
+
+api_rate_limiter = create_limiter()
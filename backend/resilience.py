@@ -0,0 +1,375 @@
+"""
+Resilience layer for Firestore calls made from firebase.py.
+
+Every call gets a deadline. Idempotent reads are retried with jittered
+exponential backoff and can optionally be hedged (a duplicate read is sent
+if the first one is slow, and whichever answers first wins). A circuit
+breaker shared by all calls in the worker fails fast while Firestore is
+degraded instead of letting every request wait for its own timeout.
+
+Failures caused by the backend are raised as FirestoreUnavailableError (or
+one of its subclasses) so callers can tell "the backend is down" apart from
+"the document does not exist".
+
+resilient_read_async and resilient_write_async do the same for the
+AsyncClient calls of backend.firebase_async (without hedging), sharing the
+worker's circuit breaker.
+
+Configuration (environment variables, seconds unless noted):
+    FIRESTORE_READ_DEADLINE       total budget for a read, retries included (5)
+    FIRESTORE_WRITE_DEADLINE      budget for a write (10)
+    FIRESTORE_READ_RETRIES        extra attempts for a read (2)
+    FIRESTORE_RETRY_BASE_DELAY    first backoff delay (0.1)
+    FIRESTORE_HEDGE_AFTER         send a hedged read after this delay, 0 disables (0)
+    FIRESTORE_BREAKER_THRESHOLD   consecutive failures that open the circuit (5)
+    FIRESTORE_BREAKER_RESET       time the circuit stays open before probing (30)
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from google.api_core import exceptions as google_exceptions
+
+READ_DEADLINE = float(os.getenv("FIRESTORE_READ_DEADLINE", "5"))
+WRITE_DEADLINE = float(os.getenv("FIRESTORE_WRITE_DEADLINE", "10"))
+READ_RETRIES = int(os.getenv("FIRESTORE_READ_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("FIRESTORE_RETRY_BASE_DELAY", "0.1"))
+HEDGE_AFTER = float(os.getenv("FIRESTORE_HEDGE_AFTER", "0"))
+BREAKER_THRESHOLD = int(os.getenv("FIRESTORE_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("FIRESTORE_BREAKER_RESET", "30"))
+
+# Errors that say something about the backend, not about the request
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.Aborted,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class FirestoreUnavailableError(Exception):
+    """
+    Firestore could not answer (transient errors persisted after retries).
+    """
+
+
+class FirestoreDeadlineError(FirestoreUnavailableError):
+    """
+    The call did not finish within its deadline.
+    """
+
+
+class FirestoreCircuitOpenError(FirestoreUnavailableError):
+    """
+    The circuit breaker is open; the call was not attempted.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed:    calls go through; BREAKER_THRESHOLD transient failures in a row
+               open the circuit.
+    open:      calls fail immediately with FirestoreCircuitOpenError until
+               BREAKER_RESET seconds have passed.
+    half-open: a single probe call is let through; success closes the
+               circuit, failure opens it again.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_after(self):
+        """
+        Seconds until the circuit will let a probe through (0 if closed).
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            return max(0, remaining)
+
+    def before_call(self):
+        with self.lock:
+            state = self._state()
+            if state == "open":
+                raise FirestoreCircuitOpenError("Firestore circuit breaker is open")
+            if state == "half-open":
+                if self.probing:
+                    raise FirestoreCircuitOpenError(
+                        "Firestore circuit breaker is half-open (probe in flight)"
+                    )
+                self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    print(
+                        f"Firestore circuit breaker opened after {self.failures} failures"
+                    )
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+breaker = CircuitBreaker()
+
+# Dedicated pool for hedged reads, separate from the request fan-out pool so
+# a hedge can never wait behind the request that issued it.
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("FIRESTORE_HEDGE_WORKERS", "8")),
+                    thread_name_prefix="firestore-hedge",
+                )
+    return _hedge_executor
+
+
+def backoff_delay(attempt):
+    """
+    Full-jitter exponential backoff: uniform in [0, base * 2**attempt].
+    """
+    return random.uniform(0, RETRY_BASE_DELAY * (2**attempt))
+
+
+def run_hedged(operation, timeout, hedge_after):
+    """
+    Runs operation(timeout) and, if it has not finished after hedge_after
+    seconds, a duplicate of it. Returns the first result to arrive.
+    """
+    executor = get_hedge_executor()
+    started = time.monotonic()
+    # Context copies keep per-request context variables in the pool threads
+    futures = {executor.submit(contextvars.copy_context().run, operation, timeout)}
+
+    done, _ = wait(futures, timeout=min(hedge_after, timeout))
+    if not done:
+        remaining = timeout - (time.monotonic() - started)
+        if remaining > 0:
+            futures.add(
+                executor.submit(contextvars.copy_context().run, operation, remaining)
+            )
+
+    pending = futures
+    while pending:
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            # Every attempt failed; surface the last error
+            raise next(iter(done)).exception()
+
+    raise FirestoreDeadlineError(f"Firestore read exceeded its {timeout:.2f}s deadline")
+
+
+def resilient_read(operation, deadline=None, retries=None, hedge_after=None):
+    """
+    Runs an idempotent Firestore read.
+
+    operation is called as operation(timeout) and should pass timeout to the
+    Firestore call (e.g. lambda timeout: doc_ref.get(timeout=timeout)).
+    Query results must be materialized inside operation (list(query.stream(...)))
+    so the whole round trip is covered by the deadline.
+
+    Returns the operation's result. Raises FirestoreCircuitOpenError,
+    FirestoreDeadlineError or FirestoreUnavailableError when the backend is
+    degraded; other errors (bad arguments, permissions) are raised unchanged.
+    """
+    deadline = READ_DEADLINE if deadline is None else deadline
+    retries = READ_RETRIES if retries is None else retries
+    hedge_after = HEDGE_AFTER if hedge_after is None else hedge_after
+
+    breaker.before_call()
+
+    started = time.monotonic()
+    last_error = None
+
+    for attempt in range(retries + 1):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+
+        try:
+            if hedge_after > 0:
+                result = run_hedged(operation, remaining, hedge_after)
+            else:
+                result = operation(remaining)
+            breaker.record_success()
+            return result
+        except FirestoreDeadlineError as e:
+            last_error = e
+            break
+        except TRANSIENT_ERRORS as e:
+            last_error = e
+            print(f"Transient Firestore error (attempt {attempt + 1}): {e}")
+        except Exception:
+            # The backend answered; the request itself is wrong
+            breaker.record_success()
+            raise
+
+        delay = backoff_delay(attempt)
+        if time.monotonic() - started + delay >= deadline:
+            break
+        time.sleep(delay)
+
+    breaker.record_failure()
+
+    if last_error is None or isinstance(
+        last_error, (FirestoreDeadlineError, google_exceptions.DeadlineExceeded, TimeoutError)
+    ):
+        raise FirestoreDeadlineError(
+            f"Firestore read exceeded its {deadline:.2f}s deadline"
+        ) from last_error
+    raise FirestoreUnavailableError(f"Firestore read failed: {last_error}") from last_error
+
+
+def resilient_write(operation, deadline=None):
+    """
+    Runs a Firestore write once, under a deadline and the circuit breaker.
+    Writes are not retried here; the caller decides whether a retry is safe.
+
+    operation is called as operation(timeout). Raises the same exceptions as
+    resilient_read.
+    """
+    deadline = WRITE_DEADLINE if deadline is None else deadline
+
+    breaker.before_call()
+
+    try:
+        result = operation(deadline)
+    except (google_exceptions.DeadlineExceeded, TimeoutError) as e:
+        breaker.record_failure()
+        raise FirestoreDeadlineError(
+            f"Firestore write exceeded its {deadline:.2f}s deadline"
+        ) from e
+    except TRANSIENT_ERRORS as e:
+        breaker.record_failure()
+        raise FirestoreUnavailableError(f"Firestore write failed: {e}") from e
+    except Exception:
+        breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+async def resilient_read_async(operation, deadline=None, retries=None):
+    """
+    Async version of resilient_read: operation(timeout) returns an awaitable.
+    The attempts are not hedged.
+    """
+    deadline = READ_DEADLINE if deadline is None else deadline
+    retries = READ_RETRIES if retries is None else retries
+
+    breaker.before_call()
+
+    started = time.monotonic()
+    last_error = None
+
+    for attempt in range(retries + 1):
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+
+        try:
+            result = await asyncio.wait_for(operation(remaining), remaining)
+            breaker.record_success()
+            return result
+        except asyncio.TimeoutError as e:
+            last_error = e
+            break
+        except TRANSIENT_ERRORS as e:
+            last_error = e
+            print(f"Transient Firestore error (attempt {attempt + 1}): {e}")
+        except Exception:
+            # The backend answered; the request itself is wrong
+            breaker.record_success()
+            raise
+
+        delay = backoff_delay(attempt)
+        if time.monotonic() - started + delay >= deadline:
+            break
+        await asyncio.sleep(delay)
+
+    breaker.record_failure()
+
+    if last_error is None or isinstance(
+        last_error, (asyncio.TimeoutError, google_exceptions.DeadlineExceeded)
+    ):
+        raise FirestoreDeadlineError(
+            f"Firestore read exceeded its {deadline:.2f}s deadline"
+        ) from last_error
+    raise FirestoreUnavailableError(
+        f"Firestore read failed: {last_error}"
+    ) from last_error
+
+
+async def resilient_write_async(operation, deadline=None):
+    """
+    Async version of resilient_write: operation(timeout) returns an awaitable.
+    """
+    deadline = WRITE_DEADLINE if deadline is None else deadline
+
+    breaker.before_call()
+
+    try:
+        result = await asyncio.wait_for(operation(deadline), deadline)
+    except (google_exceptions.DeadlineExceeded, asyncio.TimeoutError) as e:
+        breaker.record_failure()
+        raise FirestoreDeadlineError(
+            f"Firestore write exceeded its {deadline:.2f}s deadline"
+        ) from e
+    except TRANSIENT_ERRORS as e:
+        breaker.record_failure()
+        raise FirestoreUnavailableError(f"Firestore write failed: {e}") from e
+    except Exception:
+        breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return result
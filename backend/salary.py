@@ -0,0 +1,274 @@
+"""
+In-memory sorted index over the sueldo of active vacantes.
+
+Salaries are kept in a sorted list (with the vacante IDs in a parallel
+list), so a range filter is two binary searches plus a slice: O(log n + k).
+Counts per histogram bucket (BUCKET_EDGES, in MXN) are maintained on every
+insert/remove, so facet UIs never scan the index.
+
+Vacantes without a usable sueldo (None, empty, non-numeric, negative) are
+tracked separately: they never match a range, count in their own bucket,
+and can be appended to a listing with include_missing=True.
+
+Same lifecycle as backend.search: restored from the vacantes snapshot
+catalog (backend.snapshot) or built from Firestore on first use, kept
+current by the vacante write hooks in firebase.py and rebuilt in the
+background once older than SALARY_INDEX_MAX_AGE seconds (default 300).
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+from backend import snapshot
+from backend.live_index import LiveIndex
+
+# Histogram bucket lower edges; the last bucket is open-ended
+BUCKET_EDGES = (0, 5000, 10000, 15000, 20000, 30000, 50000)
+
+# Vacante fields whose update requires re-indexing
+INDEXED_FIELDS = frozenset({"sueldo", "activa"})
+
+INDEX_MAX_AGE = float(os.getenv("SALARY_INDEX_MAX_AGE", "300"))
+
+
+def parse_sueldo(value):
+    """
+    Returns the sueldo as a float, or None if it is missing or invalid.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        sueldo = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(sueldo) or math.isinf(sueldo) or sueldo < 0:
+        return None
+    return sueldo
+
+
+def bucket_of(sueldo):
+    return bisect_right(BUCKET_EDGES, sueldo) - 1
+
+
+class SalaryIndex:
+    """
+    Sorted (sueldo, vacante id) index with incremental add/remove.
+    """
+
+    def __init__(self):
+        self.values = []  # sorted sueldos
+        self.ids = []  # vacante id at the same position as in values
+        self.by_id = {}  # vacante id -> sueldo (None if missing)
+        self.bucket_counts = [0] * len(BUCKET_EDGES)
+        self.missing = set()  # ids without sueldo, in no particular order
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.by_id)
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Bulk-loads (vacante id, raw sueldo) pairs with one sort.
+        """
+        index = cls()
+        ranged = []
+        for vacante_id, sueldo in items:
+            sueldo = parse_sueldo(sueldo)
+            index.by_id[vacante_id] = sueldo
+            if sueldo is None:
+                index.missing.add(vacante_id)
+            else:
+                ranged.append((sueldo, vacante_id))
+                index.bucket_counts[bucket_of(sueldo)] += 1
+        ranged.sort(key=lambda item: item[0])
+        index.values = [sueldo for sueldo, _ in ranged]
+        index.ids = [vacante_id for _, vacante_id in ranged]
+        return index
+
+    @classmethod
+    def from_snapshot(cls, loaded):
+        return cls.from_items(
+            (record["id"], record["sueldo"]) for record in loaded.catalog
+        )
+
+    def add(self, vacante_id, sueldo):
+        """
+        Indexes (or re-indexes) a vacante with its raw sueldo value.
+        """
+        sueldo = parse_sueldo(sueldo)
+        with self.lock:
+            if vacante_id in self.by_id:
+                if self.by_id[vacante_id] == sueldo:
+                    return
+                self._remove(vacante_id)
+
+            self.by_id[vacante_id] = sueldo
+            if sueldo is None:
+                self.missing.add(vacante_id)
+                return
+
+            position = bisect_right(self.values, sueldo)
+            self.values.insert(position, sueldo)
+            self.ids.insert(position, vacante_id)
+            self.bucket_counts[bucket_of(sueldo)] += 1
+
+    def remove(self, vacante_id):
+        with self.lock:
+            if vacante_id in self.by_id:
+                self._remove(vacante_id)
+
+    def _remove(self, vacante_id):
+        sueldo = self.by_id.pop(vacante_id)
+        if sueldo is None:
+            self.missing.discard(vacante_id)
+            return
+
+        lo = bisect_left(self.values, sueldo)
+        hi = bisect_right(self.values, sueldo)
+        position = self.ids.index(vacante_id, lo, hi)
+        del self.values[position]
+        del self.ids[position]
+        self.bucket_counts[bucket_of(sueldo)] -= 1
+
+    def range(
+        self,
+        minimo=None,
+        maximo=None,
+        descending=False,
+        include_missing=False,
+        exclusive_max=False,
+        offset=0,
+        limit=50,
+    ):
+        """
+        Returns (total, page) for vacantes with minimo <= sueldo <= maximo
+        (either bound may be None; with exclusive_max, sueldo < maximo, which
+        matches the histogram buckets). page is a list of (vacante id, sueldo)
+        sorted by sueldo; with include_missing, vacantes without sueldo
+        follow the ranged ones with sueldo None.
+        """
+        with self.lock:
+            lo = 0 if minimo is None else bisect_left(self.values, minimo)
+            if maximo is None:
+                hi = len(self.values)
+            elif exclusive_max:
+                hi = bisect_left(self.values, maximo)
+            else:
+                hi = bisect_right(self.values, maximo)
+            hi = max(lo, hi)
+            matched = hi - lo
+            total = matched + (len(self.missing) if include_missing else 0)
+
+            page = []
+            if offset < matched:
+                count = min(limit, matched - offset)
+                if descending:
+                    start = hi - offset - count
+                    positions = range(start + count - 1, start - 1, -1)
+                else:
+                    start = lo + offset
+                    positions = range(start, start + count)
+                page = [(self.ids[i], self.values[i]) for i in positions]
+
+            if include_missing and len(page) < limit:
+                skip = max(0, offset - matched)
+                missing = sorted(self.missing)[skip : skip + limit - len(page)]
+                page.extend((vacante_id, None) for vacante_id in missing)
+
+            return total, page
+
+    def histogram(self):
+        """
+        Returns the bucket counts as [(minimo, maximo, count)], where the last
+        bucket has maximo None, plus the number of vacantes without sueldo.
+        """
+        with self.lock:
+            buckets = [
+                (
+                    edge,
+                    BUCKET_EDGES[i + 1] if i + 1 < len(BUCKET_EDGES) else None,
+                    count,
+                )
+                for i, (edge, count) in enumerate(zip(BUCKET_EDGES, self.bucket_counts))
+            ]
+            return buckets, len(self.missing)
+
+
+def vacante_sueldo(vacante):
+    if isinstance(vacante, dict):
+        return vacante.get("sueldo")
+    return vacante.sueldo
+
+
+def is_active(vacante):
+    if isinstance(vacante, dict):
+        return vacante.get("activa", True) is not False
+    return vacante.activa is not False
+
+
+def apply_vacante(index, vacante_id, vacante):
+    if is_active(vacante):
+        index.add(vacante_id, vacante_sueldo(vacante))
+    else:
+        index.remove(vacante_id)
+
+
+def build_index():
+    """
+    Builds a fresh index from the vacantes snapshot (caught up with later
+    writes) or else from every active vacante in Firestore.
+    """
+    index = snapshot.restore(SalaryIndex.from_snapshot, apply_vacante)
+    if index is not None:
+        return index
+
+    # Imported here: firebase imports this module for its write hooks
+    from firebase import get_active_vacantes
+
+    return SalaryIndex.from_items(
+        (vacante.id, vacante.sueldo) for vacante in get_active_vacantes()
+    )
+
+
+_live = LiveIndex("salary index", build_index, INDEX_MAX_AGE)
+
+
+def get_index():
+    """
+    Returns the salary index, building it on first use and refreshing it in
+    the background once it is older than SALARY_INDEX_MAX_AGE.
+    """
+    return _live.get()
+
+
+def is_loaded():
+    return _live.is_loaded()
+
+
+def filter_by_sueldo(**filters):
+    """
+    Range query over active vacantes (see SalaryIndex.range).
+    """
+    return get_index().range(**filters)
+
+
+def sueldo_histogram():
+    return get_index().histogram()
+
+
+def index_vacante(vacante_id, vacante):
+    """
+    Write hook: (re)indexes a vacante, or drops it if it is inactive.
+    No-op until the index has been built (the build will include it).
+    """
+    _live.apply(lambda index: apply_vacante(index, vacante_id, vacante))
+
+
+def unindex_vacante(vacante_id):
+    """
+    Write hook: drops a deleted vacante from the index.
+    """
+    _live.apply(lambda index: index.remove(vacante_id))
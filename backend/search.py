@@ -0,0 +1,366 @@
+"""
+In-process full-text search over vacantes (titulo, descripcion, requisitos).
+
+Text goes through backend.text.analyze (accent folding, Spanish stopwords
+and light stemming) and results are ranked with BM25. Postings are kept as
+compact arrays (array("I") of document ordinals, array("H") of term
+frequencies) instead of dicts per document.
+
+The index only holds active vacantes. It is restored from the host's
+vacantes snapshot (backend.snapshot, whose postings are used in place) or
+built from Firestore on first use, and kept current by
+firebase.create_vacante / update_vacante / delete_vacante. Writes made by
+other gunicorn workers are picked up by a background rebuild once the index
+is older than SEARCH_INDEX_MAX_AGE seconds (default 300); see
+backend.live_index.
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+from array import array
+from collections import Counter
+
+from backend import snapshot
+from backend.live_index import LiveIndex
+from backend.text import analyze
+
+# Field weights: a match in the title counts more than one in the body
+FIELD_WEIGHTS = {"titulo": 3, "descripcion": 1, "requisitos": 1}
+
+# Vacante fields whose update requires re-indexing
+INDEXED_FIELDS = frozenset(FIELD_WEIGHTS) | {"activa"}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_TF = 65535  # array("H") limit
+
+INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))
+
+
+class SearchIndex:
+    """
+    BM25 inverted index with incremental add/remove.
+
+    Removed documents are tombstoned (their ordinal maps to None) and their
+    postings are dropped on the next compaction.
+
+    An index restored from a snapshot starts with read-only memoryviews over
+    the mapped file as postings; a posting list is copied into an array
+    the first time a document is added to it.
+    """
+
+    def __init__(self, field_weights=None):
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self.term_ids = {}  # term -> term id
+        self.posting_docs = []  # term id -> array("I") of ordinals
+        self.posting_tfs = []  # term id -> array("H") of weighted term frequencies
+        self.df = []  # term id -> live document frequency
+        self.doc_ids = []  # ordinal -> vacante id (None once removed)
+        self.doc_lengths = array("I")
+        self.doc_terms = []  # ordinal -> array("I") of distinct term ids
+        self.ordinals = {}  # vacante id -> ordinal
+        self.total_length = 0
+        self.tombstones = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.ordinals
+
+    def term_frequencies(self, fields):
+        counts = Counter()
+        for field, weight in self.field_weights.items():
+            for term in analyze(fields.get(field) or ""):
+                counts[term] += weight
+        return counts
+
+    def add(self, doc_id, fields):
+        """
+        Indexes (or re-indexes) a document. fields maps field name to text.
+        """
+        counts = self.term_frequencies(fields)
+        with self.lock:
+            if doc_id in self.ordinals:
+                self._remove(doc_id)
+
+            ordinal = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.ordinals[doc_id] = ordinal
+
+            length = sum(counts.values())
+            self.doc_lengths.append(length)
+            self.total_length += length
+
+            terms = array("I")
+            for term, tf in counts.items():
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self.posting_docs)
+                    self.term_ids[term] = term_id
+                    self.posting_docs.append(array("I"))
+                    self.posting_tfs.append(array("H"))
+                    self.df.append(0)
+                elif not isinstance(self.posting_docs[term_id], array):
+                    # Still a view over the snapshot
+                    self.posting_docs[term_id] = array("I", self.posting_docs[term_id])
+                    self.posting_tfs[term_id] = array("H", self.posting_tfs[term_id])
+                # Ordinals only grow, so postings stay sorted
+                self.posting_docs[term_id].append(ordinal)
+                self.posting_tfs[term_id].append(min(tf, MAX_TF))
+                self.df[term_id] += 1
+                terms.append(term_id)
+            self.doc_terms.append(terms)
+            self._maybe_compact()
+
+    def remove(self, doc_id):
+        with self.lock:
+            if doc_id in self.ordinals:
+                self._remove(doc_id)
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Re-adds tombstone the previous entry too, so both paths compact
+        if self.tombstones > 1000 and self.tombstones > len(self.ordinals):
+            self.compact()
+
+    def _remove(self, doc_id):
+        ordinal = self.ordinals.pop(doc_id)
+        self.doc_ids[ordinal] = None
+        self.total_length -= self.doc_lengths[ordinal]
+        for term_id in self.doc_terms[ordinal]:
+            self.df[term_id] -= 1
+        self.doc_terms[ordinal] = None
+        self.tombstones += 1
+
+    def compact(self):
+        """
+        Drops tombstoned ordinals and renumbers the live documents.
+        """
+        with self.lock:
+            live = [
+                ordinal
+                for ordinal, doc_id in enumerate(self.doc_ids)
+                if doc_id is not None
+            ]
+            remap = {old: new for new, old in enumerate(live)}
+
+            for term_id in range(len(self.posting_docs)):
+                docs = array("I")
+                tfs = array("H")
+                for ordinal, tf in zip(
+                    self.posting_docs[term_id], self.posting_tfs[term_id]
+                ):
+                    new = remap.get(ordinal)
+                    if new is not None:
+                        docs.append(new)
+                        tfs.append(tf)
+                self.posting_docs[term_id] = docs
+                self.posting_tfs[term_id] = tfs
+
+            self.doc_ids = [self.doc_ids[ordinal] for ordinal in live]
+            self.doc_lengths = array(
+                "I", (self.doc_lengths[ordinal] for ordinal in live)
+            )
+            self.doc_terms = [self.doc_terms[ordinal] for ordinal in live]
+            self.ordinals = {
+                doc_id: ordinal for ordinal, doc_id in enumerate(self.doc_ids)
+            }
+            self.tombstones = 0
+
+    @classmethod
+    def from_snapshot(cls, loaded):
+        """
+        Index over the postings of a snapshot, in place. Ordinals are the
+        positions in loaded.catalog.
+        """
+        index = cls()
+        index.doc_ids = [record["id"] for record in loaded.catalog]
+        index.ordinals = {
+            doc_id: ordinal for ordinal, doc_id in enumerate(index.doc_ids)
+        }
+        index.term_ids = {
+            term: term_id for term_id, term in enumerate(loaded.json("search.terms"))
+        }
+        index.df = list(loaded.array("search.df", "I"))
+        index.doc_lengths = array("I", loaded.array("search.doc_lengths", "I"))
+        index.total_length = sum(index.doc_lengths)
+
+        posting_docs = loaded.array("search.posting_docs", "I")
+        posting_tfs = loaded.array("search.posting_tfs", "H")
+        bounds = loaded.array("search.posting_bounds", "Q")
+        index.posting_docs = [
+            posting_docs[bounds[i] : bounds[i + 1]] for i in range(len(bounds) - 1)
+        ]
+        index.posting_tfs = [
+            posting_tfs[bounds[i] : bounds[i + 1]] for i in range(len(bounds) - 1)
+        ]
+        doc_terms = loaded.array("search.doc_terms", "I")
+        bounds = loaded.array("search.doc_term_bounds", "Q")
+        index.doc_terms = [
+            doc_terms[bounds[i] : bounds[i + 1]] for i in range(len(bounds) - 1)
+        ]
+        return index
+
+    def snapshot_sections(self):
+        """
+        The index as snapshot sections (see from_snapshot). Compacts first.
+        """
+        self.compact()
+        with self.lock:
+            posting_bounds = array("Q", [0])
+            for docs in self.posting_docs:
+                posting_bounds.append(posting_bounds[-1] + len(docs))
+            doc_term_bounds = array("Q", [0])
+            for terms in self.doc_terms:
+                doc_term_bounds.append(doc_term_bounds[-1] + len(terms))
+            terms = sorted(self.term_ids, key=self.term_ids.get)
+            return {
+                "search.terms": json.dumps(terms, ensure_ascii=False).encode("utf-8"),
+                "search.df": array("I", self.df),
+                "search.doc_lengths": self.doc_lengths,
+                "search.posting_bounds": posting_bounds,
+                "search.posting_docs": array(
+                    "I", (ordinal for docs in self.posting_docs for ordinal in docs)
+                ),
+                "search.posting_tfs": array(
+                    "H", (tf for tfs in self.posting_tfs for tf in tfs)
+                ),
+                "search.doc_term_bounds": doc_term_bounds,
+                "search.doc_terms": array(
+                    "I", (term_id for terms in self.doc_terms for term_id in terms)
+                ),
+            }
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Returns (total matches, page), the page being up to limit
+        (vacante id, score) pairs, best first, after skipping offset.
+        """
+        terms = set(analyze(query))
+        with self.lock:
+            n_docs = len(self.ordinals)
+            if not terms or not n_docs:
+                return 0, []
+
+            avg_length = self.total_length / n_docs or 1.0
+            doc_ids = self.doc_ids
+            doc_lengths = self.doc_lengths
+            scores = {}
+
+            for term in terms:
+                term_id = self.term_ids.get(term)
+                if term_id is None or self.df[term_id] <= 0:
+                    continue
+                df = self.df[term_id]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for ordinal, tf in zip(
+                    self.posting_docs[term_id], self.posting_tfs[term_id]
+                ):
+                    if doc_ids[ordinal] is None:
+                        continue
+                    norm = BM25_K1 * (
+                        1 - BM25_B + BM25_B * doc_lengths[ordinal] / avg_length
+                    )
+                    scores[ordinal] = scores.get(ordinal, 0.0) + idf * tf * (
+                        BM25_K1 + 1
+                    ) / (tf + norm)
+
+            best = heapq.nlargest(
+                offset + limit, scores.items(), key=lambda item: item[1]
+            )
+            return len(scores), [
+                (doc_ids[ordinal], score) for ordinal, score in best[offset:]
+            ]
+
+
+def vacante_fields(vacante):
+    """
+    Searchable fields of a Vacante model or a vacante dict.
+    """
+    if isinstance(vacante, dict):
+        return {field: vacante.get(field) for field in FIELD_WEIGHTS}
+    return {field: getattr(vacante, field, None) for field in FIELD_WEIGHTS}
+
+
+def is_active(vacante):
+    if isinstance(vacante, dict):
+        return vacante.get("activa", True) is not False
+    return vacante.activa is not False
+
+
+def apply_vacante(index, vacante_id, vacante):
+    if is_active(vacante):
+        index.add(vacante_id, vacante_fields(vacante))
+    else:
+        index.remove(vacante_id)
+
+
+def index_from(vacantes):
+    index = SearchIndex()
+    for vacante in vacantes:
+        index.add(vacante.id, vacante_fields(vacante))
+    return index
+
+
+def snapshot_sections(vacantes):
+    return index_from(vacantes).snapshot_sections()
+
+
+def build_index():
+    """
+    Builds a fresh index from the vacantes snapshot (caught up with later
+    writes) or else from every active vacante in Firestore.
+    """
+    index = snapshot.restore(SearchIndex.from_snapshot, apply_vacante)
+    if index is not None:
+        return index
+
+    # Imported here: firebase imports this module for its write hooks
+    from firebase import get_active_vacantes
+
+    return index_from(get_active_vacantes())
+
+
+_live = LiveIndex("vacante search index", build_index, INDEX_MAX_AGE)
+
+
+def get_index():
+    """
+    Returns the vacante index, building it on first use and refreshing it in
+    the background once it is older than SEARCH_INDEX_MAX_AGE.
+    """
+    return _live.get()
+
+
+def is_loaded():
+    return _live.is_loaded()
+
+
+def search_vacantes(query, limit=20, offset=0):
+    """
+    Ranked full-text search over active vacantes.
+    Returns (total matches, list of (vacante id, score) pairs).
+    """
+    return get_index().search(query, limit, offset)
+
+
+def index_vacante(vacante_id, vacante):
+    """
+    Write hook: (re)indexes a vacante, or drops it if it is inactive.
+    vacante may be a Vacante model or the dict written to Firestore.
+    No-op until the index has been built (the build will include it).
+    """
+    _live.apply(lambda index: apply_vacante(index, vacante_id, vacante))
+
+
+def unindex_vacante(vacante_id):
+    """
+    Write hook: drops a deleted vacante from the index.
+    """
+    _live.apply(lambda index: index.remove(vacante_id))
@@ -0,0 +1,302 @@
+"""
+Host-local cache shared by every worker process.
+
+Each gunicorn worker keeping its own cache would multiply memory by the
+worker count and split the hit rate between workers, so hot documents are
+cached once per host in a SQLite file in WAL mode (readers never block each
+other or the writer):
+
+    empresa:<doc id>             empresa records, which also carry the API
+                                 key state (suscripcionActiva, plan,
+                                 webhooks); unknown IDs are cached briefly
+                                 too, so invalid API keys cost no reads
+    listing:vacantes:<doc id>    the serialized vacantes of an empresa, as
+                                 returned by GET /api/vacantes
+
+Entries expire after their TTL and the file is kept under
+SHARED_CACHE_MAX_BYTES by evicting the least recently used entries. The
+firebase.py write functions invalidate the entries they make stale; writes
+made from other hosts are picked up when the TTL expires.
+
+Values are stored as JSON (datetimes come back as ISO strings, document
+references as their paths), so a tampered file cannot run code. Empresa
+records include webhook secrets: the file, its -wal and -shm files and, by
+default, their directory are only accessible to the server's user. Cache
+errors are logged and treated as misses, never as request failures.
+
+Configuration (environment variables):
+    SHARED_CACHE              "sqlite" (default) or "off"
+    SHARED_CACHE_DB           path of the SQLite file (default: in a private
+                              vinculacion directory under the temp dir)
+    SHARED_CACHE_MAX_BYTES    size bound of the cached values (64 MB)
+    SHARED_CACHE_EMPRESA_TTL  seconds an empresa record is served (60)
+    SHARED_CACHE_MISSING_TTL  seconds an unknown empresa ID is remembered (10)
+    SHARED_CACHE_LISTING_TTL  seconds a vacantes listing is served (30)
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EMPRESA_TTL = float(os.getenv("SHARED_CACHE_EMPRESA_TTL", "60"))
+MISSING_TTL = float(os.getenv("SHARED_CACHE_MISSING_TTL", "10"))
+LISTING_TTL = float(os.getenv("SHARED_CACHE_LISTING_TTL", "30"))
+
+# A hit only rewrites accessed_at if it is older than this, so reads do not
+# turn into a write each
+ACCESS_RESOLUTION = 10.0
+
+# The size bound is checked every this many sets per process
+EVICTION_INTERVAL = 64
+
+# Returned by get() for absent or expired keys (None is a cacheable value)
+MISS = object()
+
+# Holds the default SQLite files and the snapshot (see private_temp_path)
+PRIVATE_DIR = os.path.join(tempfile.gettempdir(), "vinculacion")
+
+
+def serialize(value):
+    """
+    json.dumps default= hook for the Firestore types in cached records.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "path") and hasattr(value, "id"):  # DocumentReference
+        return value.path
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+
+def private_directory(path):
+    """
+    Creates a directory only this user can access, refusing one created by
+    another user (the temp dir is shared).
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.stat(path).st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user")
+    os.chmod(path, 0o700)
+    return path
+
+
+def private_temp_path(name):
+    """
+    Default location of a state file of this app: name inside a private
+    directory in the temp dir, so other users can neither read the file nor
+    plant one (or a symlink) at its predictable path.
+    """
+    return os.path.join(private_directory(PRIVATE_DIR), name)
+
+
+def private_file(path):
+    """
+    Creates the SQLite file with mode 0600 before SQLite opens it: SQLite
+    gives the -wal and -shm files the mode of the database file. Files left
+    by earlier runs are tightened too.
+    """
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.chmod(name, 0o600)
+
+
+class SharedCache:
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.sets = 0
+        private_file(path)
+        conn = self.connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (accessed_at)")
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a cache may lose writes
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        """
+        Returns the cached value of key, or MISS.
+        """
+        try:
+            conn = self.connection()
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return MISS
+            if now - row[2] > ACCESS_RESOLUTION:
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+            return json.loads(row[0])
+        except Exception as e:
+            print(f"Error reading shared cache: {e}")
+            return MISS
+
+    def set(self, key, value, ttl):
+        try:
+            blob = json.dumps(value, default=serialize, separators=(",", ":"))
+            blob = blob.encode("utf-8")
+            now = time.time()
+            conn = self.connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache"
+                " (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl, now),
+            )
+            self.sets += 1
+            if self.sets % EVICTION_INTERVAL == 0:
+                self.evict(conn, now)
+        except Exception as e:
+            print(f"Error writing shared cache: {e}")
+
+    def evict(self, conn, now):
+        """
+        Drops expired entries, then the least recently used ones until the
+        cached values fit in 90% of max_bytes.
+        """
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if total <= self.max_bytes:
+            return
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM(size) OVER (ORDER BY accessed_at, key) AS freed"
+            "  FROM cache)"
+            " WHERE freed - size < ?)",
+            (total - int(self.max_bytes * 0.9),),
+        )
+
+    def delete(self, *keys):
+        try:
+            self.connection().executemany(
+                "DELETE FROM cache WHERE key = ?", [(key,) for key in keys]
+            )
+        except Exception as e:
+            print(f"Error invalidating shared cache: {e}")
+
+    def delete_prefix(self, prefix):
+        """
+        Invalidates every key starting with prefix (a primary key range scan).
+        """
+        try:
+            self.connection().execute(
+                "DELETE FROM cache WHERE key >= ? AND key < ?",
+                (prefix, prefix + "\U0010ffff"),
+            )
+        except Exception as e:
+            print(f"Error invalidating shared cache: {e}")
+
+    def get_or_load(self, key, loader, ttl, none_ttl=None):
+        """
+        Returns the cached value of key, or calls loader() and caches its
+        result. None results are only cached if none_ttl is given.
+        """
+        value = self.get(key)
+        if value is not MISS:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        elif none_ttl:
+            self.set(key, None, none_ttl)
+        return value
+
+    def stats(self):
+        """
+        Returns {"entries", "bytes"} of the live entries.
+        """
+        entries, size = (
+            self.connection()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+                " WHERE expires_at > ?",
+                (time.time(),),
+            )
+            .fetchone()
+        )
+        return {"entries": entries, "bytes": size}
+
+
+class NullCache:
+    """
+    SHARED_CACHE=off: every lookup misses.
+    """
+
+    def get(self, key):
+        return MISS
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def get_or_load(self, key, loader, ttl, none_ttl=None):
+        return loader()
+
+    def stats(self):
+        return {"entries": 0, "bytes": 0}
+
+
+def create_cache():
+    if os.getenv("SHARED_CACHE", "sqlite") == "off":
+        return NullCache()
+    try:
+        path = os.getenv("SHARED_CACHE_DB") or private_temp_path("cache.sqlite3")
+        return SharedCache(path)
+    except Exception as e:
+        print(f"Error opening shared cache, running without it: {e}")
+        return NullCache()
+
+
+shared_cache = create_cache()
+
+
+def empresa_key(doc_id):
+    return f"empresa:{doc_id}"
+
+
+def listing_key(empresa_doc_id):
+    return f"listing:vacantes:{empresa_doc_id}"
+
+
+def invalidate_empresa(doc_id):
+    shared_cache.delete(empresa_key(doc_id))
+
+
+def invalidate_listings(empresa_doc_id=None):
+    """
+    Invalidates the vacantes listing of an empresa, or of every empresa
+    when the writer does not know which one owns the vacante.
+    """
+    if empresa_doc_id:
+        shared_cache.delete(listing_key(empresa_doc_id))
+    else:
+        shared_cache.delete_prefix("listing:")
@@ -0,0 +1,551 @@
+"""
+Canonicalization of free-text skills and languages.
+
+Companies and students type skills by hand ("Python", "python3", "PYTHON ",
+"Pyhton"), so the same skill ends up stored as many different strings. This
+module maps each term to one canonical spelling:
+
+    1. whitespace cleanup, case and accent folding
+    2. synonym dictionary ("js" -> JavaScript, "english" -> Inglés)
+    3. exact match against the vocabulary, also after dropping a trailing
+       version number ("python3", "html5", "java 8")
+    4. fuzzy match (Damerau-Levenshtein distance 1, or 2 for long terms)
+       through a SymSpell-style deletion index, so typos are resolved
+       without comparing against the whole vocabulary
+
+Terms that do not match are kept as typed (cleaned up). A qualifier in
+parentheses ("Inglés (B2)") is preserved after the canonical name.
+
+Every canonical skill has a small integer ID (its position in VOCABULARY),
+which the in-memory matching and faceting code uses instead of strings.
+IDs are stable as long as VOCABULARY is only ever appended to.
+
+Writes are canonicalized in firebase.py. Existing documents can be
+backfilled with:
+
+    python -m backend.skills --backfill [--dry-run]
+"""
+
+import re
+import sys
+from itertools import combinations
+
+from backend.text import fold
+
+HABILIDADES = "habilidades"
+HABILIDADES_BLANDAS = "habilidades_blandas"
+IDIOMAS = "idiomas"
+
+# (kind, canonical name). Append only: the position is the skill ID.
+VOCABULARY = (
+    [
+        (HABILIDADES, name)
+        for name in (
+            "Python",
+            "JavaScript",
+            "TypeScript",
+            "Java",
+            "C",
+            "C++",
+            "C#",
+            "Go",
+            "Rust",
+            "PHP",
+            "Ruby",
+            "Kotlin",
+            "Swift",
+            "R",
+            "MATLAB",
+            "SQL",
+            "NoSQL",
+            "MySQL",
+            "PostgreSQL",
+            "SQL Server",
+            "Oracle",
+            "MongoDB",
+            "Firebase",
+            "HTML",
+            "CSS",
+            "React",
+            "Angular",
+            "Vue.js",
+            "Node.js",
+            "Django",
+            "Flask",
+            "Spring Boot",
+            "Laravel",
+            ".NET",
+            "APIs REST",
+            "GraphQL",
+            "Git",
+            "GitHub",
+            "Docker",
+            "Kubernetes",
+            "Linux",
+            "AWS",
+            "Google Cloud",
+            "Azure",
+            "Pandas",
+            "NumPy",
+            "scikit-learn",
+            "TensorFlow",
+            "PyTorch",
+            "Machine Learning",
+            "Inteligencia Artificial",
+            "Ciencia de datos",
+            "Estadística",
+            "Excel",
+            "Word",
+            "PowerPoint",
+            "Microsoft Office",
+            "Power BI",
+            "Tableau",
+            "SAP",
+            "Salesforce",
+            "Jira",
+            "Scrum",
+            "Metodologías ágiles",
+            "AutoCAD",
+            "SolidWorks",
+            "Photoshop",
+            "Illustrator",
+            "Figma",
+            "WordPress",
+            "SEO",
+            "Marketing digital",
+            "Contabilidad",
+            "Ciberseguridad",
+            "Redes de computadoras",
+            "Arduino",
+        )
+    ]
+    + [
+        (IDIOMAS, name)
+        for name in (
+            "Español",
+            "Inglés",
+            "Francés",
+            "Alemán",
+            "Italiano",
+            "Portugués",
+            "Chino mandarín",
+            "Japonés",
+            "Coreano",
+            "Ruso",
+            "Árabe",
+            "Náhuatl",
+            "Maya",
+            "Zapoteco",
+            "Mixteco",
+            "Otomí",
+            "Lengua de Señas Mexicana",
+        )
+    ]
+    + [
+        (HABILIDADES_BLANDAS, name)
+        for name in (
+            "Trabajo en equipo",
+            "Comunicación",
+            "Comunicación asertiva",
+            "Liderazgo",
+            "Resolución de problemas",
+            "Pensamiento crítico",
+            "Adaptabilidad",
+            "Gestión del tiempo",
+            "Creatividad",
+            "Empatía",
+            "Proactividad",
+            "Responsabilidad",
+            "Negociación",
+            "Organización",
+            "Toma de decisiones",
+            "Trabajo bajo presión",
+            "Atención al detalle",
+            "Autogestión",
+        )
+    ]
+)
+
+# Folded alias -> canonical name (must exist in VOCABULARY for its kind)
+SYNONYMS = {
+    HABILIDADES: {
+        "py": "Python",
+        "js": "JavaScript",
+        "ecmascript": "JavaScript",
+        "ts": "TypeScript",
+        "cpp": "C++",
+        "c plus plus": "C++",
+        "csharp": "C#",
+        "c sharp": "C#",
+        "golang": "Go",
+        "postgres": "PostgreSQL",
+        "psql": "PostgreSQL",
+        "mssql": "SQL Server",
+        "ms sql": "SQL Server",
+        "microsoft sql server": "SQL Server",
+        "mongo": "MongoDB",
+        "reactjs": "React",
+        "react.js": "React",
+        "angularjs": "Angular",
+        "vue": "Vue.js",
+        "vuejs": "Vue.js",
+        "node": "Node.js",
+        "nodejs": "Node.js",
+        "spring": "Spring Boot",
+        "dotnet": ".NET",
+        "net": ".NET",
+        "rest": "APIs REST",
+        "api rest": "APIs REST",
+        "apis": "APIs REST",
+        "k8s": "Kubernetes",
+        "amazon web services": "AWS",
+        "gcp": "Google Cloud",
+        "google cloud platform": "Google Cloud",
+        "microsoft azure": "Azure",
+        "sklearn": "scikit-learn",
+        "scikit learn": "scikit-learn",
+        "ml": "Machine Learning",
+        "aprendizaje automatico": "Machine Learning",
+        "ia": "Inteligencia Artificial",
+        "ai": "Inteligencia Artificial",
+        "data science": "Ciencia de datos",
+        "ms excel": "Excel",
+        "microsoft excel": "Excel",
+        "ms word": "Word",
+        "microsoft word": "Word",
+        "office": "Microsoft Office",
+        "paqueteria office": "Microsoft Office",
+        "ms office": "Microsoft Office",
+        "powerbi": "Power BI",
+        "adobe photoshop": "Photoshop",
+        "adobe illustrator": "Illustrator",
+        "agile": "Metodologías ágiles",
+        "metodologias agiles": "Metodologías ágiles",
+        "seguridad informatica": "Ciberseguridad",
+        "redes": "Redes de computadoras",
+    },
+    IDIOMAS: {
+        "spanish": "Español",
+        "castellano": "Español",
+        "english": "Inglés",
+        "french": "Francés",
+        "german": "Alemán",
+        "italian": "Italiano",
+        "portuguese": "Portugués",
+        "chino": "Chino mandarín",
+        "mandarin": "Chino mandarín",
+        "japanese": "Japonés",
+        "korean": "Coreano",
+        "russian": "Ruso",
+        "nahuatl": "Náhuatl",
+        "lsm": "Lengua de Señas Mexicana",
+        "lengua de senas": "Lengua de Señas Mexicana",
+    },
+    HABILIDADES_BLANDAS: {
+        "teamwork": "Trabajo en equipo",
+        "trabajo colaborativo": "Trabajo en equipo",
+        "colaboracion": "Trabajo en equipo",
+        "comunicacion efectiva": "Comunicación",
+        "leadership": "Liderazgo",
+        "solucion de problemas": "Resolución de problemas",
+        "problem solving": "Resolución de problemas",
+        "manejo del tiempo": "Gestión del tiempo",
+        "administracion del tiempo": "Gestión del tiempo",
+        "trabajo bajo presion": "Trabajo bajo presión",
+    },
+}
+
+# Fuzzy matching is skipped below this length ("C" vs "R", "Go" vs "Git")
+MIN_FUZZY_LENGTH = 4
+LONG_TERM_LENGTH = 8  # terms this long tolerate distance 2
+
+QUALIFIER_RE = re.compile(r"^(.*?)\s*(\([^)]*\))\s*$")
+VERSION_RE = re.compile(r"^(.*?)\s*v?\d+(?:\.\d+)*$")
+SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_key(term):
+    """
+    Folded lookup key: lowercase, no accents, single spaces.
+    """
+    return SPACES_RE.sub(" ", fold(term)).strip()
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment (Damerau-Levenshtein) distance between a and b.
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                previous2 is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletes(key, distance):
+    """
+    All strings obtained by deleting up to distance characters from key.
+    """
+    results = {key}
+    for n in range(1, min(distance, len(key) - 1) + 1):
+        for positions in combinations(range(len(key)), n):
+            skip = set(positions)
+            results.add("".join(ch for i, ch in enumerate(key) if i not in skip))
+    return results
+
+
+def max_distance(key):
+    return 2 if len(key) >= LONG_TERM_LENGTH else 1
+
+
+class SkillVocabulary:
+    """
+    Lookup structures for one kind of term (habilidades, idiomas, ...).
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.exact = {}  # folded key -> (skill id, canonical name)
+        self.deletion_index = {}  # deletion variant -> set of folded keys
+
+        for skill_id, (entry_kind, name) in enumerate(VOCABULARY):
+            if entry_kind != kind:
+                continue
+            key = normalize_key(name)
+            self.exact[key] = (skill_id, name)
+            for variant in deletes(key, max_distance(key)):
+                self.deletion_index.setdefault(variant, set()).add(key)
+
+        for alias, name in SYNONYMS.get(kind, {}).items():
+            self.exact[normalize_key(alias)] = self.exact[normalize_key(name)]
+
+    def lookup(self, key):
+        """
+        Returns (skill id, canonical name) for a folded key, or None.
+        """
+        match = self.exact.get(key)
+        if match:
+            return match
+
+        version = VERSION_RE.match(key)
+        if version and version.group(1):
+            match = self.exact.get(version.group(1))
+            if match:
+                return match
+
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+        return self.fuzzy(key)
+
+    def fuzzy(self, key):
+        limit = max_distance(key)
+        candidates = set()
+        for variant in deletes(key, limit):
+            candidates.update(self.deletion_index.get(variant, ()))
+
+        best = None
+        for candidate in candidates:
+            if len(candidate) < MIN_FUZZY_LENGTH:
+                continue
+            allowed = min(limit, max_distance(candidate))
+            distance = edit_distance(key, candidate, allowed)
+            if distance <= allowed and (best is None or distance < best[0]):
+                best = (distance, candidate)
+        return self.exact[best[1]] if best else None
+
+
+_vocabularies = {}
+
+
+def get_vocabulary(kind):
+    vocabulary = _vocabularies.get(kind)
+    if vocabulary is None:
+        vocabulary = _vocabularies[kind] = SkillVocabulary(kind)
+    return vocabulary
+
+
+def canonicalize(term, kind):
+    """
+    Returns (canonical term, skill id). Unknown terms come back cleaned up
+    with skill id None.
+    """
+    cleaned = SPACES_RE.sub(" ", term).strip()
+    if not cleaned:
+        return "", None
+
+    qualifier = ""
+    match = QUALIFIER_RE.match(cleaned)
+    if match and match.group(1):
+        cleaned, qualifier = match.group(1), " " + match.group(2)
+
+    found = get_vocabulary(kind).lookup(normalize_key(cleaned))
+    if found is None:
+        return cleaned + qualifier, None
+
+    skill_id, name = found
+    return name + qualifier, skill_id
+
+
+def split_terms(value):
+    """
+    Accepts a list (vacantes) or a comma-separated string (alumnos).
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [term for term in value if isinstance(term, str) and term.strip()]
+
+
+def canonicalize_list(value, kind):
+    """
+    Canonicalizes every term of value, dropping duplicates (keeps order).
+    Returns a list of strings.
+    """
+    result = []
+    seen = set()
+    for term in split_terms(value):
+        canonical, _ = canonicalize(term, kind)
+        key = normalize_key(canonical)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(canonical)
+    return result
+
+
+def canonicalize_text(value, kind):
+    """
+    Same as canonicalize_list for the comma-separated strings stored on
+    alumnos. Returns a string (None stays None).
+    """
+    if value is None:
+        return None
+    return ", ".join(canonicalize_list(value, kind))
+
+
+def skill_ids(value, kind):
+    """
+    Returns the sorted skill IDs of the known terms in value.
+    """
+    ids = set()
+    for term in split_terms(value):
+        _, skill_id = canonicalize(term, kind)
+        if skill_id is not None:
+            ids.add(skill_id)
+    return sorted(ids)
+
+
+def skill_name(skill_id):
+    return VOCABULARY[skill_id][1]
+
+
+# Fields canonicalized on write, per collection
+VACANTE_FIELDS = {"habilidadesDuras": HABILIDADES, "idiomas": IDIOMAS}
+ALUMNO_FIELDS = {
+    "habilidades_tecnicas": HABILIDADES,
+    "habilidades_blandas": HABILIDADES_BLANDAS,
+    "idiomas": IDIOMAS,
+}
+
+
+def canonicalize_vacante(data):
+    """
+    Canonicalizes the skill fields of a vacante dict in place (lists).
+    """
+    for field, kind in VACANTE_FIELDS.items():
+        if field in data and data[field] is not None:
+            data[field] = canonicalize_list(data[field], kind)
+    return data
+
+
+def canonicalize_alumno(data):
+    """
+    Canonicalizes the skill fields of an alumno dict in place (strings).
+    """
+    for field, kind in ALUMNO_FIELDS.items():
+        if field in data and data[field] is not None:
+            data[field] = canonicalize_text(data[field], kind)
+    return data
+
+
+def backfill(dry_run=False, batch_size=400):
+    """
+    Rewrites the skill fields of every existing vacante and alumno in
+    canonical form. Only documents that change are written, in batches.
+    """
+    from firebase_admin import firestore
+
+    db = firestore.client()
+    jobs = (
+        ("vacantes", VACANTE_FIELDS, canonicalize_vacante),
+        ("alumnos", ALUMNO_FIELDS, canonicalize_alumno),
+    )
+
+    for collection, fields, canonicalize_doc in jobs:
+        batch = db.batch()
+        pending = changed = scanned = 0
+
+        for doc in db.collection(collection).select(list(fields)).stream():
+            scanned += 1
+            original = doc.to_dict() or {}
+            updated = canonicalize_doc(dict(original))
+            update = {
+                field: updated[field]
+                for field in fields
+                if field in updated and updated[field] != original.get(field)
+            }
+            if not update:
+                continue
+
+            changed += 1
+            print(f"{collection}/{doc.id}: {update}")
+            if dry_run:
+                continue
+
+            batch.update(doc.reference, update)
+            pending += 1
+            if pending == batch_size:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+
+        if pending:
+            batch.commit()
+
+        print(f"{collection}: {changed} of {scanned} documents canonicalized")
+
+
+if __name__ == "__main__":
+    if "--backfill" not in sys.argv:
+        print("Usage: python -m backend.skills --backfill [--dry-run]")
+        sys.exit(1)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    backfill(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,382 @@
+"""
+Memory-mapped snapshot of the active vacantes catalog and its indexes.
+
+Without it, every worker that starts (or refreshes an index) streams every
+active vacante from Firestore once per index and recomputes the analyzed
+postings and MinHash signatures. Instead, one worker per host periodically
+writes VACANTES_SNAPSHOT, a versioned binary file holding:
+
+    catalog              the active vacantes as JSON records (id, empresa,
+                         titulo, habilidadesDuras, idiomas, sueldo)
+    search.*             the BM25 postings, document lengths and terms
+    dedupe.*             the MinHash signatures, one uint32 row per vacante
+
+Workers map the file read-only. The postings and signatures are used in
+place (memoryview / numpy views over the mapping), so every process on the
+host shares the same page cache pages instead of holding its own copy.
+The salary and autocomplete indexes are rebuilt from the catalog records,
+which costs CPU but no Firestore reads.
+
+A restored index is caught up with the vacantes updated after the
+snapshot's watermark (one query on updated_at, which every vacante write
+sets, shared by the indexes a worker restores together; if it fails the
+index is built from Firestore instead); the watermark is taken SNAPSHOT_WATERMARK_MARGIN seconds before the
+stream started, so writes racing the stream are applied twice rather than
+missed. Deletes are not visible to that query: the deleting worker updates
+its own indexes and the others drop the vacante with the next snapshot.
+
+The file is replaced atomically (written aside, then os.replace), so a
+worker still mapping the previous version keeps a consistent view. A
+snapshot with another format or index parameters (fingerprint()), or older
+than VACANTES_SNAPSHOT_MAX_AGE seconds, is ignored and the indexes are
+built from Firestore as before.
+
+    python -m backend.snapshot [PATH]
+
+writes a snapshot by hand.
+
+Configuration (environment variables):
+    VACANTES_SNAPSHOT            path of the file
+    VACANTES_SNAPSHOT_INTERVAL   seconds between snapshots (300, 0 = no writer)
+    VACANTES_SNAPSHOT_MAX_AGE    oldest snapshot a worker loads (900)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from backend.shared_cache import private_temp_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process writer lock
+    fcntl = None
+
+PATH = os.getenv("VACANTES_SNAPSHOT") or private_temp_path("vacantes.snapshot")
+INTERVAL = float(os.getenv("VACANTES_SNAPSHOT_INTERVAL", "300"))
+MAX_AGE = float(os.getenv("VACANTES_SNAPSHOT_MAX_AGE", "900"))
+WATERMARK_MARGIN = float(os.getenv("SNAPSHOT_WATERMARK_MARGIN", "60"))
+# The indexes restored within this many seconds of each other (a worker
+# building all of them) share one catch-up query
+CHANGES_MAX_AGE = 30.0
+CHECK_INTERVAL = min(INTERVAL, 60.0) if INTERVAL > 0 else 0
+
+MAGIC = b"VACSNAP\0"
+FORMAT = 1
+PREAMBLE = struct.Struct("<8sII")  # magic, format, header length
+ALIGNMENT = 8
+
+
+def fingerprint():
+    """
+    Parameters the stored structures depend on; a snapshot written with
+    different ones is ignored.
+    """
+    from backend import dedupe, search
+
+    return {
+        "format": FORMAT,
+        "search_fields": search.FIELD_WEIGHTS,
+        "num_perm": dedupe.NUM_PERM,
+        "shingle_size": dedupe.SHINGLE_SIZE,
+    }
+
+
+def data_start(header_length):
+    """
+    Offset of the first section: after the header, aligned.
+    """
+    return -(-(PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+
+
+class SnapshotError(Exception):
+    """
+    The file is not a usable snapshot.
+    """
+
+
+class Snapshot:
+    """
+    A snapshot file mapped read-only. Sections are returned as views over
+    the mapping, without copying.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.view = memoryview(self.buffer)
+
+        magic, file_format, header_length = PREAMBLE.unpack_from(self.buffer)
+        if magic != MAGIC or file_format != FORMAT:
+            raise SnapshotError(f"{path} is not a format {FORMAT} snapshot")
+        header = json.loads(
+            bytes(self.view[PREAMBLE.size : PREAMBLE.size + header_length])
+        )
+        if header["fingerprint"] != fingerprint():
+            raise SnapshotError(f"{path} was written with other index parameters")
+
+        self.version = header["version"]
+        self.created_at = header["created_at"]
+        self.watermark = datetime.fromtimestamp(header["watermark"], timezone.utc)
+        self.meta = header["meta"]
+        # name -> [offset after the header, length]
+        self.sections = header["sections"]
+        self.start = data_start(header_length)
+        self._catalog = None
+        self._changes = None
+        self._changes_at = 0.0
+        self._changes_lock = threading.Lock()
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def raw(self, name):
+        offset, length = self.sections[name]
+        offset += self.start
+        return self.view[offset : offset + length]
+
+    def array(self, name, typecode):
+        """
+        Section as a read-only memoryview of typecode items.
+        """
+        return self.raw(name).cast(typecode)
+
+    def numpy(self, name, dtype):
+        import numpy as np
+
+        return np.frombuffer(self.raw(name), dtype=dtype)
+
+    def json(self, name):
+        return json.loads(bytes(self.raw(name)))
+
+    @property
+    def catalog(self):
+        """
+        The catalog records, in snapshot order (the search ordinals).
+        """
+        if self._catalog is None:
+            self._catalog = self.json("catalog")
+        return self._catalog
+
+    def changes(self):
+        """
+        Vacante models (active or not) updated after the watermark. The list
+        is queried once and shared by the indexes restored in the next
+        CHANGES_MAX_AGE seconds; later rebuilds query it again, since they
+        must see the writes made meanwhile. Raises SnapshotError if the
+        query fails.
+        """
+        from firebase import get_vacantes_updated_since
+
+        with self._changes_lock:
+            if (
+                self._changes is None
+                or time.monotonic() - self._changes_at > CHANGES_MAX_AGE
+            ):
+                changes = get_vacantes_updated_since(self.watermark)
+                if changes is None:
+                    raise SnapshotError("Could not read the vacantes updated since")
+                self._changes, self._changes_at = changes, time.monotonic()
+            return self._changes
+
+
+def catalog_record(vacante):
+    from backend.salary import parse_sueldo
+
+    return {
+        "id": vacante.id,
+        "empresa": vacante.empresa_doc_id,
+        "titulo": vacante.titulo,
+        "habilidadesDuras": list(vacante.habilidadesDuras or []),
+        "idiomas": list(vacante.idiomas or []),
+        "sueldo": parse_sueldo(vacante.sueldo),
+    }
+
+
+def write_snapshot(path=PATH):
+    """
+    Streams the active vacantes once and writes a new snapshot to path.
+    Returns the number of vacantes, or None if there was nothing to write.
+    """
+    from backend import dedupe, search
+    from firebase import get_active_vacantes
+
+    watermark = time.time() - WATERMARK_MARGIN
+    vacantes = get_active_vacantes()
+    if not vacantes:
+        # get_active_vacantes also returns [] on errors: keep the old file
+        return None
+
+    sections = {
+        "catalog": json.dumps(
+            [catalog_record(vacante) for vacante in vacantes],
+            ensure_ascii=False,
+        ).encode("utf-8")
+    }
+    sections.update(search.snapshot_sections(vacantes))
+    sections.update(dedupe.snapshot_sections(vacantes))
+
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        data = memoryview(data).cast("B")
+        sections[name] = data
+        layout[name] = [offset, data.nbytes]
+        offset += -(-data.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = {
+        "version": time.time_ns(),
+        "created_at": time.time(),
+        "watermark": watermark,
+        "fingerprint": fingerprint(),
+        "meta": {"count": len(vacantes)},
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = data_start(len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in sections.items():
+            f.seek(start + layout[name][0])
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    print(f"Vacantes snapshot written: {len(vacantes)} vacantes")
+    return len(vacantes)
+
+
+_snapshot = None
+_load_lock = threading.Lock()
+
+
+def load(path=PATH):
+    """
+    Returns the current snapshot of this host, mapped once per file version,
+    or None if there is no usable one.
+    """
+    global _snapshot
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if time.time() - stat.st_mtime > MAX_AGE:
+        return None
+
+    with _load_lock:
+        if _snapshot is None or _snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+            try:
+                _snapshot = Snapshot(path)
+            except (OSError, ValueError, KeyError, SnapshotError) as e:
+                print(f"Error loading vacantes snapshot: {e}")
+                return None
+        return _snapshot
+
+
+def restore(from_snapshot, apply_vacante):
+    """
+    Builds an index with from_snapshot(snapshot) and catches it up with
+    apply_vacante(index, vacante id, vacante) for every vacante updated
+    after the watermark. Returns None if there is no usable snapshot.
+    """
+    loaded = load()
+    if loaded is None:
+        return None
+    try:
+        index = from_snapshot(loaded)
+        # Without the catch-up the index would miss recent writes: the
+        # caller then builds it from Firestore instead
+        for vacante in loaded.changes():
+            apply_vacante(index, vacante.id, vacante)
+    except Exception as e:
+        print(f"Error restoring index from vacantes snapshot: {e}")
+        return None
+    return index
+
+
+def refresh(path=PATH):
+    """
+    Writes a new snapshot if the current one is older than INTERVAL and no
+    other worker of this host is writing it.
+    """
+    try:
+        if time.time() - os.stat(path).st_mtime < INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+        # Another worker may have finished a snapshot while we checked
+        try:
+            if time.time() - os.stat(path).st_mtime < INTERVAL:
+                return
+        except FileNotFoundError:
+            pass
+        write_snapshot(path)
+
+
+_writer = None
+
+
+def start_writer():
+    """
+    Starts the thread that keeps this host's snapshot at most INTERVAL
+    seconds old. Does nothing with VACANTES_SNAPSHOT_INTERVAL=0.
+    """
+    global _writer
+    if INTERVAL <= 0:
+        return None
+
+    def loop():
+        while True:
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error writing vacantes snapshot: {e}")
+            time.sleep(CHECK_INTERVAL)
+
+    _writer = threading.Thread(target=loop, daemon=True, name="vacantes-snapshot")
+    _writer.start()
+    return _writer
+
+
+def _restart_after_fork():
+    """
+    Threads do not survive a fork: a child of a process running the writer
+    (a gunicorn worker of a --preload app) starts its own, and gets a fresh
+    _load_lock in case a thread of the parent held it.
+    """
+    global _load_lock
+    _load_lock = threading.Lock()
+    if _writer is not None:
+        start_writer()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from firebase import initialize_firebase
+
+    initialize_firebase()
+    write_snapshot(sys.argv[1] if len(sys.argv) > 1 else PATH)
@@ -0,0 +1,97 @@
+"""
+Spanish-aware text normalization shared by the search and matching features.
+
+Text is lowercased and accent-folded ("Programación" -> "programacion"),
+split into alphanumeric tokens, stripped of stopwords and reduced with a
+light suffix-stripping stemmer, so "desarrollador", "desarrolladora" and
+"desarrollo" end up as the same term.
+"""
+
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[+#][a-z0-9+#]*|[+#]+)?")
+
+STOPWORDS_ES = frozenset("""
+    a al algo algunas algunos ante antes como con contra cual cuando de del
+    desde donde durante e el ella ellas ellos en entre era es esa esas ese
+    eso esos esta estas este esto estos fue ha hay la las le les lo los mas
+    me mi mis muy ni no nos o os otra otro para pero por porque que quien se
+    sea ser si sin sobre su sus tambien te tiene tu tus un una unas uno unos
+    y ya
+    """.split())
+
+# Longest first; only the first match is stripped
+SUFFIXES_ES = (
+    "amientos",
+    "imientos",
+    "amiento",
+    "imiento",
+    "aciones",
+    "uciones",
+    "adoras",
+    "adores",
+    "idades",
+    "iendo",
+    "adora",
+    "acion",
+    "ucion",
+    "mente",
+    "ables",
+    "ibles",
+    "istas",
+    "ador",
+    "idad",
+    "able",
+    "ible",
+    "ismo",
+    "ista",
+    "ando",
+    "es",
+    "os",
+    "as",
+    "s",
+    "o",
+    "a",
+    "e",
+)
+
+MIN_STEM_LENGTH = 3
+
+
+def fold(text):
+    """
+    Lowercases text and removes accents (ñ becomes n).
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(word):
+    """
+    Light Spanish stemmer: strips one inflectional/derivational suffix,
+    keeping at least MIN_STEM_LENGTH characters. Tokens with digits or
+    symbols (c++, python3) are left alone.
+    """
+    if not word.isalpha():
+        return word
+    for suffix in SUFFIXES_ES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """
+    Returns the folded tokens of text, stopwords included.
+    """
+    if not text:
+        return []
+    return TOKEN_RE.findall(fold(text))
+
+
+def analyze(text):
+    """
+    Returns the index terms of text: folded, stopword-free and stemmed.
+    """
+    return [stem(token) for token in tokenize(text) if token not in STOPWORDS_ES]
@@ -0,0 +1,356 @@
+"""
+Declarative validation of request payloads.
+
+The web forms, the JSON API (Flask and ASGI) and the bulk import all
+validate vacantes and alumnos through the schemas defined here, so field
+lists, coercions and limits live in one place. Each Schema compiles its
+fields into coercion closures when the module is imported; validating a
+payload is then a single loop over prebuilt (field, keys, coerce) entries.
+
+    clean, errors = VACANTE.validate(data, partial=True)
+
+    * partial=False (create): missing fields get their default and required
+      fields must be present and non-empty
+    * partial=True (update): only the fields present are returned
+    * form=True: values come from an HTML form or a spreadsheet; blank
+      strings count as missing
+    * errors maps field name -> message, in English for the API or in
+      Spanish with lang="es"; clean is only meaningful when errors is empty
+
+Field names are the ones the forms and the API use. Some are stored under
+a different key in Firestore (educacion is stored as "educación");
+Schema.stored_names holds that mapping for the firebase write functions.
+"""
+
+import math
+import re
+
+MISSING = object()
+
+TEXT = "text"
+INT = "int"
+FLOAT = "float"
+MONEY = "money"  # float that also accepts "$15,000.50 MXN"
+BOOL = "bool"
+LIST = "list"  # list of strings; a string is split on commas or semicolons
+
+DEFAULTS = {TEXT: "", LIST: []}
+
+LIST_SEPARATOR_RE = re.compile(r"[,;]")
+MONEY_CLEAN_RE = re.compile(r"[\s$,]|mxn", re.IGNORECASE)
+TRUE_STRINGS = frozenset({"true", "1", "on", "si", "sí", "yes"})
+FALSE_STRINGS = frozenset({"false", "0", "off", "no"})
+
+MESSAGES = {
+    "en": {
+        "required": "Field '{name}' is required",
+        "text": "Field '{name}' must be a string",
+        "too_long": "Field '{name}' must be at most {max_length} characters",
+        "number": "Field '{name}' must be a number",
+        "integer": "Field '{name}' must be an integer",
+        "min": "Field '{name}' must be at least {min_value}",
+        "max": "Field '{name}' must be at most {max_value}",
+        "bool": "Field '{name}' must be true or false",
+        "list": "Field '{name}' must be a list of strings",
+        "too_many": "Field '{name}' must have at most {max_items} items",
+        "item_too_long": "Items of '{name}' must be at most {max_length} characters",
+        "choices": "Field '{name}' must be one of: {choices}",
+    },
+    "es": {
+        "required": "El campo {label} es obligatorio.",
+        "text": "El campo {label} debe ser texto.",
+        "too_long": "El campo {label} admite como máximo {max_length} caracteres.",
+        "number": "El campo {label} debe ser un número.",
+        "integer": "El campo {label} debe ser un número entero.",
+        "min": "El campo {label} debe ser al menos {min_value}.",
+        "max": "El campo {label} debe ser como máximo {max_value}.",
+        "bool": "El campo {label} debe ser sí o no.",
+        "list": "El campo {label} debe ser una lista de textos.",
+        "too_many": "El campo {label} admite como máximo {max_items} elementos.",
+        "item_too_long": (
+            "Cada elemento de {label} admite como máximo {max_length} caracteres."
+        ),
+        "choices": "El campo {label} debe ser uno de: {choices}.",
+    },
+}
+
+
+class FieldError(Exception):
+    """
+    Raised by a coercer; code is a key of MESSAGES.
+    """
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class Field:
+    def __init__(
+        self,
+        name,
+        kind=TEXT,
+        required=False,
+        default=MISSING,
+        max_length=None,
+        min_value=None,
+        max_value=None,
+        max_items=None,
+        choices=None,
+        stored_as=None,
+        label=None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.required = required
+        self.default = DEFAULTS.get(kind, None) if default is MISSING else default
+        self.max_length = max_length
+        self.min_value = min_value
+        self.max_value = max_value
+        self.max_items = max_items
+        self.choices = tuple(choices) if choices else None
+        self.stored_as = stored_as or name
+        self.label = label or name
+
+    def default_value(self):
+        return list(self.default) if isinstance(self.default, list) else self.default
+
+    def message(self, code, lang):
+        return MESSAGES[lang][code].format(
+            name=self.name,
+            label=self.label,
+            max_length=self.max_length,
+            min_value=self.min_value,
+            max_value=self.max_value,
+            max_items=self.max_items,
+            choices=", ".join(self.choices or ()),
+        )
+
+
+def _text(field):
+    max_length = field.max_length
+    choices = field.choices
+
+    def coerce(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Spreadsheet cells such as duracion = 6
+            value = str(value)
+        elif not isinstance(value, str):
+            raise FieldError("text")
+        value = value.strip()
+        if max_length is not None and len(value) > max_length:
+            raise FieldError("too_long")
+        if choices is not None and value and value not in choices:
+            raise FieldError("choices")
+        return value
+
+    return coerce
+
+
+def _number(field):
+    integer = field.kind == INT
+    money = field.kind == MONEY
+    min_value = field.min_value
+    max_value = field.max_value
+
+    def coerce(value):
+        if isinstance(value, bool):
+            raise FieldError("number")
+        if isinstance(value, str):
+            text = MONEY_CLEAN_RE.sub("", value) if money else value.strip()
+            try:
+                value = float(text)
+            except ValueError:
+                raise FieldError("number")
+        elif not isinstance(value, (int, float)):
+            raise FieldError("number")
+        try:
+            finite = math.isfinite(value)
+        except OverflowError:  # ints beyond float range, e.g. 10**400 in JSON
+            finite = False
+        if not finite:
+            raise FieldError("number")
+        if integer:
+            if value != int(value):
+                raise FieldError("integer")
+            value = int(value)
+        else:
+            value = float(value)
+        if min_value is not None and value < min_value:
+            raise FieldError("min")
+        if max_value is not None and value > max_value:
+            raise FieldError("max")
+        return value
+
+    return coerce
+
+
+def _bool(field):
+    def coerce(value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in TRUE_STRINGS:
+                return True
+            if text in FALSE_STRINGS:
+                return False
+        raise FieldError("bool")
+
+    return coerce
+
+
+def _list(field):
+    max_items = field.max_items
+    max_length = field.max_length
+
+    def coerce(value):
+        if isinstance(value, str):
+            value = LIST_SEPARATOR_RE.split(value)
+        elif not isinstance(value, (list, tuple)):
+            raise FieldError("list")
+        items = []
+        for item in value:
+            if not isinstance(item, str):
+                raise FieldError("list")
+            item = item.strip()
+            if not item:
+                continue
+            if max_length is not None and len(item) > max_length:
+                raise FieldError("item_too_long")
+            items.append(item)
+        if max_items is not None and len(items) > max_items:
+            raise FieldError("too_many")
+        return items
+
+    return coerce
+
+
+COERCERS = {
+    TEXT: _text,
+    INT: _number,
+    FLOAT: _number,
+    MONEY: _number,
+    BOOL: _bool,
+    LIST: _list,
+}
+
+
+class Schema:
+    def __init__(self, *fields):
+        self.fields = fields
+        self.names = tuple(field.name for field in fields)
+        self.stored_names = {
+            field.name: field.stored_as
+            for field in fields
+            if field.stored_as != field.name
+        }
+        # Compiled once: (field, accepted keys, coercer)
+        self._compiled = tuple(
+            (
+                field,
+                (
+                    (field.name, field.stored_as)
+                    if field.stored_as != field.name
+                    else (field.name,)
+                ),
+                COERCERS[field.kind](field),
+            )
+            for field in fields
+        )
+
+    def validate(self, data, partial=False, form=False, lang="en"):
+        """
+        Returns (clean data, errors) for a payload (dict or form MultiDict).
+        """
+        clean = {}
+        errors = {}
+        if not isinstance(data, dict):
+            # JSON arrays or scalars carry no fields (form MultiDicts are dicts)
+            data = {}
+
+        for field, keys, coerce in self._compiled:
+            value = MISSING
+            for key in keys:
+                if key in data:
+                    value = data[key]
+                    break
+            if value is None or (form and isinstance(value, str) and not value.strip()):
+                value = MISSING
+
+            if value is MISSING:
+                if partial:
+                    continue
+                if field.required:
+                    errors[field.name] = field.message("required", lang)
+                else:
+                    clean[field.name] = field.default_value()
+                continue
+
+            try:
+                value = coerce(value)
+            except FieldError as e:
+                errors[field.name] = field.message(e.code, lang)
+                continue
+            if field.required and value in ("", []):
+                errors[field.name] = field.message("required", lang)
+                continue
+            clean[field.name] = value
+
+        return clean, errors
+
+    def to_stored(self, data):
+        """
+        Renames validated fields to their Firestore keys.
+        """
+        stored_names = self.stored_names
+        return {stored_names.get(key, key): value for key, value in data.items()}
+
+
+def first_error(errors):
+    return next(iter(errors.values()))
+
+
+VACANTE = Schema(
+    Field("titulo", required=True, max_length=200, label="título"),
+    Field("descripcion", max_length=5000, label="descripción"),
+    Field("requisitos", max_length=5000),
+    Field("modalidad", max_length=100),
+    Field("tipoContrato", max_length=100, label="tipo de contrato"),
+    Field("duracion", max_length=100, label="duración"),
+    Field("horario", max_length=200),
+    Field("sueldo", MONEY, min_value=0),
+    Field("educacion", max_length=100, stored_as="educación", label="educación"),
+    Field("experienciaRequerida", max_length=500, label="experiencia requerida"),
+    Field(
+        "habilidadesDuras",
+        LIST,
+        max_items=50,
+        max_length=100,
+        label="habilidades duras",
+    ),
+    Field("idiomas", LIST, max_items=20, max_length=50),
+    Field("nombreEmpresa", max_length=200),
+    Field("activa", BOOL, default=True),
+)
+
+ALUMNO = Schema(
+    Field("nombre", max_length=150),
+    Field("edad", INT, min_value=14, max_value=100),
+    Field("estatus", choices=("Activo", "Inactivo")),
+    Field("semestre", max_length=20),  # free text, e.g. "5°"
+    Field("promedio", FLOAT, min_value=0, max_value=100),
+    Field("area1", max_length=150, label="área de interés 1"),
+    Field("area2", max_length=150, label="área de interés 2"),
+    Field("area3", max_length=150, label="área de interés 3"),
+    # Stored as comma-separated text, canonicalized by backend.skills
+    Field("habilidades_tecnicas", max_length=2000, label="habilidades técnicas"),
+    Field("habilidades_blandas", max_length=2000, label="habilidades blandas"),
+    Field("idiomas", max_length=1000),
+)
+
+POSTULACION = Schema(
+    Field("vacanteId", required=True, max_length=100, label="vacante"),
+    Field("nombre", required=True, max_length=150),
+    Field("mensaje", required=True, max_length=5000),
+)
@@ -0,0 +1,365 @@
+"""
+Per-empresa webhooks for API integrations.
+
+Subscriptions live in the empresa document (field "webhooks"), each as
+{"id", "url", "secret", "eventos", "activo", "created_at"}, and are managed
+through /api/webhooks. Supported events are listed in EVENTS.
+
+Delivery:
+
+    * emit() only appends the event to an in-memory buffer per
+      subscription, so request handlers pay nothing for it
+    * a flusher thread drains the buffer every WEBHOOK_BATCH_WINDOW seconds
+      and enqueues one "webhook_delivery" job per subscription with up to
+      WEBHOOK_BATCH_SIZE events, so bursts become a single POST
+    * the job POSTs {"delivery_id", "empresa_id", "events": [...]} with a
+      pooled httpx client; any non-2xx answer or network error makes the job
+      queue retry it with exponential backoff (WEBHOOK_MAX_ATTEMPTS)
+
+Every request carries
+
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256>
+
+where the HMAC is computed with the subscription secret over
+"<unix time>.<raw body>". Receivers should recompute it and reject
+timestamps older than a few minutes.
+
+URLs must resolve to public addresses: loopback, link-local (cloud metadata
+endpoints), private and other reserved addresses are rejected when the
+subscription is registered and again before every delivery, since DNS
+answers can change in between. Deliveries connect to the address that was
+checked (with the Host header and TLS SNI of the URL), so a second DNS
+answer cannot swap in a private address (DNS rebinding).
+
+For local testing, set WEBHOOK_ALLOW_HTTP=true and WEBHOOK_ALLOW_PRIVATE=true
+and point a subscription at any local HTTP listener, for example:
+
+    python -m http.server 8001
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from backend.jobs import job_queue
+
+EVENTS = (
+    "vacante.created",
+    "vacante.updated",
+    "vacante.deleted",
+    "postulacion.created",
+)
+
+# Sent only by the test endpoint
+PING = "ping"
+
+MAX_WEBHOOKS = 5
+
+BATCH_WINDOW = float(os.getenv("WEBHOOK_BATCH_WINDOW", "2"))
+BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "20"))
+ALLOW_HTTP = os.getenv("WEBHOOK_ALLOW_HTTP", "false").lower() == "true"
+ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+class WebhookDeliveryError(Exception):
+    """
+    The receiver answered with a non-2xx status; the job is retried.
+    """
+
+
+def validate_url(url):
+    """
+    Returns an error message for an unacceptable webhook URL, or None.
+    """
+    if not isinstance(url, str) or len(url) > 2048:
+        return "Field 'url' must be a URL of at most 2048 characters"
+    parts = urlsplit(url)
+    allowed = ("https", "http") if ALLOW_HTTP else ("https",)
+    if parts.scheme not in allowed or not parts.hostname:
+        return f"Field 'url' must be an absolute {' or '.join(allowed)} URL"
+    if ALLOW_PRIVATE:
+        return None
+    try:
+        address = non_public_address(parts.hostname)
+    except (OSError, UnicodeError):
+        return "Field 'url' must have a host name that resolves"
+    if address is not None:
+        return "Field 'url' must not point to a loopback, link-local or private address"
+    return None
+
+
+def resolve(hostname):
+    """
+    Returns the addresses hostname resolves to, IPv4-mapped IPv6 addresses
+    as IPv4. Raises OSError if it does not resolve.
+    """
+    addresses = []
+    for *_, sockaddr in socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP):
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        addresses.append(address)
+    return addresses
+
+
+def first_non_public(addresses):
+    """
+    Returns the first address that is not publicly routable (loopback,
+    link-local, private, multicast, reserved), or None.
+    """
+    for address in addresses:
+        if not address.is_global or address.is_multicast:
+            return address
+    return None
+
+
+def non_public_address(hostname):
+    """
+    Resolves hostname and returns the first of its addresses that is not
+    publicly routable, or None. Raises OSError if it does not resolve.
+    """
+    return first_non_public(resolve(hostname))
+
+
+def pin_address(url, address):
+    """
+    Returns (url, headers, extensions) for a request to url sent to address:
+    the URL gets address as its host, while the Host header and, for https,
+    the TLS server name (SNI and certificate check) stay those of url.
+    """
+    parts = urlsplit(url)
+    userinfo, _, host = parts.netloc.rpartition("@")
+    pinned = f"[{address}]" if address.version == 6 else str(address)
+    if parts.port is not None:
+        pinned = f"{pinned}:{parts.port}"
+    if userinfo:
+        pinned = f"{userinfo}@{pinned}"
+    extensions = {"sni_hostname": parts.hostname} if parts.scheme == "https" else {}
+    return urlunsplit(parts._replace(netloc=pinned)), {"Host": host}, extensions
+
+
+def new_subscription(url, eventos):
+    """
+    Builds a subscription dict with a fresh ID and signing secret.
+    """
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "url": url,
+        "secret": secrets.token_hex(32),
+        "eventos": list(eventos),
+        "activo": True,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def public_view(subscription):
+    """
+    A subscription without its secret, for API listings.
+    """
+    return {key: value for key, value in subscription.items() if key != "secret"}
+
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode("utf-8") + body
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def signature_header(secret, body, timestamp=None):
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f"t={timestamp},v1={sign(secret, timestamp, body)}"
+
+
+def verify_signature(secret, body, header, tolerance=300):
+    """
+    Receiver-side check of a signature header (also handy in local tests).
+    """
+    try:
+        fields = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(fields["t"])
+    except (ValueError, KeyError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(fields.get("v1", ""), sign(secret, timestamp, body))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared httpx client (keeps connections to receivers alive).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_CONNECTIONS,
+                    ),
+                    follow_redirects=False,
+                    headers={"User-Agent": "vinculacion-webhooks/1"},
+                )
+    return _client
+
+
+_buffer = {}  # (empresa id, webhook id) -> [event, ...]
+_buffer_lock = threading.Lock()
+_flusher = None
+
+
+def subscribers(empresa, event_type):
+    return [
+        subscription
+        for subscription in empresa.get("webhooks") or []
+        if subscription.get("activo", True)
+        and (event_type == PING or event_type in subscription.get("eventos", ()))
+    ]
+
+
+def emit(empresa, event_type, data, webhook_id=None):
+    """
+    Queues an event for the empresa's subscriptions to event_type. empresa
+    is the empresa dict (with doc_id and webhooks). Never raises.
+    """
+    try:
+        targets = [
+            subscription
+            for subscription in subscribers(empresa, event_type)
+            if webhook_id is None or subscription["id"] == webhook_id
+        ]
+        if not targets:
+            return
+
+        event = {
+            "id": uuid.uuid4().hex,
+            "type": event_type,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "data": data,
+        }
+        with _buffer_lock:
+            for subscription in targets:
+                key = (empresa["doc_id"], subscription["id"])
+                _buffer.setdefault(key, []).append(event)
+        start_flusher()
+    except Exception as e:
+        print(f"Error emitting webhook event {event_type}: {e}")
+
+
+def flush():
+    """
+    Moves the buffered events into delivery jobs, BATCH_SIZE per job.
+    """
+    global _buffer
+    with _buffer_lock:
+        pending, _buffer = _buffer, {}
+
+    for (empresa_id, webhook_id), events in pending.items():
+        for start in range(0, len(events), BATCH_SIZE):
+            try:
+                job_queue.enqueue(
+                    "webhook_delivery",
+                    {
+                        "empresa_id": empresa_id,
+                        "webhook_id": webhook_id,
+                        "delivery_id": uuid.uuid4().hex,
+                        "events": events[start : start + BATCH_SIZE],
+                    },
+                    max_attempts=MAX_ATTEMPTS,
+                )
+            except Exception as e:
+                print(f"Error queueing webhook delivery for {empresa_id}: {e}")
+
+
+def start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _buffer_lock:
+        if _flusher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(BATCH_WINDOW)
+                flush()
+
+        _flusher = threading.Thread(target=loop, daemon=True, name="webhook-flusher")
+        _flusher.start()
+
+
+@job_queue.handler("webhook_delivery")
+def deliver(empresa_id, webhook_id, delivery_id, events):
+    """
+    POSTs one batch of events. The subscription is re-read so deleted or
+    deactivated webhooks stop receiving retries.
+    """
+    # Imported here: the firebase module is only needed inside job workers
+    from firebase import get_empresa_by_id
+
+    empresa = get_empresa_by_id(empresa_id)
+    subscription = next(
+        (
+            subscription
+            for subscription in (empresa or {}).get("webhooks") or []
+            if subscription.get("id") == webhook_id
+        ),
+        None,
+    )
+    if subscription is None or not subscription.get("activo", True):
+        print(f"Webhook {webhook_id} of empresa {empresa_id} is gone, dropping")
+        return
+
+    url, headers, extensions = subscription["url"], {}, {}
+    if not ALLOW_PRIVATE:
+        # A resolution error (OSError) makes the job retry
+        addresses = resolve(urlsplit(url).hostname)
+        address = first_non_public(addresses)
+        if address is not None:
+            print(
+                f"Webhook {webhook_id} of empresa {empresa_id} resolves to"
+                f" non-public address {address}, dropping"
+            )
+            return
+        # Connect to the address just checked instead of resolving again
+        url, headers, extensions = pin_address(url, addresses[0])
+
+    body = json.dumps(
+        {"delivery_id": delivery_id, "empresa_id": empresa_id, "events": events},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    response = get_client().post(
+        url,
+        content=body,
+        headers={
+            **headers,
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: signature_header(subscription["secret"], body),
+            "X-Webhook-Delivery": delivery_id,
+        },
+        extensions=extensions,
+    )
+    if not response.is_success:
+        raise WebhookDeliveryError(
+            f"{subscription['url']} answered {response.status_code}"
+        )
@@ -1,12 +1,79 @@
 import firebase_admin
-from firebase_admin import credentials, auth, firestore
+from firebase_admin import credentials, firestore
 import os
+from google.auth.credentials import AnonymousCredentials
+
+from backend.models import Alumno, Empresa, Vacante
+from backend import (
+    autocomplete,
+    candidates,
+    dedupe,
+    id_tokens,
+    propagation,
+    salary,
+    search,
+    shared_cache,
+    skills,
+    validation,
+)
+from backend.resilience import (
+    FirestoreUnavailableError,
+    resilient_read,
+    resilient_write,
+)
+
+# In-process indexes kept in sync by the vacante write functions
+VACANTE_INDEXES = (search, autocomplete, salary, dedupe)
+VACANTE_INDEXED_FIELDS = frozenset().union(
+    *(index.INDEXED_FIELDS for index in VACANTE_INDEXES)
+)
+
+# Firestore keys of the vacante fields update_vacante accepts
+VACANTE_UPDATE_FIELDS = (
+    "titulo",
+    "descripcion",
+    "requisitos",
+    "modalidad",
+    "tipoContrato",
+    "duracion",
+    "horario",
+    "sueldo",
+    "educación",
+    "experienciaRequerida",
+    "habilidadesDuras",
+    "idiomas",
+    "nombreEmpresa",
+    "activa",
+    "duplicadoDe",
+)
+
+
+class EmulatorCredential(credentials.Base):
+    """
+    The Firestore client ignores credentials when talking to the emulator,
+    but firebase_admin needs one to create the app.
+    """
+
+    def get_credential(self):
+        return AnonymousCredentials()
 
 
 def initialize_firebase():
     """
-    Initializes the Firebase Admin SDK using a service account.
+    Initializes the Firebase Admin SDK using a service account, or against
+    the Firestore emulator when FIRESTORE_EMULATOR_HOST is set (the local
+    stand-in datastore used by backend.query_budget; no credentials needed).
     """
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        firebase_admin.initialize_app(
+            EmulatorCredential(),
+            {"projectId": os.getenv("GOOGLE_CLOUD_PROJECT", "demo-vinculacion")},
+        )
+        print(
+            f"Firebase Admin SDK using the emulator at {os.getenv('FIRESTORE_EMULATOR_HOST')}"
+        )
+        return
+
     try:
         # Get the path to the service account key from environment variables
         service_account_key_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -40,7 +107,7 @@ def get_empresa_by_correo(correo):
 
         # Query by correo field
         query = empresas_ref.where("correo", "==", correo).limit(1)
-        docs = query.stream()
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
 
         for doc in docs:
             data = doc.to_dict()
@@ -48,6 +115,8 @@ def get_empresa_by_correo(correo):
             return data
 
         return None
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving empresa by correo: {e}")
         return None
@@ -65,22 +134,24 @@ def create_empresa(correo):
 
         # Create new document with auto-generated ID
         doc_ref = empresas_ref.document()
-        doc_ref.set(
-            {
-                "correo": correo,
-                "contactoPrincipal": None,
-                "estado": None,
-                "giro": None,
-                "mun_alcaldia": None,
-                "nombre": None,
-                "suscripcionActiva": False,
-                "created_at": firestore.SERVER_TIMESTAMP,
-                "updated_at": firestore.SERVER_TIMESTAMP,
-            }
-        )
+        data = {
+            "correo": correo,
+            "contactoPrincipal": None,
+            "estado": None,
+            "giro": None,
+            "mun_alcaldia": None,
+            "nombre": None,
+            "suscripcionActiva": False,
+            "created_at": firestore.SERVER_TIMESTAMP,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
+        resilient_write(lambda timeout: doc_ref.set(data, timeout=timeout))
 
         print(f"New empresa created with correo: {correo}, doc_id: {doc_ref.id}")
+        shared_cache.invalidate_empresa(doc_ref.id)
         return doc_ref.id
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error creating empresa: {e}")
         return None
@@ -96,14 +167,39 @@ def update_empresa(doc_id, data):
         db = firestore.client()
         empresas_ref = db.collection("empresas")
 
+        # Fields copied into the vacantes (nombreEmpresa) are only rewritten
+        # there if the update changes them, so read their stored values first
+        valores = propagation.vacante_updates(data)
+        if valores:
+            try:
+                stored = resilient_read(
+                    lambda timeout: empresas_ref.document(doc_id).get(timeout=timeout)
+                ).to_dict()
+            except Exception as e:
+                print(f"Error reading empresa {doc_id} before update: {e}")
+                stored = None
+            valores = propagation.vacante_updates(data, stored)
+
         # Add timestamp to the update
         data["updated_at"] = firestore.SERVER_TIMESTAMP
 
         # Update the document
-        empresas_ref.document(doc_id).update(data)
+        resilient_write(
+            lambda timeout: empresas_ref.document(doc_id).update(data, timeout=timeout)
+        )
 
         print(f"Empresa document {doc_id} updated successfully")
+        shared_cache.invalidate_empresa(doc_id)
+
+        # Rewrite the copies of renamed fields in its vacantes
+        if valores:
+            try:
+                propagation.start_propagation(doc_id, valores)
+            except Exception as e:
+                print(f"Error starting propagation for empresa {doc_id}: {e}")
         return True
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error updating empresa: {e}")
         return False
@@ -112,7 +208,7 @@ def update_empresa(doc_id, data):
 def get_vacantes_by_empresa_id(empresa_doc_id):
     """
     Retrieves all vacantes (job opportunities) for a specific empresa.
-    Returns a list of vacante documents.
+    Returns a list of Vacante models.
     """
     try:
         db = firestore.client()
@@ -124,33 +220,57 @@ def get_vacantes_by_empresa_id(empresa_doc_id):
 
         # Query vacantes where empresaId equals the empresa reference
         query = vacantes_ref.where("empresaId", "==", empresa_ref)
-        docs = query.stream()
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
 
-        vacantes = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id  # Include document ID
-            vacantes.append(data)
-
-        return vacantes
+        return [Vacante.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving vacantes by empresa ID: {e}")
         return []
 
 
-def verify_google_id_token(id_token):
+def verify_google_id_token(id_token, check_revoked=None):
     """
     Verifies the Google ID token sent from the client.
     Returns the decoded token (user info) if valid, otherwise None.
+    Verified tokens are cached until they expire (backend.id_tokens); the
+    revocation check is opt-in (check_revoked or ID_TOKEN_CHECK_REVOKED).
     """
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = id_tokens.verify_id_token(id_token, check_revoked)
         return decoded_token
     except Exception as e:
         print(f"Error verifying ID token: {e}")
         return None
 
 
+def vacante_document(empresa_ref, vacante_data):
+    """
+    Builds the Firestore document of a new vacante from form/API data
+    (the field map shared by create_vacante and create_vacantes_batch).
+    """
+    return {
+        "empresaId": empresa_ref,
+        "titulo": vacante_data.get("titulo", ""),
+        "descripcion": vacante_data.get("descripcion", ""),
+        "requisitos": vacante_data.get("requisitos", ""),
+        "modalidad": vacante_data.get("modalidad", ""),
+        "tipoContrato": vacante_data.get("tipoContrato", ""),
+        "duracion": vacante_data.get("duracion", ""),
+        "horario": vacante_data.get("horario", ""),
+        "sueldo": vacante_data.get("sueldo"),
+        "educación": vacante_data.get("educacion", ""),
+        "experienciaRequerida": vacante_data.get("experienciaRequerida", ""),
+        "habilidadesDuras": vacante_data.get("habilidadesDuras", []),
+        "idiomas": vacante_data.get("idiomas", []),
+        "nombreEmpresa": vacante_data.get("nombreEmpresa", ""),
+        "activa": vacante_data.get("activa", True),
+        "created_at": firestore.SERVER_TIMESTAMP,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+
+
 def create_vacante(empresa_doc_id, vacante_data):
     """
     Creates a new vacante document in the vacantes collection.
@@ -160,7 +280,9 @@ def create_vacante(empresa_doc_id, vacante_data):
         vacante_data: Dictionary containing vacante fields
 
     Returns:
-        The document ID if successful, otherwise None.
+        (vacante ID, merged): merged is True when the vacante was a re-post
+        merged into the existing vacante with that ID (DEDUPE_MODE=merge).
+        (None, False) if the write failed.
     """
     try:
         db = firestore.client()
@@ -174,32 +296,103 @@ def create_vacante(empresa_doc_id, vacante_data):
         doc_ref = vacantes_ref.document()
 
         # Prepare the data with empresa reference
-        data = {
-            "empresaId": empresa_ref,
-            "titulo": vacante_data.get("titulo", ""),
-            "descripcion": vacante_data.get("descripcion", ""),
-            "requisitos": vacante_data.get("requisitos", ""),
-            "modalidad": vacante_data.get("modalidad", ""),
-            "tipoContrato": vacante_data.get("tipoContrato", ""),
-            "duracion": vacante_data.get("duracion", ""),
-            "horario": vacante_data.get("horario", ""),
-            "sueldo": vacante_data.get("sueldo"),
-            "educación": vacante_data.get("educacion", ""),
-            "experienciaRequerida": vacante_data.get("experienciaRequerida", ""),
-            "habilidadesDuras": vacante_data.get("habilidadesDuras", []),
-            "idiomas": vacante_data.get("idiomas", []),
-            "nombreEmpresa": vacante_data.get("nombreEmpresa", ""),
-            "activa": True,
-            "created_at": firestore.SERVER_TIMESTAMP,
-            "updated_at": firestore.SERVER_TIMESTAMP,
-        }
-
-        doc_ref.set(data)
+        data = vacante_document(empresa_ref, vacante_data)
+        skills.canonicalize_vacante(data)
+
+        # Re-posts of an existing vacante are merged into it or flagged
+        try:
+            duplicate_of = dedupe.find_duplicate(empresa_doc_id, data)
+        except Exception as e:
+            print(f"Error checking for duplicate vacantes: {e}")
+            duplicate_of = None
+        if duplicate_of and dedupe.MODE == "merge":
+            print(f"Vacante is a duplicate of {duplicate_of}, merging")
+            if update_vacante(duplicate_of, data):
+                return duplicate_of, True
+            return None, False
+        if duplicate_of:
+            data["duplicadoDe"] = duplicate_of
+
+        resilient_write(lambda timeout: doc_ref.set(data, timeout=timeout))
 
         print(f"New vacante created with ID: {doc_ref.id}")
-        return doc_ref.id
+        shared_cache.invalidate_listings(empresa_doc_id)
+        sync_vacante_indexes(doc_ref.id, data)
+        return doc_ref.id, False
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error creating vacante: {e}")
+        return None, False
+
+
+def create_vacantes_batch(empresa_doc_id, vacantes_data):
+    """
+    Creates several vacantes of one empresa in a single batched write (at
+    most 500, the Firestore batch limit). Re-posts of existing vacantes are
+    merged or flagged as in create_vacante; rows of the same batch are not
+    compared with each other.
+
+    Returns:
+        (document IDs in the order of vacantes_data, set of the IDs that are
+        existing vacantes merged into), or None if the batch failed (then
+        nothing was written).
+    """
+    try:
+        db = firestore.client()
+        vacantes_ref = db.collection("vacantes")
+        empresa_ref = db.collection("empresas").document(empresa_doc_id)
+
+        batch = db.batch()
+        doc_ids = []
+        created = {}
+        merged = {}
+        for vacante_data in vacantes_data:
+            data = vacante_document(empresa_ref, vacante_data)
+            skills.canonicalize_vacante(data)
+
+            try:
+                duplicate_of = dedupe.find_duplicate(empresa_doc_id, data)
+            except Exception as e:
+                print(f"Error checking for duplicate vacantes: {e}")
+                duplicate_of = None
+            if duplicate_of and dedupe.MODE == "merge":
+                # A document may only be written once per batch: last row wins
+                merged[duplicate_of] = {
+                    field: data[field]
+                    for field in VACANTE_UPDATE_FIELDS
+                    if field in data
+                }
+                doc_ids.append(duplicate_of)
+                continue
+            if duplicate_of:
+                data["duplicadoDe"] = duplicate_of
+
+            doc_ref = vacantes_ref.document()
+            batch.set(doc_ref, data)
+            created[doc_ref.id] = data
+            doc_ids.append(doc_ref.id)
+
+        for vacante_id, update_data in merged.items():
+            update_data["updated_at"] = firestore.SERVER_TIMESTAMP
+            batch.update(vacantes_ref.document(vacante_id), update_data)
+
+        resilient_write(lambda timeout: batch.commit(timeout=timeout))
+
+        print(
+            f"Batch of {len(created)} new vacantes created"
+            f" ({len(merged)} merged into existing ones)"
+        )
+        shared_cache.invalidate_listings(empresa_doc_id)
+        for vacante_id, data in created.items():
+            sync_vacante_indexes(vacante_id, data)
+        for vacante_id in merged:
+            sync_vacante_indexes(vacante_id)
+        return doc_ids, set(merged)
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error creating batch of vacantes: {e}")
         return None
 
 
@@ -207,18 +400,31 @@ def get_empresa_by_id(empresa_doc_id):
     """
     Retrieves empresa document by document ID.
     Returns the document data if found, otherwise None.
+    Served from the host's shared cache when possible (also for unknown
+    IDs, so invalid API keys do not cost a read each).
     """
+    cache_key = shared_cache.empresa_key(empresa_doc_id)
+    cached = shared_cache.shared_cache.get(cache_key)
+    if cached is not shared_cache.MISS:
+        return cached
+
     try:
         db = firestore.client()
         empresas_ref = db.collection("empresas")
-        doc = empresas_ref.document(empresa_doc_id).get()
+        doc = resilient_read(
+            lambda timeout: empresas_ref.document(empresa_doc_id).get(timeout=timeout)
+        )
 
         if doc.exists:
             data = doc.to_dict()
             data["doc_id"] = doc.id
+            shared_cache.shared_cache.set(cache_key, data, shared_cache.EMPRESA_TTL)
             return data
 
+        shared_cache.shared_cache.set(cache_key, None, shared_cache.MISSING_TTL)
         return None
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving empresa by ID: {e}")
         return None
@@ -227,19 +433,21 @@ def get_empresa_by_id(empresa_doc_id):
 def get_vacante_by_id(vacante_id):
     """
     Retrieves a vacante document by ID.
-    Returns the document data if found, otherwise None.
+    Returns a Vacante model if found, otherwise None.
     """
     try:
         db = firestore.client()
         vacantes_ref = db.collection("vacantes")
-        doc = vacantes_ref.document(vacante_id).get()
+        doc = resilient_read(
+            lambda timeout: vacantes_ref.document(vacante_id).get(timeout=timeout)
+        )
 
         if doc.exists:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            return data
+            return Vacante.from_snapshot(doc)
 
         return None
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving vacante by ID: {e}")
         return None
@@ -263,35 +471,29 @@ def update_vacante(vacante_id, vacante_data):
         # Prepare update data (only include fields that are provided)
         update_data = {}
 
-        allowed_fields = [
-            "titulo",
-            "descripcion",
-            "requisitos",
-            "modalidad",
-            "tipoContrato",
-            "duracion",
-            "horario",
-            "sueldo",
-            "educación",
-            "experienciaRequerida",
-            "habilidadesDuras",
-            "idiomas",
-            "nombreEmpresa",
-            "activa",
-        ]
-
-        for field in allowed_fields:
-            if field in vacante_data:
-                update_data[field] = vacante_data[field]
+        # Form/API names (educacion) are stored under their Firestore keys
+        for field, value in validation.VACANTE.to_stored(vacante_data).items():
+            if field in VACANTE_UPDATE_FIELDS:
+                update_data[field] = value
+        skills.canonicalize_vacante(update_data)
 
         # Add updated timestamp
         update_data["updated_at"] = firestore.SERVER_TIMESTAMP
 
         # Update the document
-        vacantes_ref.document(vacante_id).update(update_data)
+        resilient_write(
+            lambda timeout: vacantes_ref.document(vacante_id).update(
+                update_data, timeout=timeout
+            )
+        )
 
         print(f"Vacante {vacante_id} updated successfully")
+        shared_cache.invalidate_listings()
+        if VACANTE_INDEXED_FIELDS.intersection(update_data):
+            sync_vacante_indexes(vacante_id)
         return True
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error updating vacante: {e}")
         return False
@@ -311,15 +513,97 @@ def delete_vacante(vacante_id):
         db = firestore.client()
         vacantes_ref = db.collection("vacantes")
 
-        vacantes_ref.document(vacante_id).delete()
+        resilient_write(
+            lambda timeout: vacantes_ref.document(vacante_id).delete(timeout=timeout)
+        )
 
         print(f"Vacante {vacante_id} deleted successfully")
+        shared_cache.invalidate_listings()
+        sync_vacante_indexes(vacante_id, deleted=True)
         return True
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error deleting vacante: {e}")
         return False
 
 
+def sync_vacante_indexes(vacante_id, vacante=None, deleted=False):
+    """
+    Keeps the in-process vacante indexes in sync after a write.
+    vacante is the full document that was written; if None it is re-read,
+    but only when an index is loaded. Index errors never fail the write.
+    """
+    try:
+        if vacante is None and not deleted:
+            if not any(index.is_loaded() for index in VACANTE_INDEXES):
+                return
+            vacante = get_vacante_by_id(vacante_id)
+    except Exception as e:
+        print(f"Error re-reading vacante for indexes: {e}")
+        return
+
+    for index in VACANTE_INDEXES:
+        try:
+            if deleted or vacante is None:
+                index.unindex_vacante(vacante_id)
+            else:
+                index.index_vacante(vacante_id, vacante)
+        except Exception as e:
+            print(f"Error updating {index.__name__} index: {e}")
+
+
+def sync_alumno_indexes(doc_id, data):
+    """
+    Keeps the autocomplete index and the candidate store in sync after an
+    alumno write. data may be a partial update. Index errors never fail the
+    write.
+    """
+    for index in (autocomplete, candidates):
+        try:
+            index.index_alumno(doc_id, data)
+        except Exception as e:
+            print(f"Error updating alumno indexes: {e}")
+
+
+def get_active_vacantes():
+    """
+    Retrieves every active vacante (activa == True).
+    Returns a list of Vacante models.
+    """
+    try:
+        db = firestore.client()
+        query = db.collection("vacantes").where("activa", "==", True)
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+
+        return [Vacante.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving active vacantes: {e}")
+        return []
+
+
+def get_vacantes_updated_since(since):
+    """
+    Retrieves the vacantes (active or not) whose updated_at is after since,
+    to catch up an index restored from a snapshot.
+    Returns a list of Vacante models, or None if the query failed (an empty
+    list would look like "nothing changed").
+    """
+    try:
+        db = firestore.client()
+        query = db.collection("vacantes").where("updated_at", ">", since)
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
+
+        return [Vacante.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving vacantes updated since {since}: {e}")
+        return None
+
+
 def verify_vacante_belongs_to_empresa(vacante_id, empresa_doc_id):
     """
     Verifies that a vacante belongs to a specific empresa.
@@ -337,14 +621,10 @@ def verify_vacante_belongs_to_empresa(vacante_id, empresa_doc_id):
         if not vacante:
             return False
 
-        # Get the empresa reference from the vacante
-        empresa_ref = vacante.get("empresaId")
-
-        if not empresa_ref:
-            return False
-
-        # Compare the empresa document IDs
-        return empresa_ref.id == empresa_doc_id
+        # Compare the empresa document IDs (empresaId is a reference)
+        return vacante.empresa_doc_id == empresa_doc_id
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error verifying vacante ownership: {e}")
         return False
@@ -353,20 +633,18 @@ def verify_vacante_belongs_to_empresa(vacante_id, empresa_doc_id):
 def get_all_empresas():
     """
     Retrieves all empresa documents from the empresas collection.
-    Returns a list of all empresa documents.
+    Returns a list of Empresa models.
     """
     try:
         db = firestore.client()
         empresas_ref = db.collection("empresas")
-        docs = empresas_ref.stream()
-
-        empresas = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["doc_id"] = doc.id  # Include document ID
-            empresas.append(data)
+        docs = resilient_read(
+            lambda timeout: list(empresas_ref.stream(timeout=timeout))
+        )
 
-        return empresas
+        return [Empresa.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving all empresas: {e}")
         return []
@@ -388,20 +666,99 @@ def update_empresa_subscription(doc_id, suscripcion_activa):
         empresas_ref = db.collection("empresas")
 
         # Update only the suscripcionActiva field
-        empresas_ref.document(doc_id).update(
-            {
-                "suscripcionActiva": suscripcion_activa,
-                "updated_at": firestore.SERVER_TIMESTAMP,
-            }
+        resilient_write(
+            lambda timeout: empresas_ref.document(doc_id).update(
+                {
+                    "suscripcionActiva": suscripcion_activa,
+                    "updated_at": firestore.SERVER_TIMESTAMP,
+                },
+                timeout=timeout,
+            )
         )
 
         print(f"Empresa {doc_id} subscription updated to {suscripcion_activa}")
+        shared_cache.invalidate_empresa(doc_id)
         return True
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error updating empresa subscription: {e}")
         return False
 
 
+def add_empresa_webhook(doc_id, webhook):
+    """
+    Appends a webhook subscription to the empresa's webhooks array.
+    ArrayUnion keeps concurrent additions from overwriting each other.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        db = firestore.client()
+        empresa_ref = db.collection("empresas").document(doc_id)
+        resilient_write(
+            lambda timeout: empresa_ref.update(
+                {
+                    "webhooks": firestore.ArrayUnion([webhook]),
+                    "updated_at": firestore.SERVER_TIMESTAMP,
+                },
+                timeout=timeout,
+            )
+        )
+        shared_cache.invalidate_empresa(doc_id)
+        return True
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error adding empresa webhook: {e}")
+        return False
+
+
+def remove_empresa_webhook(doc_id, webhook):
+    """
+    Removes a webhook subscription (the exact stored dict) from the
+    empresa's webhooks array. Returns True if successful, False otherwise.
+    """
+    try:
+        db = firestore.client()
+        empresa_ref = db.collection("empresas").document(doc_id)
+        resilient_write(
+            lambda timeout: empresa_ref.update(
+                {
+                    "webhooks": firestore.ArrayRemove([webhook]),
+                    "updated_at": firestore.SERVER_TIMESTAMP,
+                },
+                timeout=timeout,
+            )
+        )
+        shared_cache.invalidate_empresa(doc_id)
+        return True
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error removing empresa webhook: {e}")
+        return False
+
+
+def create_postulacion(postulacion_data):
+    """
+    Creates a postulacion document (vacanteId, nombre, correo, mensaje)
+    with a server-side fecha. Returns the document ID, or None on error.
+    """
+    try:
+        db = firestore.client()
+        data = dict(postulacion_data)
+        data["fecha"] = firestore.SERVER_TIMESTAMP
+        _, doc_ref = resilient_write(
+            lambda timeout: db.collection("postulaciones").add(data, timeout=timeout)
+        )
+        return doc_ref.id
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error creating postulacion: {e}")
+        return None
+
+
 def get_alumno_by_correo(correo):
     """
     Retrieves alumno document by correo (email).
@@ -413,7 +770,7 @@ def get_alumno_by_correo(correo):
 
         # Query by correo field
         query = alumnos_ref.where("correo", "==", correo).limit(1)
-        docs = query.stream()
+        docs = resilient_read(lambda timeout: list(query.stream(timeout=timeout)))
 
         for doc in docs:
             data = doc.to_dict()
@@ -421,6 +778,8 @@ def get_alumno_by_correo(correo):
             return data
 
         return None
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error retrieving alumno by correo: {e}")
         return None
@@ -457,15 +816,19 @@ def create_alumno(correo, initial_data=None):
         # If initial data is provided, merge it
         if initial_data:
             data.update(initial_data)
+        skills.canonicalize_alumno(data)
 
         data["updated_at"] = firestore.SERVER_TIMESTAMP
 
         # Create new document with auto-generated ID
         doc_ref = alumnos_ref.document()
-        doc_ref.set(data)
+        resilient_write(lambda timeout: doc_ref.set(data, timeout=timeout))
 
         print(f"New alumno created with correo: {correo}, doc_id: {doc_ref.id}")
+        sync_alumno_indexes(doc_ref.id, data)
         return doc_ref.id
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error creating alumno: {e}")
         return None
@@ -481,14 +844,39 @@ def update_alumno(doc_id, data):
         db = firestore.client()
         alumnos_ref = db.collection("alumnos")
 
+        skills.canonicalize_alumno(data)
+
         # Add timestamp to the update
         data["updated_at"] = firestore.SERVER_TIMESTAMP
 
         # Update the document
-        alumnos_ref.document(doc_id).update(data)
+        resilient_write(
+            lambda timeout: alumnos_ref.document(doc_id).update(data, timeout=timeout)
+        )
 
         print(f"Alumno document {doc_id} updated successfully")
+        sync_alumno_indexes(doc_id, data)
         return True
+    except FirestoreUnavailableError:
+        raise
     except Exception as e:
         print(f"Error updating alumno: {e}")
         return False
+
+
+def get_all_alumnos():
+    """
+    Retrieves all alumno documents from the alumnos collection.
+    Returns a list of Alumno models.
+    """
+    try:
+        db = firestore.client()
+        alumnos_ref = db.collection("alumnos")
+        docs = resilient_read(lambda timeout: list(alumnos_ref.stream(timeout=timeout)))
+
+        return [Alumno.from_snapshot(doc) for doc in docs]
+    except FirestoreUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error retrieving all alumnos: {e}")
+        return []
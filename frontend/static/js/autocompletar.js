@@ -0,0 +1,145 @@
+// Autocompletado para campos de texto libre (habilidades, idiomas, títulos).
+// Se activa en los inputs y textareas con data-autocompletar="<campo>" y
+// data-autocompletar-url="<endpoint>". Con data-multiple el valor se trata
+// como una lista separada por comas y solo se completa el elemento donde
+// está el cursor, sin tocar el resto de la lista.
+(function () {
+  // Límites [inicio, fin) del elemento de la lista que contiene el cursor
+  function elementoActual(campo, multiple) {
+    const valor = campo.value;
+    if (!multiple) return [0, valor.length];
+    const cursor = campo.selectionStart ?? valor.length;
+    const inicio = valor.lastIndexOf(",", cursor - 1) + 1;
+    const coma = valor.indexOf(",", cursor);
+    return [inicio, coma === -1 ? valor.length : coma];
+  }
+
+  document.querySelectorAll("[data-autocompletar]").forEach((campo) => {
+    const lista = document.createElement("ul");
+    lista.id = `${campo.id}-sugerencias`;
+    lista.setAttribute("role", "listbox");
+    lista.hidden = true;
+    Object.assign(lista.style, {
+      position: "absolute",
+      zIndex: "10",
+      margin: "0",
+      padding: "0",
+      listStyle: "none",
+      background: "#fff",
+      border: "1px solid #ccc",
+      maxHeight: "12em",
+      overflowY: "auto",
+    });
+    campo.parentElement.style.position = "relative";
+    campo.setAttribute("autocomplete", "off");
+    campo.setAttribute("aria-controls", lista.id);
+    campo.after(lista);
+
+    const multiple = campo.hasAttribute("data-multiple");
+    let timer = null;
+    let controller = null;
+    let activa = -1;
+
+    function cerrar() {
+      lista.hidden = true;
+      lista.innerHTML = "";
+      activa = -1;
+    }
+
+    function marcar(indice) {
+      const opciones = lista.children;
+      if (!opciones.length) return;
+      activa = (indice + opciones.length) % opciones.length;
+      Array.from(opciones).forEach((opcion, i) => {
+        opcion.setAttribute("aria-selected", i === activa);
+        opcion.style.background = i === activa ? "#e8f0fe" : "";
+      });
+      opciones[activa].scrollIntoView({ block: "nearest" });
+    }
+
+    function elegir(valor) {
+      const [inicio, fin] = elementoActual(campo, multiple);
+      const antes = campo.value.slice(0, inicio);
+      const despues = campo.value.slice(fin);
+      const insertado = (inicio > 0 ? " " : "") + valor + (multiple && !despues ? ", " : "");
+      campo.value = antes + insertado + despues;
+      const cursor = antes.length + insertado.length;
+      campo.setSelectionRange(cursor, cursor);
+      campo.focus();
+      cerrar();
+    }
+
+    function mostrar(sugerencias) {
+      lista.innerHTML = "";
+      activa = -1;
+      sugerencias.forEach((valor) => {
+        const opcion = document.createElement("li");
+        opcion.setAttribute("role", "option");
+        opcion.textContent = valor;
+        opcion.style.padding = "4px 8px";
+        opcion.style.cursor = "pointer";
+        // mousedown para que el campo no pierda el foco antes de elegir
+        opcion.addEventListener("mousedown", (e) => {
+          e.preventDefault();
+          elegir(valor);
+        });
+        lista.appendChild(opcion);
+      });
+      lista.style.top = `${campo.offsetTop + campo.offsetHeight}px`;
+      lista.style.left = `${campo.offsetLeft}px`;
+      lista.style.minWidth = `${campo.offsetWidth}px`;
+      lista.hidden = !sugerencias.length;
+    }
+
+    campo.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        const [inicio, fin] = elementoActual(campo, multiple);
+        const prefijo = campo.value.slice(inicio, fin).trim();
+        const previos = multiple
+          ? campo.value.split(",").map((p) => p.trim()).filter((p) => p && p !== prefijo)
+          : [];
+
+        if (!prefijo) {
+          cerrar();
+          return;
+        }
+
+        // Cancelar la petición anterior si el usuario sigue escribiendo
+        if (controller) controller.abort();
+        controller = new AbortController();
+
+        try {
+          const url = `${campo.dataset.autocompletarUrl}?campo=${encodeURIComponent(campo.dataset.autocompletar)}&q=${encodeURIComponent(prefijo)}`;
+          const resp = await fetch(url, { signal: controller.signal });
+          const data = await resp.json();
+
+          mostrar(
+            (data.sugerencias || [])
+              .map(({ valor }) => valor)
+              .filter((valor) => !previos.includes(valor))
+          );
+        } catch (error) {
+          if (error.name !== "AbortError") {
+            console.error("Error al obtener sugerencias: ", error);
+          }
+        }
+      }, 120);
+    });
+
+    campo.addEventListener("keydown", (e) => {
+      if (lista.hidden) return;
+      if (e.key === "ArrowDown" || e.key === "ArrowUp") {
+        e.preventDefault();
+        marcar(activa + (e.key === "ArrowDown" ? 1 : -1));
+      } else if ((e.key === "Enter" || e.key === "Tab") && activa >= 0) {
+        e.preventDefault();
+        elegir(lista.children[activa].textContent);
+      } else if (e.key === "Escape") {
+        cerrar();
+      }
+    });
+
+    campo.addEventListener("blur", cerrar);
+  });
+})();
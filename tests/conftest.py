@@ -0,0 +1,121 @@
+"""
+Shared fixtures. The environment is set before anything imports app, so the
+tests run offline: no shared cache, snapshot writer or signing-cert
+refresher, and the per-process idempotency store.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_state_dir = tempfile.mkdtemp(prefix="vinculacion-tests-")
+os.environ.setdefault("SHARED_CACHE", "off")
+os.environ.setdefault("VACANTES_SNAPSHOT_INTERVAL", "0")
+os.environ.setdefault("IDEMPOTENCY_BACKEND", "memory")
+os.environ.setdefault("FIREBASE_AUTH_EMULATOR_HOST", "localhost:9099")
+os.environ.setdefault("JOBS_DB", os.path.join(_state_dir, "jobs.sqlite3"))
+
+
+class FakeFirestoreApi:
+    """
+    Stands in for the Firestore GAPIC client behind a real firestore_v1
+    Client, so the data layer and backend.query_budget run unchanged.
+    Serves document gets and single-filter equality queries from memory.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.documents = {}  # document name -> data
+
+    def add(self, path, data):
+        """
+        Stores data at path ("empresas/e1"). Returns its DocumentReference.
+        """
+        self.documents[f"{self.client._database_string}/documents/{path}"] = data
+        return self.client.document(path)
+
+    def document_pb(self, name):
+        from google.cloud.firestore_v1 import _helpers
+        from google.cloud.firestore_v1.types import document
+
+        now = datetime.now(timezone.utc)
+        return document.Document(
+            name=name,
+            fields=_helpers.encode_dict(self.documents[name]),
+            create_time=now,
+            update_time=now,
+        )
+
+    def batch_get_documents(self, request, metadata=None, **kwargs):
+        from google.cloud.firestore_v1.types import firestore
+
+        now = datetime.now(timezone.utc)
+        for name in request["documents"]:
+            if name in self.documents:
+                yield firestore.BatchGetDocumentsResponse(
+                    found=self.document_pb(name), read_time=now
+                )
+            else:
+                yield firestore.BatchGetDocumentsResponse(missing=name, read_time=now)
+
+    def run_query(self, request, metadata=None, **kwargs):
+        from google.cloud.firestore_v1.types import firestore
+
+        query = request["structured_query"]
+        prefix = f"{request['parent']}/{query.from_[0].collection_id}/"
+        now = datetime.now(timezone.utc)
+        for name in sorted(self.documents):
+            relative = name[len(prefix) :]
+            if name.startswith(prefix) and "/" not in relative:
+                if self.matches(self.documents[name], query):
+                    yield firestore.RunQueryResponse(
+                        document=self.document_pb(name), read_time=now
+                    )
+
+    def matches(self, data, query):
+        from google.cloud.firestore_v1 import _helpers
+        from google.cloud.firestore_v1.types import query as query_types
+
+        where = type(query.where).pb(query.where)
+        kind = where.WhichOneof("filter_type")
+        if kind is None:
+            return True
+        field_filter = query.where.field_filter
+        if (
+            kind != "field_filter"
+            or field_filter.op != query_types.StructuredQuery.FieldFilter.Operator.EQUAL
+        ):
+            raise NotImplementedError("The fake only supports one == filter")
+        value = data.get(field_filter.field.field_path)
+        return value is not None and _helpers.encode_value(value) == field_filter.value
+
+
+@pytest.fixture
+def fake_firestore(monkeypatch):
+    """
+    Makes firestore.client() return a Client backed by a FakeFirestoreApi.
+    """
+    from firebase_admin import firestore as admin_firestore
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore_v1
+
+    client = firestore_v1.Client(
+        project="test-project", credentials=AnonymousCredentials()
+    )
+    api = client._firestore_api_internal = FakeFirestoreApi(client)
+    monkeypatch.setattr(admin_firestore, "client", lambda: client)
+    return api
+
+
+@pytest.fixture
+def app_client():
+    import app as app_module
+
+    app_module.app.testing = True
+    return app_module.app.test_client()
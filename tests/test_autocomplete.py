@@ -0,0 +1,53 @@
+from backend.autocomplete import AutocompleteIndex, PrefixTrie
+
+
+def test_completes_by_frequency():
+    trie = PrefixTrie()
+    for term, times in (("Python", 3), ("PHP", 1), ("Pandas", 2), ("Java", 5)):
+        for _ in range(times):
+            trie.add(term)
+    assert trie.complete("p") == [("Python", 3), ("Pandas", 2), ("PHP", 1)]
+    assert trie.complete("py") == [("Python", 3)]
+    assert trie.complete("x") == []
+
+
+def test_limits_to_k_and_breaks_ties_alphabetically():
+    trie = PrefixTrie()
+    for term in ("Go", "Git", "GraphQL"):
+        trie.add(term)
+    assert trie.complete("g", k=2) == [("Git", 1), ("Go", 1)]
+
+
+def test_folds_case_and_accents_and_shows_the_common_spelling():
+    trie = PrefixTrie()
+    trie.add("Inglés")
+    trie.add("Inglés")
+    trie.add("ingles")
+    assert trie.complete("INGL") == [("Inglés", 3)]
+
+
+def test_negative_delta_removes_terms():
+    trie = PrefixTrie()
+    trie.add("Docker")
+    trie.add("Django")
+    trie.add("Docker", -1)
+    assert trie.complete("d") == [("Django", 1)]
+    assert "docker" not in trie.surfaces
+
+
+def test_index_updates_and_removes_documents():
+    index = AutocompleteIndex()
+    index.set_document(("vacante", "v1"), {"habilidades": ["Python", "SQL"]})
+    index.set_document(("vacante", "v2"), {"habilidades": ["Python"]})
+    assert index.complete("habilidades", "py") == [("Python", 2)]
+
+    index.set_document(("vacante", "v1"), {"habilidades": ["SQL"]})
+    assert index.complete("habilidades", "py") == [("Python", 1)]
+
+    index.set_document(("vacante", "v2"), {"idiomas": ["Inglés"]}, partial=True)
+    assert index.complete("habilidades", "py") == [("Python", 1)]
+    assert index.complete("idiomas", "in") == [("Inglés", 1)]
+
+    index.remove_document(("vacante", "v2"))
+    assert index.complete("habilidades", "py") == []
+    assert index.complete("otro", "a") == []
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from backend.dedupe import (
+    DuplicateIndex,
+    find_clusters,
+    shingles,
+    signature,
+    similarity,
+)
+
+DESCRIPCION = (
+    "Buscamos desarrollador backend con experiencia en Python, Django y bases "
+    "de datos relacionales para el equipo de pagos en Monterrey"
+)
+
+
+def test_shingles():
+    assert shingles("") == set()
+    assert shingles("python") == {"python"}
+    assert len(shingles("desarrollador python senior")) == 2
+
+
+def test_signatures_are_deterministic():
+    assert signature("") is None
+    assert (signature(DESCRIPCION) == signature(DESCRIPCION)).all()
+    assert similarity(signature(DESCRIPCION), signature(DESCRIPCION)) == 1.0
+
+
+def test_similarity_tracks_overlap():
+    reworded = DESCRIPCION.replace("Monterrey", "Guadalajara")
+    unrelated = "Contador público con dominio de impuestos, nómina y auditoría"
+    near = similarity(signature(DESCRIPCION), signature(reworded))
+    far = similarity(signature(DESCRIPCION), signature(unrelated))
+    assert near > 0.7
+    assert far < 0.2
+
+
+def test_index_finds_duplicates_within_the_empresa():
+    index = DuplicateIndex(threshold=0.7)
+    index.add("v1", "e1", DESCRIPCION)
+    index.add("v2", "e2", DESCRIPCION)
+
+    matches = index.find("e1", DESCRIPCION + " remoto")
+    assert [vacante_id for vacante_id, _ in matches] == ["v1"]
+    assert index.find("e1", DESCRIPCION, exclude="v1") == []
+
+
+def test_index_remove():
+    index = DuplicateIndex()
+    index.add("v1", "e1", DESCRIPCION)
+    index.remove("v1")
+    assert len(index) == 0 and not index.buckets
+    assert index.find("e1", DESCRIPCION) == []
+
+
+def test_find_clusters_groups_copies_per_empresa():
+    def vacante(id, empresa, titulo, descripcion):
+        return SimpleNamespace(
+            id=id,
+            empresa_doc_id=empresa,
+            titulo=titulo,
+            descripcion=descripcion,
+            requisitos=None,
+        )
+
+    clusters = find_clusters(
+        [
+            vacante("a", "e1", "Backend", DESCRIPCION),
+            vacante("b", "e1", "Backend", DESCRIPCION),
+            vacante("c", "e2", "Backend", DESCRIPCION),
+            vacante("d", "e1", "Contador", "Nómina y auditoría"),
+        ]
+    )
+    assert [sorted(v.id for v in cluster) for cluster in clusters] == [["a", "b"]]
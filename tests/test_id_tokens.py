@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from backend import id_tokens
+from backend.id_tokens import InvalidIdToken, VerifiedTokens
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """
+    Replaces signature verification: "bad" tokens are invalid, any other
+    token decodes to claims expiring in an hour. Returns the decoded tokens.
+    """
+    calls = []
+
+    def decode_token(id_token):
+        calls.append(id_token)
+        if id_token == "bad":
+            raise InvalidIdToken("bad signature")
+        return {"uid": id_token, "iat": time.time(), "exp": time.time() + 3600}
+
+    monkeypatch.setattr(id_tokens, "decode_token", decode_token)
+    return calls
+
+
+@pytest.fixture
+def revocation_checks(monkeypatch):
+    checks = []
+    monkeypatch.setattr(id_tokens, "check_not_revoked", checks.append)
+    return checks
+
+
+def test_caches_verified_tokens(decoded):
+    tokens = VerifiedTokens()
+    claims = tokens.verify("a")
+    claims["uid"] = "changed"  # callers get copies
+    assert tokens.verify("a")["uid"] == "a"
+    assert decoded == ["a"]
+
+
+def test_does_not_cache_failures(decoded):
+    tokens = VerifiedTokens()
+    for _ in range(2):
+        with pytest.raises(InvalidIdToken):
+            tokens.verify("bad")
+    assert decoded == ["bad", "bad"]
+
+
+def test_expired_entries_are_verified_again(decoded, monkeypatch):
+    tokens = VerifiedTokens()
+    tokens.verify("a")
+    now = time.time()
+    monkeypatch.setattr(id_tokens.time, "time", lambda: now + 7200)
+    tokens.verify("a")
+    assert decoded == ["a", "a"]
+
+
+def test_evicts_least_recently_used(decoded):
+    tokens = VerifiedTokens(max_size=2)
+    tokens.verify("a")
+    tokens.verify("b")
+    tokens.verify("a")
+    tokens.verify("c")  # evicts b
+    tokens.verify("a")
+    tokens.verify("b")
+    assert decoded == ["a", "b", "c", "b"]
+
+
+def test_revocation_checks_are_cached_for_their_ttl(
+    decoded, revocation_checks, monkeypatch
+):
+    tokens = VerifiedTokens()
+    tokens.verify("a")
+    tokens.verify("a", check_revoked=True)
+    tokens.verify("a", check_revoked=True)
+    assert decoded == ["a"]
+    assert len(revocation_checks) == 1
+
+    now = time.time()
+    monkeypatch.setattr(
+        id_tokens.time, "time", lambda: now + id_tokens.REVOCATION_TTL + 1
+    )
+    tokens.verify("a", check_revoked=True)
+    assert len(revocation_checks) == 2
+
+
+def test_concurrent_verifications_share_one_decode(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def decode_token(id_token):
+        calls.append(id_token)
+        started.set()
+        release.wait(5)
+        return {"uid": id_token, "exp": time.time() + 3600}
+
+    monkeypatch.setattr(id_tokens, "decode_token", decode_token)
+    tokens = VerifiedTokens()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(tokens.verify("a")))
+        for _ in range(4)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["a"]
+    assert [claims["uid"] for claims in results] == ["a"] * 4
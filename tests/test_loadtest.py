@@ -0,0 +1,64 @@
+import pytest
+
+from backend import loadtest
+from backend.loadtest import StageStats, fill, percentile, route_label, saturation
+
+
+def test_fill_substitutes_nested_placeholders():
+    step = {"path": "/v/{vacante_id}", "json": {"q": ["{query}", 3]}, "repeat": 2}
+    context = {"vacante_id": "v1", "query": "python"}
+    assert fill(step, context) == {
+        "path": "/v/v1",
+        "json": {"q": ["python", 3]},
+        "repeat": 2,
+    }
+
+
+def test_route_label_drops_the_query_string():
+    step = {"method": "GET", "path": "/alumnos/vacantes/buscar?q={query}"}
+    assert route_label(step) == "GET /alumnos/vacantes/buscar"
+
+
+def test_percentile():
+    values = [float(n) for n in range(1, 101)]
+    assert percentile([], 0.5) == 0.0
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.99) == 100.0
+    assert percentile(values, 1.0) == 100.0
+
+
+def test_stage_stats_counts_errors_and_throughput():
+    stats = StageStats(users=10)
+    stats.record("GET /a", 0.010, 200)
+    stats.record("GET /a", 0.030, 429)
+    stats.record("POST /b", 0.020, 0)
+    stats.elapsed = 2.0
+
+    summary = stats.summary()
+    assert summary["requests"] == 3
+    assert summary["throughput"] == 1.5
+    assert summary["error_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert summary["statuses"] == {200: 1, 429: 1, 0: 1}
+    assert summary["routes"]["GET /a"]["errors"] == 1
+    assert summary["routes"]["GET /a"]["max_ms"] == pytest.approx(30.0)
+
+
+def stage(users, throughput, latency):
+    stats = StageStats(users)
+    for _ in range(throughput):
+        stats.record("GET /", latency, 200)
+    stats.elapsed = 1.0
+    return stats
+
+
+def test_saturation_is_where_throughput_stalls_while_p99_rises():
+    stages = [stage(10, 100, 0.05), stage(20, 190, 0.06), stage(40, 200, 0.30)]
+    assert saturation(stages) == 20
+    assert saturation(stages[:2]) is None
+
+
+def test_stub_token_verification():
+    claims = loadtest.stub_verify_google_id_token(f"{loadtest.TOKEN_PREFIX}7")
+    assert claims["email"] == "alumno7@loadtest.example"
+    assert loadtest.stub_verify_google_id_token("real-token") is None
+    assert loadtest.stub_verify_google_id_token(None) is None
@@ -0,0 +1,62 @@
+import pytest
+
+from backend import query_budget
+
+
+def api_headers(empresa_id):
+    return {"X-API-Key": empresa_id, "Content-Type": "application/json"}
+
+
+@pytest.fixture
+def empresa(fake_firestore):
+    empresa_ref = fake_firestore.add(
+        "empresas/e1", {"nombre": "Acme", "suscripcionActiva": True}
+    )
+    for n in range(3):
+        fake_firestore.add(
+            f"vacantes/v{n}",
+            {"titulo": f"Vacante {n}", "empresaId": empresa_ref, "activa": True},
+        )
+    fake_firestore.add(
+        "vacantes/otra",
+        {"titulo": "Otra", "empresaId": fake_firestore.client.document("empresas/e2")},
+    )
+    return empresa_ref
+
+
+def test_get_vacantes_within_budget(app_client, empresa):
+    budget = query_budget.BUDGETS["GET /api/vacantes"]
+    with query_budget.expect(reads=budget.reads, writes=0) as usage:
+        response = app_client.get("/api/vacantes", headers=api_headers(empresa.id))
+
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 3
+    assert usage.reads == 2
+    assert usage.documents == 4  # the empresa plus its three vacantes
+
+
+def test_expect_reports_repeated_reads(fake_firestore, empresa):
+    from firebase import get_empresa_by_id
+
+    with pytest.raises(query_budget.BudgetExceeded, match="repeated 2x"):
+        with query_budget.expect(reads=2):
+            get_empresa_by_id(empresa.id)
+            get_empresa_by_id(empresa.id)
+
+
+def test_expect_reports_n_plus_one(fake_firestore, empresa):
+    from firebase import get_vacante_by_id
+
+    with pytest.raises(query_budget.BudgetExceeded, match="N\\+1"):
+        with query_budget.expect():
+            for n in range(3):
+                get_vacante_by_id(f"v{n}")
+
+
+def test_expect_reports_budget_violation(fake_firestore, empresa):
+    from firebase import get_empresa_by_id, get_vacantes_by_empresa_id
+
+    with pytest.raises(query_budget.BudgetExceeded, match="2 reads, budget is 1"):
+        with query_budget.expect(reads=1):
+            get_empresa_by_id(empresa.id)
+            get_vacantes_by_empresa_id(empresa.id)
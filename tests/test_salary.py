@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from backend.salary import BUCKET_EDGES, SalaryIndex, parse_sueldo
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (15000, 15000.0),
+        ("15000.5", 15000.5),
+        (None, None),
+        (True, None),
+        ("abc", None),
+        (-1, None),
+        (math.nan, None),
+        (math.inf, None),
+    ],
+)
+def test_parse_sueldo(value, expected):
+    assert parse_sueldo(value) == expected
+
+
+@pytest.fixture
+def index():
+    return SalaryIndex.from_items(
+        [("a", 8000), ("b", 12000), ("c", 12000), ("d", 30000), ("sin", None)]
+    )
+
+
+def ids(page):
+    return [vacante_id for vacante_id, _ in page]
+
+
+def test_range_is_inclusive_and_sorted(index):
+    total, page = index.range(minimo=10000, maximo=30000)
+    assert total == 3
+    assert ids(page) == ["b", "c", "d"]
+    assert index.range(maximo=30000, exclusive_max=True)[0] == 3
+
+
+def test_range_descending_and_paged(index):
+    total, page = index.range(descending=True, offset=1, limit=2)
+    assert total == 4
+    assert [sueldo for _, sueldo in page] == [12000.0, 12000.0]
+
+
+def test_range_appends_missing_after_the_ranged(index):
+    total, page = index.range(include_missing=True, offset=3, limit=5)
+    assert total == 5
+    assert page == [("d", 30000.0), ("sin", None)]
+    assert index.range(include_missing=True, offset=4)[1] == [("sin", None)]
+
+
+def test_empty_or_inverted_range(index):
+    assert index.range(minimo=50000) == (0, [])
+    assert index.range(minimo=20000, maximo=10000) == (0, [])
+
+
+def test_add_update_remove_keep_the_histogram(index):
+    index.add("a", 40000)
+    index.add("e", 5000)
+    index.remove("b")
+    index.add("sin", 1000)
+    assert ids(index.range()[1]) == ["sin", "e", "c", "d", "a"]
+    assert not index.missing
+
+    buckets, sin_sueldo = index.histogram()
+    assert sin_sueldo == 0
+    assert [count for _, _, count in buckets] == [1, 1, 1, 0, 0, 2, 0]
+    assert buckets[-1] == (BUCKET_EDGES[-1], None, 0)
+    assert sum(index.bucket_counts) == len(index.values) == 5
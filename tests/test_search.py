@@ -0,0 +1,75 @@
+from backend.search import SearchIndex
+
+
+def build(*documents):
+    index = SearchIndex()
+    for doc_id, titulo, descripcion in documents:
+        index.add(doc_id, {"titulo": titulo, "descripcion": descripcion})
+    return index
+
+
+def ids(results):
+    return [doc_id for doc_id, _ in results]
+
+
+def test_ranks_title_matches_first():
+    index = build(
+        ("desc", "Analista", "Se busca experiencia en Python"),
+        ("title", "Desarrollador Python", "Equipo de backend"),
+        ("none", "Contador", "Impuestos y nómina"),
+    )
+    total, results = index.search("python")
+    assert total == 2
+    assert ids(results) == ["title", "desc"]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_rare_terms_weigh_more():
+    index = build(
+        ("common", "Desarrollador backend", ""),
+        ("rare", "Desarrollador Rust", ""),
+        ("other", "Desarrollador frontend", ""),
+    )
+    _, results = index.search("desarrollador rust")
+    assert ids(results)[0] == "rare"
+
+
+def test_matches_folded_and_stemmed_terms():
+    index = build(("v1", "Ingeniería de Datos", "Análisis de información"))
+    assert ids(index.search("ingenieria")[1]) == ["v1"]
+    assert ids(index.search("ANALISIS")[1]) == ["v1"]
+
+
+def test_pages_with_offset_and_limit():
+    index = build(*((f"v{n}", "Python " * (n + 1), "") for n in range(5)))
+    total, first = index.search("python", limit=2)
+    _, rest = index.search("python", limit=10, offset=2)
+    assert total == 5
+    assert len(first) == 2 and len(rest) == 3
+    assert set(ids(first)).isdisjoint(ids(rest))
+    assert ids(first) + ids(rest) == ids(index.search("python", limit=5)[1])
+
+
+def test_remove_and_readd():
+    index = build(("v1", "Python", ""), ("v2", "Python", ""))
+    index.remove("v1")
+    assert ids(index.search("python")[1]) == ["v2"]
+    assert "v1" not in index and len(index) == 1
+
+    index.add("v2", {"titulo": "Java"})
+    assert index.search("python") == (0, [])
+    assert ids(index.search("java")[1]) == ["v2"]
+
+
+def test_empty_query_or_index():
+    assert SearchIndex().search("python") == (0, [])
+    assert build(("v1", "Python", "")).search("de la") == (0, [])
+
+
+def test_compaction_keeps_results():
+    index = SearchIndex()
+    for n in range(1500):
+        index.add("v", {"titulo": f"Python {n}"})
+    index.add("w", {"titulo": "Python"})
+    assert index.tombstones <= len(index.doc_ids)
+    assert sorted(ids(index.search("python")[1])) == ["v", "w"]
@@ -0,0 +1,50 @@
+from backend.skills import (
+    HABILIDADES,
+    IDIOMAS,
+    canonicalize,
+    canonicalize_list,
+    deletes,
+    edit_distance,
+    skill_ids,
+)
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("python", "python", 2) == 0
+    assert edit_distance("pyhton", "python", 2) == 1
+    assert edit_distance("pyton", "python", 2) == 1
+    assert edit_distance("kotlin", "cotlim", 2) == 2
+
+
+def test_edit_distance_stops_past_the_limit():
+    assert edit_distance("java", "javascript", 2) == 3
+    assert edit_distance("abcdef", "uvwxyz", 1) == 2
+
+
+def test_deletes():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert "c" in deletes("abc", 2)
+    assert "" not in deletes("ab", 2)
+
+
+def test_canonicalizes_exact_synonym_and_version():
+    assert canonicalize("  PYTHON ", HABILIDADES) == ("Python", 0)
+    assert canonicalize("python3", HABILIDADES) == ("Python", 0)
+    assert canonicalize("js", HABILIDADES)[0] == "JavaScript"
+
+
+def test_canonicalizes_typos():
+    assert canonicalize("Pyhton", HABILIDADES) == ("Python", 0)
+    assert canonicalize("javascritp", HABILIDADES)[0] == "JavaScript"
+
+
+def test_keeps_qualifiers_and_unknown_terms():
+    assert canonicalize("ingles (B2)", IDIOMAS)[0] == "Inglés (B2)"
+    assert canonicalize("Cobolx  ", HABILIDADES) == ("Cobolx", None)
+
+
+def test_lists_drop_duplicates_in_order():
+    assert canonicalize_list("Python, pyhton, SQL", HABILIDADES) == ["Python", "SQL"]
+    assert skill_ids(["sql", "Python", "Cobolx"], HABILIDADES) == sorted(
+        [canonicalize("SQL", HABILIDADES)[1], 0]
+    )